@@ -0,0 +1,31 @@
+"""Keyset index for unread message replay
+
+Revision ID: 003
+Revises: 002
+Create Date: 2026-10-16
+
+"""
+from alembic import op
+
+# revision identifiers
+revision = '003'
+down_revision = '002'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # Unread messages of a receiver in (created_at, id) order, for keyset replay.
+    # The (receiver_id, is_read) index is named ix_messages_* by 001 and
+    # ix_message_* in databases created from the models: drop either.
+    op.drop_index('ix_messages_receiver_unread', table_name='messages', if_exists=True)
+    op.drop_index('ix_message_receiver_unread', table_name='messages', if_exists=True)
+    op.create_index(
+        'ix_messages_receiver_unread', 'messages',
+        ['receiver_id', 'is_read', 'created_at', 'id']
+    )
+
+
+def downgrade():
+    op.drop_index('ix_messages_receiver_unread', table_name='messages', if_exists=True)
+    op.create_index('ix_messages_receiver_unread', 'messages', ['receiver_id', 'is_read'])
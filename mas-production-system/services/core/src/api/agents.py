@@ -4,11 +4,11 @@ Agent API endpoints with async SQLAlchemy
 
 from typing import List, Optional, Dict, Any
 from uuid import UUID, uuid4
-from datetime import datetime
+from datetime import datetime, timezone
 
 from fastapi import APIRouter, Depends, HTTPException, Query, Body, status
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import and_, or_, select, func
+from sqlalchemy import and_, or_, select, func, insert, update
 from sqlalchemy.orm import selectinload
 
 from src.database import get_db
@@ -18,10 +18,15 @@ from src.schemas import agents as schemas
 from src.schemas import messages as message_schemas
 from src.services.agent_service import AgentService
 from src.services.llm_service import LLMService
-from src.services.message_delivery import get_delivery_service
+from src.services.message_delivery import get_delivery_service, DELIVERED_STATUSES
+from src.services.message_store import get_message_store
+from src.services.conversation_buffer import get_conversation_buffer
+from src.services.cache_invalidation import agent_list_cache_key
+from src.core.agents.queues import MailboxStatus
 from src.utils.logger import get_logger
-from src.cache import delete as cache_delete, get as cache_get, set as cache_set
-from src.message_broker import publish_event
+from src.config import settings
+from src.cache import delete as cache_delete, delete_many as cache_delete_many, get as cache_get, set as cache_set
+from src.message_broker import publish_event, publish_events
 
 router = APIRouter(prefix="/agents", tags=["agents"])
 logger = get_logger(__name__)
@@ -113,6 +118,151 @@ async def create_agent(
             detail="Failed to create agent"
         )
 
+@router.post("/batch", response_model=schemas.AgentBatchResponse, status_code=status.HTTP_201_CREATED)
+async def create_agents_batch(
+    batch: schemas.AgentBatchCreate,
+    current_user: User = Depends(get_current_user),
+    db: AsyncSession = Depends(get_db),
+    agent_service: AgentService = Depends(),
+    llm_service: LLMService = Depends()
+):
+    """Create (and optionally start) many agents in one request
+    
+    Runs one quota check, one multi-row insert, one event publish and one
+    cache invalidation for the whole batch, and reports a result per item.
+    """
+    
+    if not batch.agents:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="No agents to create"
+        )
+    if len(batch.agents) > settings.AGENT_BATCH_MAX_SIZE:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Batch too large. Maximum allowed: {settings.AGENT_BATCH_MAX_SIZE}"
+        )
+    
+    # Check user quota once for the whole batch
+    stmt = select(func.count()).select_from(Agent).where(
+        and_(Agent.owner_id == current_user.id, Agent.is_active == True)
+    )
+    result = await db.execute(stmt)
+    remaining = current_user.agent_quota - result.scalar()
+    
+    # Validate every referenced organization in one query
+    org_ids = {item.organization_id for item in batch.agents if item.organization_id}
+    valid_org_ids = set()
+    if org_ids:
+        stmt = select(Organization.id).where(
+            and_(
+                Organization.id.in_(org_ids),
+                Organization.owner_id == current_user.id,
+                Organization.is_active == True
+            )
+        )
+        result = await db.execute(stmt)
+        valid_org_ids = set(result.scalars().all())
+    
+    results: Dict[int, schemas.AgentBatchItemResult] = {}
+    accepted = []
+    for index, agent_data in enumerate(batch.agents):
+        # Map reactive to cognitive for database compatibility
+        if agent_data.agent_type == "reactive":
+            agent_data.agent_type = "cognitive"
+        
+        error = None
+        if agent_data.agent_type not in ("reflexive", "cognitive", "hybrid"):
+            error = f"Unknown agent type: {agent_data.agent_type}"
+        elif agent_data.organization_id and agent_data.organization_id not in valid_org_ids:
+            error = "Organization not found or access denied"
+        elif len(accepted) >= remaining:
+            error = f"Agent quota exceeded. Maximum allowed: {current_user.agent_quota}"
+        
+        if error:
+            results[index] = schemas.AgentBatchItemResult(index=index, success=False, error=error)
+        else:
+            accepted.append((index, agent_data))
+    
+    created = []
+    if accepted:
+        rows = agent_service.build_agent_rows(current_user.id, [data for _, data in accepted])
+        try:
+            stmt = insert(Agent).values(rows).returning(Agent.id, Agent.created_at)
+            result = await db.execute(stmt)
+            created_at = dict(result.all())
+            await db.commit()
+        except Exception as e:
+            await db.rollback()
+            logger.error(f"Failed to create agent batch: {str(e)}")
+            raise HTTPException(
+                status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+                detail="Failed to create agents"
+            )
+        
+        for (index, _), row in zip(accepted, rows):
+            agent = Agent(**row)
+            agent.created_at = created_at[row["id"]]
+            created.append((index, agent))
+    
+    # Build runtime instances, and start them if requested
+    started_ids = []
+    for index, agent in created:
+        item = schemas.AgentBatchItemResult(index=index, success=True)
+        try:
+            await agent_service.register_runtime_agent(agent, llm_service)
+            if batch.start:
+                await agent_service.start_agent(agent)
+                agent.status = 'working'
+                started_ids.append(agent.id)
+                item.started = True
+        except Exception as e:
+            logger.error(f"Failed to {'start' if batch.start else 'register'} agent {agent.id}: {str(e)}")
+            item.error = str(e)
+        
+        item.agent = schemas.AgentResponse(
+            id=agent.id,
+            name=agent.name,
+            role=agent.role,
+            agent_type=agent.agent_type,
+            status=agent.status,
+            capabilities=agent.capabilities or [],
+            created_at=agent.created_at
+        )
+        results[index] = item
+    
+    if started_ids:
+        await db.execute(
+            update(Agent)
+            .where(Agent.id.in_(started_ids))
+            .values(status='working', last_active_at=datetime.utcnow())
+        )
+        await db.commit()
+    
+    if created:
+        # Publish one event for the whole batch
+        await publish_event("agent.batch_created", {
+            "owner_id": str(current_user.id),
+            "agent_ids": [str(agent.id) for _, agent in created],
+            "started_ids": [str(agent_id) for agent_id in started_ids]
+        })
+        
+        # Clear cache
+        await cache_delete(f"user_agents:{current_user.id}")
+    
+    logger.info(
+        f"Batch of {len(batch.agents)} agents for user {current_user.id}: "
+        f"{len(created)} created, {len(started_ids)} started"
+    )
+    
+    items = [results[index] for index in range(len(batch.agents))]
+    return schemas.AgentBatchResponse(
+        items=items,
+        created=len(created),
+        started=len(started_ids),
+        failed=sum(1 for item in items if not item.success)
+    )
+
 @router.get("", response_model=schemas.AgentList)
 async def list_agents(
     page: int = Query(1, ge=1),
@@ -127,7 +277,7 @@ async def list_agents(
     """List user's agents with filtering and pagination"""
     
     # Try cache first
-    cache_key = f"user_agents:{current_user.id}:{page}:{per_page}:{agent_type}:{status}"
+    cache_key = await agent_list_cache_key(current_user.id, page, per_page, agent_type, status)
     cached = await cache_get(cache_key)
     if cached:
         import json
@@ -282,6 +432,7 @@ async def update_agent(
         # Publish event
         await publish_event("agent.updated", {
             "agent_id": str(agent.id),
+            "owner_id": str(current_user.id),
             "updated_fields": list(update_data.dict(exclude_unset=True).keys())
         })
         
@@ -402,7 +553,8 @@ async def start_agent(
         
         # Publish event
         await publish_event("agent.started", {
-            "agent_id": str(agent.id)
+            "agent_id": str(agent.id),
+            "owner_id": str(agent.owner_id)
         })
         
         return schemas.AgentResponse(
@@ -463,7 +615,8 @@ async def stop_agent(
         
         # Publish event
         await publish_event("agent.stopped", {
-            "agent_id": str(agent.id)
+            "agent_id": str(agent.id),
+            "owner_id": str(agent.owner_id)
         })
         
         return schemas.AgentResponse(
@@ -587,7 +740,7 @@ async def send_message(
     1. Verifies that the sender agent belongs to the current user
     2. Verifies that the receiver agent exists
     3. Creates a message with FIPA-ACL performative
-    4. Saves it to the database
+    4. Queues it for a batched database write (write-behind)
     5. Returns the created message
     
     Args:
@@ -646,27 +799,22 @@ async def send_message(
         )
     
     try:
-        # Step 3 & 4: Create message with FIPA-ACL performative and save to database
-        message = Message(
-            sender_id=agent_id,
-            receiver_id=message_data.receiver_id,
-            performative=message_data.performative,
-            content=message_data.content,
-            protocol='fipa-acl',
-            conversation_id=message_data.conversation_id or uuid4(),
-            in_reply_to=message_data.in_reply_to,
-            is_read=False
-        )
-        
-        db.add(message)
-        
-        # Update sender metrics
-        if hasattr(sender, 'total_messages'):
-            sender.total_messages = (sender.total_messages or 0) + 1
-        sender.last_active_at = datetime.utcnow()
-        
-        await db.commit()
-        await db.refresh(message)
+        # Step 3 & 4: Create message with FIPA-ACL performative, saved to the
+        # database by the write-behind buffer (which also updates sender metrics)
+        row = {
+            "id": uuid4(),
+            "sender_id": agent_id,
+            "receiver_id": message_data.receiver_id,
+            "performative": message_data.performative,
+            "content": message_data.content,
+            "protocol": 'fipa-acl',
+            "conversation_id": message_data.conversation_id or uuid4(),
+            "in_reply_to": message_data.in_reply_to,
+            "is_read": False,
+            "created_at": datetime.now(timezone.utc)
+        }
+        await get_message_store().add(row)
+        message = Message(**row)
         
         # Publish event for real-time notifications
         await publish_event("message.sent", {
@@ -682,10 +830,13 @@ async def send_message(
         
         # Deliver message to running agent
         delivery_service = get_delivery_service()
-        delivered = await delivery_service.deliver_message_from_db(db, message.id)
+        delivery_status = await delivery_service.deliver_message(message)
         
-        if delivered:
+        if delivery_status in DELIVERED_STATUSES:
             logger.info(f"Message {message.id} sent and delivered to agent {message_data.receiver_id}")
+        elif delivery_status == MailboxStatus.REJECTED.value:
+            # Backpressure: the message stays unread in the database
+            logger.warning(f"Message {message.id} stored but agent {message_data.receiver_id} mailbox is full")
         else:
             logger.info(f"Message {message.id} sent from agent {agent_id} to {message_data.receiver_id} (queued for delivery)")
         
@@ -700,7 +851,8 @@ async def send_message(
             conversation_id=message.conversation_id,
             in_reply_to=message.in_reply_to,
             is_read=message.is_read,
-            created_at=message.created_at
+            created_at=message.created_at,
+            delivery_status=delivery_status
         )
         
     except Exception as e:
@@ -711,6 +863,166 @@ async def send_message(
             detail=f"Failed to send message: {str(e)}"
         )
 
+@router.post("/{agent_id}/messages/batch", response_model=message_schemas.MessageBatchResponse, status_code=status.HTTP_201_CREATED)
+async def send_messages_batch(
+    agent_id: UUID,
+    batch: message_schemas.MessageBatchCreate,
+    current_user: User = Depends(get_current_user),
+    db: AsyncSession = Depends(get_db)
+):
+    """Send many messages from one agent in one request
+    
+    Validates every receiver in one query, inserts all messages with one
+    multi-row statement in a single transaction, publishes the events and
+    invalidates the receivers' caches in one round trip each, and hands the
+    inserted rows to delivery without reading them back.
+    """
+    
+    if not batch.messages:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="No messages to send"
+        )
+    if len(batch.messages) > settings.MESSAGE_BATCH_MAX_SIZE:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Batch too large. Maximum allowed: {settings.MESSAGE_BATCH_MAX_SIZE}"
+        )
+    
+    # Verify that the sender agent belongs to the current user
+    stmt = select(Agent.id).where(
+        and_(
+            Agent.id == agent_id,
+            Agent.owner_id == current_user.id,
+            Agent.is_active == True
+        )
+    )
+    result = await db.execute(stmt)
+    if result.scalar_one_or_none() is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Sender agent not found or you don't have permission to send messages from this agent"
+        )
+    
+    # Validate every receiver in one query
+    receiver_ids = {item.receiver_id for item in batch.messages}
+    stmt = select(Agent.id).where(
+        and_(
+            Agent.id.in_(receiver_ids),
+            Agent.is_active == True
+        )
+    )
+    result = await db.execute(stmt)
+    valid_receiver_ids = set(result.scalars().all())
+    
+    results: Dict[int, message_schemas.MessageBatchItemResult] = {}
+    rows = []
+    row_indexes = []
+    for index, message_data in enumerate(batch.messages):
+        error = None
+        if message_data.receiver_id == agent_id:
+            error = "Agent cannot send messages to itself"
+        elif message_data.receiver_id not in valid_receiver_ids:
+            error = "Receiver agent not found"
+        
+        if error:
+            results[index] = message_schemas.MessageBatchItemResult(index=index, success=False, error=error)
+            continue
+        
+        rows.append({
+            "id": uuid4(),
+            "sender_id": agent_id,
+            "receiver_id": message_data.receiver_id,
+            "performative": message_data.performative,
+            "content": message_data.content,
+            "protocol": 'fipa-acl',
+            "conversation_id": message_data.conversation_id or uuid4(),
+            "in_reply_to": message_data.in_reply_to,
+            "is_read": False
+        })
+        row_indexes.append(index)
+    
+    messages = []
+    if rows:
+        try:
+            stmt = insert(Message).values(rows).returning(Message.id, Message.created_at)
+            result = await db.execute(stmt)
+            created_at = dict(result.all())
+            
+            # Update sender metrics in the same transaction
+            await db.execute(
+                update(Agent)
+                .where(Agent.id == agent_id)
+                .values(
+                    total_messages=func.coalesce(Agent.total_messages, 0) + len(rows),
+                    last_active_at=datetime.utcnow()
+                )
+            )
+            await db.commit()
+        except Exception as e:
+            await db.rollback()
+            logger.error(f"Failed to send message batch from agent {agent_id}: {str(e)}")
+            raise HTTPException(
+                status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+                detail="Failed to send messages"
+            )
+        
+        for row in rows:
+            row["created_at"] = created_at[row["id"]]
+            messages.append(Message(**row))
+        await get_conversation_buffer().append(rows)
+        
+        # Publish events and clear receivers' caches, one round trip each
+        await publish_events([
+            ("message.sent", {
+                "message_id": str(message.id),
+                "sender_id": str(agent_id),
+                "receiver_id": str(message.receiver_id),
+                "performative": message.performative,
+                "conversation_id": str(message.conversation_id)
+            })
+            for message in messages
+        ])
+        await cache_delete_many(*{f"agent_messages:{message.receiver_id}" for message in messages})
+    
+    # Deliver from the inserted rows
+    statuses = []
+    if messages:
+        try:
+            statuses = await get_delivery_service().deliver_messages(messages)
+        except Exception as e:
+            # Messages are stored unread and replayed when their receivers start
+            logger.error(f"Failed to deliver message batch from agent {agent_id}: {str(e)}")
+            statuses = [None] * len(messages)
+    
+    for index, message, delivery_status in zip(row_indexes, messages, statuses):
+        results[index] = message_schemas.MessageBatchItemResult(
+            index=index,
+            success=True,
+            message=message_schemas.MessageResponse(
+                id=message.id,
+                sender_id=message.sender_id,
+                receiver_id=message.receiver_id,
+                performative=message.performative,
+                content=message.content,
+                protocol=message.protocol,
+                conversation_id=message.conversation_id,
+                in_reply_to=message.in_reply_to,
+                is_read=message.is_read,
+                created_at=message.created_at,
+                delivery_status=delivery_status
+            )
+        )
+    
+    logger.info(f"Batch of {len(batch.messages)} messages from agent {agent_id}: {len(messages)} sent")
+    
+    items = [results[index] for index in range(len(batch.messages))]
+    return message_schemas.MessageBatchResponse(
+        items=items,
+        sent=len(messages),
+        failed=len(items) - len(messages)
+    )
+
 @router.get("/{agent_id}/messages", response_model=message_schemas.MessageList)
 async def get_agent_messages(
     agent_id: UUID,
@@ -754,6 +1066,17 @@ async def get_agent_messages(
             detail="Agent not found or you don't have permission to view its messages"
         )
     
+    # Make messages still buffered by the write-behind visible
+    await get_message_store().flush()
+    
+    # Conversation reads are served from the conversation buffer once loaded
+    if conversation_id:
+        conversation = await get_conversation_buffer().get_or_load(
+            conversation_id, lambda limit: _load_conversation(db, conversation_id, limit)
+        )
+        if conversation is not None:
+            return _conversation_page(conversation, agent_id, message_type, performative, page, per_page)
+    
     # Build base query
     stmt = select(Message)
     
@@ -808,6 +1131,48 @@ async def get_agent_messages(
         pages=(total + per_page - 1) // per_page if per_page > 0 else 0
     )
 
+async def _load_conversation(db: AsyncSession, conversation_id: UUID, limit: int) -> List[Dict[str, Any]]:
+    """Messages of a conversation as dicts, oldest first"""
+    stmt = (
+        select(Message)
+        .where(Message.conversation_id == conversation_id)
+        .order_by(Message.created_at, Message.id)
+        .limit(limit)
+    )
+    result = await db.execute(stmt)
+    return [
+        {column.name: getattr(msg, column.name) for column in Message.__table__.columns}
+        for msg in result.scalars().all()
+    ]
+
+def _conversation_page(
+    conversation: List[Dict[str, Any]],
+    agent_id: UUID,
+    message_type: str,
+    performative: Optional[str],
+    page: int,
+    per_page: int
+) -> message_schemas.MessageList:
+    """Filter and paginate buffered conversation messages like the database query does"""
+    agent = str(agent_id)
+    items = [
+        message_schemas.MessageResponse(**msg)
+        for msg in conversation
+        if (message_type != "sent" or str(msg["sender_id"]) == agent)
+        and (message_type != "received" or str(msg["receiver_id"]) == agent)
+        and (message_type != "all" or agent in (str(msg["sender_id"]), str(msg["receiver_id"])))
+        and (performative is None or msg["performative"] == performative)
+    ]
+    items.sort(key=lambda msg: msg.created_at, reverse=True)
+    total = len(items)
+    return message_schemas.MessageList(
+        items=items[(page - 1) * per_page:page * per_page],
+        total=total,
+        page=page,
+        per_page=per_page,
+        pages=(total + per_page - 1) // per_page if per_page > 0 else 0
+    )
+
 @router.patch("/{agent_id}/messages/{message_id}/read", response_model=message_schemas.MessageResponse)
 async def mark_message_as_read(
     agent_id: UUID,
@@ -844,6 +1209,7 @@ async def mark_message_as_read(
         )
     
     # Get the message and verify the agent is the receiver
+    await get_message_store().flush()
     stmt = select(Message).where(
         and_(
             Message.id == message_id,
@@ -866,8 +1232,9 @@ async def mark_message_as_read(
         await db.commit()
         await db.refresh(message)
         
-        # Clear cache
+        # Clear caches
         await cache_delete(f"agent_messages:{agent_id}")
+        await get_conversation_buffer().invalidate([message.conversation_id])
         
         # Publish event
         await publish_event("message.read", {
@@ -950,10 +1317,8 @@ async def delete_agent(
             detail="Agent not found"
         )
     
-    # Stop agent if running
-    runtime = agent_service.runtime
-    if await runtime.is_agent_running(agent.id):
-        await runtime.stop_agent(agent.id)
+    # Stop agent if running (on whichever worker owns it)
+    await agent_service.stop_agent(agent)
     
     # Delete agent from database
     await db.delete(agent)
@@ -52,6 +52,14 @@ async def delete(key: str) -> bool:
         await init_cache()
     return await cache.delete(key) > 0
 
+async def delete_many(*keys: str) -> int:
+    """Delete several keys in one round trip"""
+    if not keys:
+        return 0
+    if cache is None:
+        await init_cache()
+    return await cache.delete(*keys)
+
 async def exists(key: str) -> bool:
     """Check if key exists"""
     if cache is None:
@@ -70,6 +78,18 @@ async def expire(key: str, seconds: int) -> bool:
         await init_cache()
     return await cache.expire(key, seconds)
 
+async def rpush(key: str, *values: str) -> int:
+    """Append values to a list"""
+    if cache is None:
+        await init_cache()
+    return await cache.rpush(key, *values)
+
+async def lpop(key: str, count: int = 1) -> list:
+    """Pop up to count values from the head of a list"""
+    if cache is None:
+        await init_cache()
+    return await cache.lpop(key, count) or []
+
 async def close():
     """Close Redis connection"""
     global cache
@@ -83,8 +103,11 @@ __all__ = [
     "get",
     "set",
     "delete",
+    "delete_many",
     "exists",
     "incr",
     "expire",
+    "rpush",
+    "lpop",
     "close"
 ]
\ No newline at end of file
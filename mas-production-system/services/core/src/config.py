@@ -72,6 +72,31 @@ class Settings(BaseSettings):
     LLM_TEMPERATURE: float = 0.7
     LLM_MAX_TOKENS: int = 4000
     ENABLE_MOCK_LLM: bool = False  # Enable mock mode for testing
+    LLM_POOL_MAX_CONNECTIONS: int = 100  # connections per hosted provider endpoint, shared by all agents
+    LLM_LOCAL_POOL_MAX_CONNECTIONS: int = 16  # connections per Ollama/LM Studio endpoint
+    LLM_POOL_MAX_KEEPALIVE: int = 20  # idle connections kept open per endpoint
+    LLM_POOL_KEEPALIVE_EXPIRY: float = 30.0  # seconds an idle connection is kept
+    LLM_HTTP2: bool = True  # HTTP/2 to hosted providers (needs httpx[http2])
+    LLM_LIMITER_ENABLED: bool = True  # Adaptive concurrency and rate limits per provider
+    LLM_CONCURRENCY_INITIAL: int = 4  # concurrent calls per provider to start with (max: its pool size)
+    LLM_CONCURRENCY_BACKOFF: float = 0.5  # limit multiplier on a 429, timeout or slow call
+    LLM_LATENCY_TARGET: float = 30.0  # seconds; slower calls count as congestion
+    LLM_REQUESTS_PER_MINUTE: int = 0  # per provider, 0 disables
+    LLM_TOKENS_PER_MINUTE: int = 0  # estimated prompt + max completion tokens per provider, 0 disables
+    LLM_BATCHING_ENABLED: bool = False  # Micro-batch concurrent calls to Ollama/LM Studio
+    LLM_BATCH_MODE: str = "parallel"  # parallel, or completions (one prompt-list request per batch)
+    LLM_BATCH_WINDOW_MS: float = 5.0  # time spent gathering concurrent calls
+    LLM_BATCH_MAX_SIZE: int = 32  # calls dispatched together
+    LLM_BATCH_PARALLELISM: int = 8  # parallel requests to the server (its parallel slots)
+    LLM_CACHE_ENABLED: bool = True  # Cache responses of identical prompts
+    LLM_CACHE_TTL: int = 3600  # seconds a cached response is served
+    LLM_CACHE_MAX_ENTRIES: int = 10000  # responses kept in process memory (all are kept in Redis)
+    LLM_CACHE_MAX_TEMPERATURE: float = 0.0  # hotter calls bypass the cache
+    LLM_SEMANTIC_CACHE_ENABLED: bool = False  # Also serve paraphrased prompts, one embedding call per miss
+    LLM_SEMANTIC_CACHE_THRESHOLD: float = 0.95  # min cosine similarity between prompts
+    LLM_SEMANTIC_CACHE_MAX_ENTRIES: int = 2000  # prompt embeddings kept in process memory
+    LLM_EMBEDDING_MODEL: str = "text-embedding-3-small"
+    LLM_COALESCING_ENABLED: bool = True  # Identical concurrent calls share one provider request
     
     # Rate Limiting
     RATE_LIMIT_ENABLED: bool = True
@@ -91,6 +116,36 @@ class Settings(BaseSettings):
     MAX_AGENTS_TOTAL: int = 1000
     AGENT_TIMEOUT: int = 300  # seconds
     AGENT_MEMORY_LIMIT: int = 512  # MB
+    AGENT_BDI_CYCLE_INTERVALS: Dict[str, float] = {}  # seconds, keyed by agent type
+    AGENT_BDI_CYCLE_JITTER: float = 0.1  # +/- fraction of the interval
+    AGENT_MAX_CONCURRENT_BDI_CYCLES: int = 32  # across all agents of a runtime
+    AGENT_MAILBOX_CAPACITY: int = 1000  # messages held in memory per agent
+    AGENT_MAILBOX_POLICY: str = "block"  # block, drop_oldest, drop_newest or spill
+    AGENT_MAILBOX_BLOCK_TIMEOUT: float = 5.0  # seconds a sender waits under "block"
+    AGENT_MAILBOX_HIGH_WATERMARK: float = 0.8  # fill ratio above which delivery backs off
+    AGENT_MESSAGE_BATCH_SIZE: int = 1  # messages per handle_messages call, 1 disables batching
+    AGENT_MESSAGE_BATCH_WINDOW: float = 0.05  # seconds to wait for more messages to batch
+    AGENT_REPLAY_PAGE_SIZE: int = 500  # unread messages fetched per query on agent start
+    MESSAGE_BATCH_MAX_SIZE: int = 5000  # messages per POST /agents/{id}/messages/batch
+    MESSAGE_WRITE_BEHIND_INTERVAL: float = 0.1  # max seconds a message waits before its insert
+    MESSAGE_WRITE_BEHIND_BATCH_SIZE: int = 500  # buffered messages that trigger an insert
+    MESSAGE_WRITE_BEHIND_MAX_PENDING: int = 10000  # max unflushed messages (lost on a crash)
+    MESSAGE_READ_MARKER_TTL: int = 600  # seconds a delivery ack waits for its message's insert
+    MESSAGE_STREAM_MAXLEN: int = 100000  # approximate entries kept per delivery stream
+    MESSAGE_STREAM_READ_COUNT: int = 100  # entries read per XREADGROUP
+    MESSAGE_STREAM_BLOCK_MS: int = 5000  # XREADGROUP block time
+    MESSAGE_STREAM_RETRY_IDLE_MS: int = 5000  # pending time before an entry is retried
+    CONVERSATION_BUFFER_MAX_MESSAGES: int = 1000  # longer conversations are read from the database
+    CONVERSATION_BUFFER_TTL: int = 600  # seconds a buffered conversation is kept without writes
+    BROKER_HANDLER_CONCURRENCY: int = 4  # workers per broker subscription
+    BROKER_QUEUE_SIZE: int = 1000  # events queued per subscription before dropping
+    AGENT_BATCH_MAX_SIZE: int = 1000  # agents per POST /agents/batch request
+    AGENT_HIBERNATION_IDLE_SECONDS: float = 600  # idle time before hibernation, 0 disables
+    AGENT_HIBERNATION_SWEEP_INTERVAL: float = 30  # seconds between idle sweeps
+    RUNTIME_SHARDING: bool = False  # one runtime shard per worker process
+    RUNTIME_SHARD_COUNT: Optional[int] = None  # defaults to WORKERS
+    PROTOCOL_PROPOSAL_TIMEOUT: float = 5.0  # seconds a contract-net round collects proposals
+    AGENT_CONVERSATION_PIN_TTL: float = 300  # idle seconds before a conversation-pinned agent goes home, 0 disables
     
     # Tools
     ENABLE_CODE_EXECUTION: bool = True
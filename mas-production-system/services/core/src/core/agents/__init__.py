@@ -1,15 +1,25 @@
 """
 Agents module initialization
 """
-from typing import Type, Dict, Any, Optional
+from typing import Type, Dict, Any, Optional, Set, Callable, Awaitable
 from uuid import UUID
 import asyncio
+import time
 
 from src.core.agents.base_agent import BaseAgent
 from src.core.agents.cognitive_agent import CognitiveAgent
 from src.core.agents.reflexive_agent import ReflexiveAgent
 from src.core.agents.hybrid_agent import HybridAgent
+from src.core.agents.scheduler import BDITimer, BDIExecutor
+from src.core.agents.hibernation import HibernationStore, RedisHibernationStore
+from src.core.agents.offline_mailbox import OfflineMailbox, DatabaseOfflineMailbox
+from src.core.agents.messages import AgentMessage, PERFORMATIVES
+from src.core.agents.queues import MailboxStatus
+from src.core.agents.protocols import ProtocolEngine
+from src.core.agents.sharding import build_agent_from_spec
+from src.monitoring import track_agent_hibernation
 from src.utils.logger import get_logger
+from src.config import settings
 
 logger = get_logger(__name__)
 
@@ -105,15 +115,43 @@ class AgentFactory:
 class AgentRuntime:
     """Runtime manager for agents"""
     
-    def __init__(self):
+    def __init__(
+        self,
+        hibernation_store: Optional[HibernationStore] = None,
+        agent_builder: Optional[Callable[[Dict[str, Any]], BaseAgent]] = None,
+        offline_mailbox: Optional[OfflineMailbox] = None,
+        message_store: Optional[Any] = None
+    ):
         self.running_agents: Dict[UUID, BaseAgent] = {}
         self.agent_tasks: Dict[UUID, asyncio.Task] = {}
+        # One timer task fires the BDI cycles of every running agent
+        self.bdi_timer = BDITimer(jitter=settings.AGENT_BDI_CYCLE_JITTER)
+        # Caps in-flight BDI cycles (LLM-heavy) with fair share between owners
+        self.bdi_executor = BDIExecutor(settings.AGENT_MAX_CONCURRENT_BDI_CYCLES)
+        # Idle agents are snapshotted to the store, dropped from memory and
+        # rebuilt on their next message or task
+        self.hibernation_store = hibernation_store or RedisHibernationStore()
+        self.agent_builder = agent_builder or build_agent_from_spec
+        self.hibernate_after = settings.AGENT_HIBERNATION_IDLE_SECONDS
+        self.hibernated: Set[UUID] = set()
+        self._transitions: Dict[UUID, asyncio.Future] = {}  # Hibernations/rehydrations in progress
+        self._sweeper: Optional[asyncio.Task] = None
+        # Messages stored while an agent was not running are replayed on start
+        self.offline_mailbox = offline_mailbox
+        self._replays: Dict[UUID, asyncio.Task] = {}
+        # Agent-to-agent messages: persisted write-behind (add_message), and
+        # handed to the forwarder when the receiver is not in this runtime
+        self.message_store = message_store
+        self._message_forwarder: Optional[Callable[[UUID, AgentMessage], Awaitable[Optional[MailboxStatus]]]] = None
+        # Contract-net and subscribe conversations, handled without the LLM
+        self.protocols = ProtocolEngine(self)
     
     async def register_agent(self, agent: BaseAgent):
         """Register an agent without starting it"""
         if agent.agent_id in self.running_agents:
             raise ValueError(f"Agent {agent.agent_id} is already registered")
         
+        agent.runtime = self
         self.running_agents[agent.agent_id] = agent
         logger.info(f"Registered agent {agent.name} ({agent.agent_id})")
     
@@ -125,19 +163,71 @@ class AgentRuntime:
         
         # Don't add again, it's already in running_agents from register_agent
         
-        # Create and start agent task
+        # Create and start agent task, its BDI cycles are driven by the runtime timer
+        agent.use_external_bdi_clock()
         task = asyncio.create_task(agent.run())
         self.agent_tasks[agent.agent_id] = task
+        self.bdi_timer.schedule(
+            agent.agent_id,
+            agent.bdi_cycle_interval,
+            agent.request_bdi_cycle,
+            agent_type=agent.agent_type
+        )
+        self._ensure_sweeper()
+        if self.offline_mailbox is not None:
+            self._replays[agent.agent_id] = asyncio.create_task(self._replay_offline_messages(agent))
         
         logger.info(f"Started agent {agent.name} ({agent.agent_id})")
     
+    async def _replay_offline_messages(self, agent: BaseAgent):
+        """Feed the messages stored while the agent was not running into its mailbox
+        
+        Pages are streamed oldest first; a full mailbox stops the replay and
+        the remaining messages stay stored for the next start.
+        """
+        replayed = 0
+        try:
+            async for page in self.offline_mailbox.pending(agent.agent_id):
+                delivered = []
+                for message in page:
+                    status = await agent.receive_message(message)
+                    if not status.accepted:
+                        break
+                    delivered.append(message.id)
+                await self.offline_mailbox.mark_delivered(delivered)
+                replayed += len(delivered)
+                
+                if len(delivered) < len(page):
+                    logger.warning(f"Mailbox of agent {agent.name} is full, offline replay stopped after {replayed} messages")
+                    break
+        except Exception as e:
+            logger.error(f"Failed to replay offline messages of agent {agent.agent_id}: {e}")
+        finally:
+            if self._replays.get(agent.agent_id) is asyncio.current_task():
+                del self._replays[agent.agent_id]
+        
+        if replayed:
+            logger.info(f"Replayed {replayed} offline messages to agent {agent.name}")
+    
     async def stop_agent(self, agent_id: UUID):
         """Stop an agent"""
+        await self._wait_for_transition(agent_id)
+        if agent_id in self.hibernated:
+            self.hibernated.discard(agent_id)
+            await self.hibernation_store.delete(agent_id)
+            logger.info(f"Stopped hibernated agent {agent_id}")
+            return
+        
         agent = self.running_agents.get(agent_id)
         if not agent:
             raise ValueError(f"Agent {agent_id} is not running")
         
+        replay = self._replays.pop(agent_id, None)
+        if replay:
+            replay.cancel()
+        
         # Stop the agent
+        self.bdi_timer.cancel(agent_id)
         await agent.stop()
         
         # Cancel task if still running
@@ -149,6 +239,13 @@ class AgentRuntime:
             except asyncio.CancelledError:
                 pass
         
+        dropped = agent.drop_pending_tasks()
+        if dropped:
+            logger.warning(f"Dropped {dropped} pending tasks of stopped agent {agent_id}")
+        dropped = await agent.drop_pending_messages()
+        if dropped:
+            logger.warning(f"Dropped {dropped} pending messages of stopped agent {agent_id}")
+        
         # Remove from tracking
         del self.running_agents[agent_id]
         del self.agent_tasks[agent_id]
@@ -157,29 +254,206 @@ class AgentRuntime:
     
     async def stop_all_agents(self):
         """Stop all running agents"""
-        agent_ids = list(self.running_agents.keys())
+        if self._sweeper and not self._sweeper.done():
+            self._sweeper.cancel()
+        
+        agent_ids = list(self.running_agents.keys()) + list(self.hibernated)
         
         for agent_id in agent_ids:
             try:
                 await self.stop_agent(agent_id)
             except Exception as e:
                 logger.error(f"Error stopping agent {agent_id}: {e}")
+        
+        await self.bdi_timer.stop()
+    
+    def set_message_forwarder(self, forwarder: Callable[[UUID, AgentMessage], Awaitable[Optional[MailboxStatus]]]):
+        """Set how messages for agents outside this runtime are delivered
+        
+        The forwarder returns the mailbox status when it brought the receiver
+        into this runtime (conversation placement), None otherwise.
+        """
+        self._message_forwarder = forwarder
+    
+    async def send_message(self, message: AgentMessage) -> Optional[MailboxStatus]:
+        """Deliver a message from one agent to another
+        
+        A receiver living in this runtime gets the message straight in its
+        mailbox, with no database, Redis or HTTP round trip. Other receivers
+        go through the forwarder. Either way the message is handed to the
+        background persistence, with its final ID, before it is delivered,
+        and marked read once a mailbox here accepted it; a message the
+        mailbox did not accept stays unread there.
+        Returns the mailbox status, None when the message left the runtime.
+        """
+        try:
+            receiver_id = UUID(str(message.receiver))
+        except ValueError:
+            logger.warning(f"Cannot send message to unknown receiver {message.receiver}")
+            return None
+        
+        persisted = False
+        if self.message_store is not None and message.performative in PERFORMATIVES:
+            try:
+                await self.message_store.add_message(message)
+                persisted = True
+            except Exception as e:
+                logger.error(f"Failed to persist message {message.id}: {e}")
+        
+        status = None
+        receiver = await self.get_or_rehydrate(receiver_id)
+        if receiver is not None:
+            status = await receiver.receive_message(message)
+        elif self._message_forwarder is not None:
+            try:
+                status = await self._message_forwarder(receiver_id, message)
+            except Exception as e:
+                logger.error(f"Failed to forward message to agent {receiver_id}: {e}")
+        
+        if persisted and status is not None and status.accepted:
+            try:
+                # Usually still buffered; otherwise it is updated in the database
+                remaining = await self.message_store.mark_read([message.id])
+                if remaining and self.offline_mailbox is not None:
+                    await self.offline_mailbox.mark_delivered(remaining)
+            except Exception as e:
+                logger.error(f"Failed to mark message {message.id} as read: {e}")
+        return status
     
     def get_running_agent(self, agent_id: UUID) -> Optional[BaseAgent]:
         """Get a running agent by ID"""
         return self.running_agents.get(agent_id)
     
     def list_running_agents(self) -> list[UUID]:
-        """List all running agent IDs"""
+        """List all running agent IDs (hibernated agents excluded)"""
         return list(self.running_agents.keys())
     
     async def is_agent_running(self, agent_id: UUID) -> bool:
         """Check if an agent is running"""
+        # Hibernated agents are still running from the caller's point of view
+        if agent_id in self.hibernated:
+            return True
         # Agent is only considered running if it has an active task
         if agent_id not in self.running_agents:
             return False
         task = self.agent_tasks.get(agent_id)
         return task is not None and not task.done()
+    
+    async def get_or_rehydrate(self, agent_id: UUID) -> Optional[BaseAgent]:
+        """Get a running agent, rebuilding it first if it is hibernated"""
+        await self._wait_for_transition(agent_id)
+        agent = self.running_agents.get(agent_id)
+        if agent is not None or agent_id not in self.hibernated:
+            return agent
+        
+        done = asyncio.get_running_loop().create_future()
+        self._transitions[agent_id] = done
+        try:
+            snapshot = await self.hibernation_store.load(agent_id)
+            if snapshot is None:
+                logger.error(f"No hibernation snapshot for agent {agent_id}")
+                self.hibernated.discard(agent_id)
+                return None
+            
+            agent = self.agent_builder(snapshot["spec"])
+            agent.restore_state(snapshot["state"])
+            self.hibernated.discard(agent_id)
+            await self.register_agent(agent)
+            await self.start_agent(agent)
+            await self.hibernation_store.delete(agent_id)
+            
+            track_agent_hibernation(agent.agent_type, "rehydrate", len(self.hibernated))
+            logger.debug(f"Rehydrated agent {agent.name} ({agent_id})")
+            return agent
+        finally:
+            done.set_result(None)
+            self._transitions.pop(agent_id, None)
+    
+    async def hibernate_agent(self, agent_id: UUID) -> bool:
+        """Snapshot an idle agent to the hibernation store and drop it from memory
+        
+        Returns False (and keeps the agent running) if work arrived meanwhile.
+        """
+        agent = self.running_agents.get(agent_id)
+        if not agent:
+            raise ValueError(f"Agent {agent_id} is not running")
+        
+        # Let the current loop iteration finish before taking the snapshot,
+        # but do not wait forever on a long BDI cycle
+        self.bdi_timer.cancel(agent_id)
+        await agent.stop()
+        task = self.agent_tasks.pop(agent_id, None)
+        if task:
+            done, _ = await asyncio.wait({task}, timeout=1.0)
+            if not done:
+                task.cancel()
+                await asyncio.gather(task, return_exceptions=True)
+        
+        if not agent.is_idle():
+            await self.start_agent(agent)
+            return False
+        
+        # From here on, callers wait for the snapshot and then rehydrate
+        done = asyncio.get_running_loop().create_future()
+        self._transitions[agent_id] = done
+        del self.running_agents[agent_id]
+        self.hibernated.add(agent_id)
+        try:
+            await self.hibernation_store.save(
+                agent_id, {"spec": agent.spec(), "state": agent.snapshot_state()}
+            )
+        except Exception:
+            self.hibernated.discard(agent_id)
+            self.running_agents[agent_id] = agent
+            await self.start_agent(agent)
+            raise
+        finally:
+            done.set_result(None)
+            self._transitions.pop(agent_id, None)
+        
+        track_agent_hibernation(agent.agent_type, "hibernate", len(self.hibernated))
+        logger.debug(f"Hibernated agent {agent.name} ({agent_id})")
+        return True
+    
+    async def hibernate_idle_agents(self) -> int:
+        """Hibernate every agent without work for longer than the idle threshold"""
+        cutoff = time.monotonic() - self.hibernate_after
+        idle_agents = [
+            agent_id for agent_id, agent in self.running_agents.items()
+            if agent.last_activity < cutoff and agent.is_idle()
+            and agent_id in self.agent_tasks and agent_id not in self._replays
+        ]
+        
+        hibernated = 0
+        for agent_id in idle_agents:
+            try:
+                if await self.hibernate_agent(agent_id):
+                    hibernated += 1
+            except Exception as e:
+                logger.error(f"Failed to hibernate agent {agent_id}: {e}")
+        return hibernated
+    
+    def _ensure_sweeper(self):
+        """Start the idle sweeper task if hibernation is enabled"""
+        if self.hibernate_after > 0 and (self._sweeper is None or self._sweeper.done()):
+            self._sweeper = asyncio.create_task(self._hibernation_loop())
+    
+    async def _hibernation_loop(self):
+        """Periodically hibernate idle agents"""
+        interval = min(settings.AGENT_HIBERNATION_SWEEP_INTERVAL, self.hibernate_after)
+        while True:
+            await asyncio.sleep(interval)
+            try:
+                count = await self.hibernate_idle_agents()
+                if count:
+                    logger.info(f"Hibernated {count} idle agents ({len(self.hibernated)} total)")
+            except Exception as e:
+                logger.error(f"Error in hibernation sweep: {e}")
+    
+    async def _wait_for_transition(self, agent_id: UUID):
+        """Wait for an in-progress hibernation or rehydration of an agent"""
+        while agent_id in self._transitions:
+            await asyncio.shield(self._transitions[agent_id])
 
 # Global runtime instance
 _agent_runtime: Optional[AgentRuntime] = None
@@ -188,7 +462,16 @@ def get_agent_runtime() -> AgentRuntime:
     """Get or create agent runtime instance"""
     global _agent_runtime
     if _agent_runtime is None:
-        _agent_runtime = AgentRuntime()
+        from src.services.conversation_buffer import get_conversation_buffer
+        from src.services.message_store import get_message_store
+        message_store = get_message_store()
+        _agent_runtime = AgentRuntime(
+            offline_mailbox=DatabaseOfflineMailbox(
+                conversation_buffer=get_conversation_buffer(),
+                message_store=message_store
+            ),
+            message_store=message_store
+        )
     return _agent_runtime
 
 __all__ = [
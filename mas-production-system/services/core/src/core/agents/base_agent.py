@@ -3,14 +3,19 @@ Base agent implementation with complete BDI architecture
 """
 
 import asyncio
+import time
 from abc import ABC, abstractmethod
 from typing import Dict, List, Any, Optional
-from uuid import UUID
+from uuid import UUID, uuid4
 from datetime import datetime
 from dataclasses import dataclass, field
 
 from src.services.llm_service import LLMService
-from src.services.tool_service import ToolService
+from src.services.llm_limiter import llm_priority
+from src.services.tool_service import get_tool_service
+from src.core.agents.queues import TaskQueue, Mailbox, MailboxStatus
+from src.core.agents.messages import AgentMessage
+from src.core.agents.protocols import protocol_of
 from src.utils.logger import get_logger
 from src.config import settings
 
@@ -35,6 +40,17 @@ class AgentContext:
 class BaseAgent(ABC):
     """Base class for all agents"""
     
+    # Agent type name used for configuration lookups and metrics labels
+    agent_type: str = "base"
+    
+    # Seconds between two BDI cycles (overridable per agent type via
+    # settings.AGENT_BDI_CYCLE_INTERVALS and per instance via kwargs)
+    bdi_cycle_interval: float = 5.0
+    
+    # Tasks of this priority or higher interrupt a running BDI cycle
+    # between its phases instead of waiting for it to finish
+    preempt_priority: str = "critical"
+    
     def __init__(
         self,
         agent_id: UUID,
@@ -50,6 +66,9 @@ class BaseAgent(ABC):
         self.role = role
         self.capabilities = capabilities
         self.llm_service = llm_service
+        self.owner_id = kwargs.get('owner_id')
+        self.runtime = None  # Set by AgentRuntime.register_agent
+        self._init_kwargs = kwargs  # Needed to rebuild the agent after hibernation
         
         # BDI model
         self.bdi = BDI(
@@ -61,20 +80,41 @@ class BaseAgent(ABC):
         # Execution context
         self.context = AgentContext(agent_id=agent_id)
         
-        # Tools
-        self.tool_service = ToolService()
+        # Tools (shared service, read-only view per capability set)
+        self.tool_service = get_tool_service()
         self.tools = {}
         self._load_tools()
         
         # Runtime state
         self._running = False
-        self._tasks = asyncio.Queue()
-        self._message_queue = asyncio.Queue()
+        self._tasks = TaskQueue(f"agent_tasks:{self.agent_type}")  # Priority, then deadline
+        self._message_queue = Mailbox(
+            capacity=kwargs.get('mailbox_capacity', settings.AGENT_MAILBOX_CAPACITY),
+            policy=kwargs.get('mailbox_policy', settings.AGENT_MAILBOX_POLICY),
+            agent_type=self.agent_type,
+            spill_key=f"agent_mailbox_spill:{agent_id}",
+            block_timeout=settings.AGENT_MAILBOX_BLOCK_TIMEOUT
+        )
+        # Messages handed to handle_messages at once (1 disables batching),
+        # and seconds to wait for more once a message is in
+        self.message_batch_size = kwargs.get('message_batch_size', settings.AGENT_MESSAGE_BATCH_SIZE)
+        self.message_batch_window = kwargs.get('message_batch_window', settings.AGENT_MESSAGE_BATCH_WINDOW)
+        self._wakeup = asyncio.Event()  # Set whenever the run loop has work to do
+        self._bdi_requested = False
+        self._external_bdi_clock = False  # True when a runtime timer drives BDI cycles
+        self._holding_bdi_slot = False  # True while a BDI cycle holds a runtime budget slot
+        self.last_activity = time.monotonic()  # Last message or task, drives hibernation
+        self.bdi_cycle_interval = kwargs.get(
+            'bdi_cycle_interval',
+            settings.AGENT_BDI_CYCLE_INTERVALS.get(self.agent_type, self.bdi_cycle_interval)
+        )
         
         # Performance metrics
         self.metrics = {
             "actions_executed": 0,
             "messages_processed": 0,
+            "messages_sent": 0,
+            "message_batches": 0,
             "tasks_completed": 0,
             "errors": 0,
             "start_time": None,
@@ -83,9 +123,7 @@ class BaseAgent(ABC):
     
     def _load_tools(self):
         """Load tools based on capabilities"""
-        for capability in self.capabilities:
-            tools = self.tool_service.get_tools_for_capability(capability)
-            self.tools.update(tools)
+        self.tools = self.tool_service.get_tools_for_capabilities(self.capabilities)
     
     @abstractmethod
     async def perceive(self, environment: Dict[str, Any]) -> Dict[str, Any]:
@@ -126,44 +164,42 @@ class BaseAgent(ABC):
             logger.debug(f"Agent {self.name} dropped intention: {intention}")
     
     async def run(self):
-        """Main agent execution loop"""
+        """Main agent execution loop
+        
+        The loop is event driven: between iterations the agent sleeps until a
+        message or task arrives, its next BDI cycle is due, or it is stopped.
+        """
         self._running = True
         self.metrics["start_time"] = datetime.utcnow()
         
         logger.info(f"Agent {self.name} starting...")
         
-        # Track BDI cycle timing
-        last_bdi_cycle = asyncio.get_event_loop().time()  # Start with current time to delay first BDI cycle
-        bdi_cycle_interval = 5.0  # Run BDI cycle every 5 seconds
+        loop = asyncio.get_running_loop()
+        # Delay the first BDI cycle by one interval, unless a runtime timer
+        # schedules BDI cycles through request_bdi_cycle()
+        next_bdi_cycle = None if self._external_bdi_clock else loop.time() + self.bdi_cycle_interval
         
         try:
-            iteration = 0
             while self._running:
-                iteration += 1
-                current_time = asyncio.get_event_loop().time()
-                
-                # Debug every 10 iterations
-                if iteration % 10 == 0:
-                    logger.info(f"Agent {self.name} loop iteration {iteration}, queue size: {self._message_queue.qsize()}")
-                
                 # ALWAYS process messages first (high priority)
                 if not self._message_queue.empty():
-                    logger.info(f"Agent {self.name} has {self._message_queue.qsize()} messages to process")
+                    logger.debug(f"Agent {self.name} has {self._message_queue.qsize()} messages to process")
                     await self._process_messages()
-                else:
-                    logger.debug(f"Agent {self.name} no messages in queue")
                 
                 # Check for tasks
                 await self._process_tasks()
                 
                 # BDI cycle - run periodically, not every loop iteration
-                if current_time - last_bdi_cycle > bdi_cycle_interval:
+                if self._running and self._bdi_cycle_due(loop.time(), next_bdi_cycle):
                     logger.info(f"Agent {self.name} starting BDI cycle")
+                    self._bdi_requested = False
                     await self._bdi_cycle()
-                    last_bdi_cycle = current_time
+                    if next_bdi_cycle is not None:
+                        next_bdi_cycle = loop.time() + self.bdi_cycle_interval
                 
-                # Small delay to prevent CPU spinning
-                await asyncio.sleep(0.1)
+                await self._wait_for_work(
+                    None if next_bdi_cycle is None else next_bdi_cycle - loop.time()
+                )
                 
         except Exception as e:
             logger.error(f"Error in agent {self.name} loop: {str(e)}")
@@ -174,24 +210,82 @@ class BaseAgent(ABC):
             self.metrics["total_runtime"] += runtime.total_seconds()
             logger.info(f"Agent {self.name} stopped")
     
+    def _bdi_cycle_due(self, now: float, next_bdi_cycle: Optional[float]) -> bool:
+        """Check whether a BDI cycle was requested or its deadline has passed"""
+        if self._bdi_requested:
+            return True
+        return next_bdi_cycle is not None and now >= next_bdi_cycle
+    
+    def _has_pending_work(self) -> bool:
+        """Check whether the run loop has something to do right now"""
+        return (
+            self._bdi_requested
+            or not self._message_queue.empty()
+            or not self._tasks.empty()
+        )
+    
+    async def _wait_for_work(self, timeout: Optional[float]):
+        """Sleep until woken up by new work or a stop, or until timeout expires"""
+        if not self._running or self._has_pending_work():
+            return
+        
+        self._wakeup.clear()
+        try:
+            await asyncio.wait_for(
+                self._wakeup.wait(),
+                timeout=None if timeout is None else max(timeout, 0)
+            )
+        except asyncio.TimeoutError:
+            pass
+    
+    def use_external_bdi_clock(self):
+        """Let an external timer drive BDI cycles (must be called before run)"""
+        self._external_bdi_clock = True
+    
+    def request_bdi_cycle(self):
+        """Ask the run loop to execute a BDI cycle as soon as possible"""
+        self._bdi_requested = True
+        self._wakeup.set()
+    
     async def _bdi_cycle(self):
-        """Execute one BDI cycle"""
+        """Execute one BDI cycle within the runtime's BDI concurrency budget
+        
+        Its LLM calls run in the background lane: interactive calls (tasks,
+        messages) are admitted first when the provider is saturated.
+        """
+        with llm_priority("background"):
+            if self.runtime is None:
+                await self._execute_bdi_cycle()
+                return
+            
+            async with self.runtime.bdi_executor.slot(self.owner_id, self.agent_type):
+                self._holding_bdi_slot = True
+                try:
+                    await self._execute_bdi_cycle()
+                finally:
+                    self._holding_bdi_slot = False
+    
+    async def _execute_bdi_cycle(self):
+        """Perceive, deliberate and act once"""
         try:
             logger.debug(f"Agent {self.name} starting BDI cycle")
             
             # Perceive
             perceptions = await self.perceive(self.context.environment)
             await self.update_beliefs(perceptions)
+            await self._preemption_point()
             
             # Deliberate
             new_intentions = await self.deliberate()
             for intention in new_intentions:
                 await self.commit_to_intention(intention)
+            await self._preemption_point()
             
             # Act
             if self.bdi.intentions:
                 actions = await self.act()
                 for action in actions:
+                    await self._preemption_point()
                     await self._execute_action(action)
             
             logger.debug(f"Agent {self.name} completed BDI cycle")
@@ -241,60 +335,210 @@ class BaseAgent(ABC):
             })
     
     async def _send_message(self, action: Dict[str, Any]):
-        """Send a message to another agent"""
-        # Implementation depends on messaging system
-        pass
+        """Send a message to another agent through the runtime"""
+        message = AgentMessage(
+            id=str(uuid4()),
+            sender=str(self.agent_id),
+            receiver=str(action.get("receiver")),
+            performative=action.get("performative", "inform"),
+            content=action.get("content", {}),
+            conversation_id=action.get("conversation_id"),
+            in_reply_to=action.get("in_reply_to")
+        )
+        if self.runtime is None:
+            logger.warning(f"Agent {self.name} is not registered in a runtime, message to {message.receiver} dropped")
+            return
+        
+        await self.runtime.send_message(message)
+        self.metrics["messages_sent"] += 1
     
     async def _process_messages(self):
         """Process incoming messages"""
+        if self.message_batch_size > 1:
+            await self._process_message_batches()
+            return
+        
         while not self._message_queue.empty():
-            message = await self._message_queue.get()
-            logger.info(f"Agent {self.name} processing message from queue")
+            try:
+                message = await self._message_queue.get()
+            except asyncio.QueueEmpty:
+                break  # Spilled messages not readable yet
+            logger.debug(f"Agent {self.name} processing message from queue")
             try:
                 await self.handle_message(message)
                 self.metrics["messages_processed"] += 1
-                logger.info(f"Agent {self.name} successfully processed message")
+                self.last_activity = time.monotonic()
+                logger.debug(f"Agent {self.name} successfully processed message")
             except Exception as e:
                 logger.error(f"Error processing message: {str(e)}", exc_info=True)
                 self.metrics["errors"] += 1
     
-    async def _process_tasks(self):
-        """Process assigned tasks"""
-        while not self._tasks.empty():
-            task = await self._tasks.get()
-            self.context.current_task = task
+    async def _process_message_batches(self):
+        """Process incoming messages in batches through handle_messages"""
+        while not self._message_queue.empty():
+            batch = await self._collect_message_batch()
+            if not batch:
+                break  # Spilled messages not readable yet
+            logger.debug(f"Agent {self.name} processing a batch of {len(batch)} messages")
             try:
-                await self.handle_task(task)
-                self.metrics["tasks_completed"] += 1
+                await self.handle_messages(batch)
+                self.metrics["messages_processed"] += len(batch)
+                self.metrics["message_batches"] += 1
+                self.last_activity = time.monotonic()
             except Exception as e:
-                logger.error(f"Error processing task: {str(e)}")
+                logger.error(f"Error processing message batch: {str(e)}", exc_info=True)
                 self.metrics["errors"] += 1
-            finally:
-                self.context.current_task = None
+    
+    async def _collect_message_batch(self) -> List[Any]:
+        """Take up to message_batch_size messages, waiting message_batch_window for stragglers"""
+        batch = []
+        deadline = asyncio.get_running_loop().time() + self.message_batch_window
+        while len(batch) < self.message_batch_size:
+            if not self._message_queue.empty():
+                try:
+                    batch.append(await self._message_queue.get())
+                    continue
+                except asyncio.QueueEmpty:
+                    break  # Spilled messages not readable yet
+            
+            remaining = deadline - asyncio.get_running_loop().time()
+            if not batch or remaining <= 0 or not self._running:
+                break
+            # receive_message sets the wakeup event; a task arriving meanwhile
+            # only ends the wait early, _wait_for_work still sees it queued
+            self._wakeup.clear()
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout=remaining)
+            except asyncio.TimeoutError:
+                pass
+        return batch
+    
+    async def _process_tasks(self):
+        """Process assigned tasks, most urgent first"""
+        while not self._tasks.empty():
+            await self._process_task(self._tasks.get_nowait())
+    
+    async def _preemption_point(self):
+        """Run urgent tasks that arrived during a BDI cycle before resuming it
+        
+        The cycle's budget slot is given back while they run, and waited
+        for again, in turn with the other owners, before the cycle resumes.
+        """
+        if not self._tasks.has_task_at_least(self.preempt_priority):
+            return
+        if not self._holding_bdi_slot:
+            await self._run_urgent_tasks()
+            return
+        
+        self._holding_bdi_slot = False
+        try:
+            async with self.runtime.bdi_executor.suspended(self.owner_id):
+                await self._run_urgent_tasks()
+        finally:
+            self._holding_bdi_slot = True
+    
+    async def _run_urgent_tasks(self):
+        while self._tasks.has_task_at_least(self.preempt_priority):
+            logger.debug(f"Agent {self.name} preempting BDI cycle for an urgent task")
+            await self._process_task(self._tasks.get_nowait())
+    
+    async def _process_task(self, task: Any):
+        """Process a single task"""
+        previous_task = self.context.current_task
+        self.context.current_task = task
+        try:
+            # Tasks preempting a BDI cycle are still interactive
+            with llm_priority("interactive"):
+                await self.handle_task(task)
+            self.metrics["tasks_completed"] += 1
+            self.last_activity = time.monotonic()
+        except Exception as e:
+            logger.error(f"Error processing task: {str(e)}")
+            self.metrics["errors"] += 1
+        finally:
+            self._tasks.task_done()
+            self.context.current_task = previous_task
     
     @abstractmethod
     async def handle_message(self, message: Any):
         """Handle incoming message"""
         pass
     
+    async def handle_messages(self, messages: List[Any]):
+        """Handle a batch of messages (batch mode, see message_batch_size)
+        
+        Agents override this to coalesce work across messages, e.g. one LLM
+        call for the whole batch. The default handles them one by one.
+        """
+        for message in messages:
+            try:
+                await self.handle_message(message)
+            except Exception as e:
+                logger.error(f"Error processing message: {str(e)}", exc_info=True)
+                self.metrics["errors"] += 1
+    
     @abstractmethod
     async def handle_task(self, task: Any):
         """Handle assigned task"""
         pass
     
-    async def receive_message(self, message: Any):
-        """Receive a message (called by environment)"""
-        logger.info(f"Agent {self.name} received message, adding to queue")
-        await self._message_queue.put(message)
-        logger.info(f"Agent {self.name} message queue size: {self._message_queue.qsize()}")
+    async def receive_message(self, message: Any) -> MailboxStatus:
+        """Receive a message (called by environment)
+        
+        Returns what the mailbox did with it; REJECTED means the agent is
+        overloaded and the sender should back off. Protocol messages
+        (contract-net, subscribe) are handled by the runtime's protocol
+        engine instead.
+        """
+        if self.runtime is not None and protocol_of(message) is not None:
+            self.last_activity = time.monotonic()
+            if await self.runtime.protocols.receive(self, message):
+                return MailboxStatus.ACCEPTED
+        status = await self._message_queue.put(message)
+        if status.accepted:
+            self.last_activity = time.monotonic()
+            self._wakeup.set()
+        logger.debug(f"Agent {self.name} mailbox {status.value}, depth {self._message_queue.qsize()}")
+        return status
+    
+    async def contract_bid(self, task: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        """Proposal for a contract-net call for proposals, None to refuse
+        
+        By default agents having the task's required capabilities bid their
+        backlog as cost.
+        """
+        required = task.get("capabilities") or []
+        if not set(required) <= set(self.capabilities):
+            return None
+        return {"cost": self._tasks.qsize() + self._message_queue.qsize()}
+    
+    async def contract_awarded(self, task: Dict[str, Any], conversation_id: Optional[str] = None):
+        """Take on the task of a contract-net round this agent won"""
+        await self.add_task(task)
+    
+    @property
+    def mailbox_pressure(self) -> float:
+        """Fill ratio of the in-memory mailbox (1.0 when full)"""
+        return self._message_queue.pressure
     
     async def add_task(self, task: Any):
         """Add a task to the agent's queue"""
         await self._tasks.put(task)
+        self.last_activity = time.monotonic()
+        self._wakeup.set()
+    
+    def drop_pending_tasks(self) -> int:
+        """Discard queued tasks, returns how many were dropped"""
+        return self._tasks.clear()
+    
+    async def drop_pending_messages(self) -> int:
+        """Discard queued messages (spilled ones included), returns how many were dropped"""
+        return await self._message_queue.clear()
     
     async def stop(self):
         """Stop agent execution"""
         self._running = False
+        self._wakeup.set()
     
     async def get_metrics(self) -> Dict[str, Any]:
         """Get agent performance metrics"""
@@ -307,6 +551,47 @@ class BaseAgent(ABC):
             "working_memory_size": len(self.context.working_memory)
         }
     
+    def is_idle(self) -> bool:
+        """Check whether the agent has no queued work"""
+        return not self._has_pending_work() and self.context.current_task is None
+    
+    def spec(self) -> Dict[str, Any]:
+        """JSON-serializable parameters needed to rebuild this agent"""
+        return {
+            "agent_type": self.agent_type,
+            "agent_id": str(self.agent_id),
+            "name": self.name,
+            "role": self.role,
+            "capabilities": list(self.capabilities),
+            "owner_id": str(self.owner_id) if self.owner_id else None,
+            "configuration": {
+                key: value for key, value in self._init_kwargs.items()
+                if key not in ("owner_id", "initial_beliefs", "initial_desires")
+            }
+        }
+    
+    def snapshot_state(self) -> Dict[str, Any]:
+        """Mutable agent state saved on hibernation (extend in subclasses)"""
+        return {
+            "beliefs": self.bdi.beliefs,
+            "desires": self.bdi.desires,
+            "intentions": self.bdi.intentions,
+            "environment": self.context.environment,
+            "conversation_history": self.context.conversation_history,
+            "working_memory": self.context.working_memory,
+            "metrics": {k: v for k, v in self.metrics.items() if k != "start_time"}
+        }
+    
+    def restore_state(self, state: Dict[str, Any]):
+        """Restore the state produced by snapshot_state (extend in subclasses)"""
+        self.bdi.beliefs = state.get("beliefs", {})
+        self.bdi.desires = state.get("desires", [])
+        self.bdi.intentions = state.get("intentions", [])
+        self.context.environment = state.get("environment", {})
+        self.context.conversation_history = state.get("conversation_history", [])
+        self.context.working_memory = state.get("working_memory", [])
+        self.metrics.update(state.get("metrics", {}))
+    
     async def update_configuration(self, config: Dict[str, Any]):
         """Update agent configuration at runtime"""
         # Update relevant configuration
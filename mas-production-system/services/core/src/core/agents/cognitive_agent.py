@@ -3,7 +3,7 @@ Cognitive agent with LLM-based reasoning
 """
 
 import json
-from typing import Dict, List, Any, Optional
+from typing import Dict, List, Any, Optional, Tuple
 from uuid import UUID
 from datetime import datetime
 
@@ -16,6 +16,8 @@ logger = get_logger(__name__)
 class CognitiveAgent(BaseAgent):
     """Cognitive agent with advanced reasoning capabilities"""
     
+    agent_type = "cognitive"
+    
     def __init__(
         self,
         agent_id: UUID,
@@ -50,6 +52,33 @@ class CognitiveAgent(BaseAgent):
         self.confidence_threshold = kwargs.get('confidence_threshold', 0.7)
         self.uncertainty_buffer = []
     
+    def snapshot_state(self) -> Dict[str, Any]:
+        """Include memories and learned plans in the hibernation snapshot"""
+        state = super().snapshot_state()
+        state.update({
+            "episodic_memory": self.episodic_memory,
+            "semantic_memory": self.semantic_memory,
+            "procedural_memory": self.procedural_memory,
+            "reasoning_history": self.reasoning_history,
+            "plan_library": self.plan_library,
+            "current_plan": self.current_plan,
+            "confidence_threshold": self.confidence_threshold,
+            "uncertainty_buffer": self.uncertainty_buffer
+        })
+        return state
+    
+    def restore_state(self, state: Dict[str, Any]):
+        """Restore memories and learned plans from a hibernation snapshot"""
+        super().restore_state(state)
+        self.episodic_memory = state.get("episodic_memory", [])
+        self.semantic_memory = state.get("semantic_memory", [])
+        self.procedural_memory = state.get("procedural_memory", {})
+        self.reasoning_history = state.get("reasoning_history", [])
+        self.plan_library = state.get("plan_library", {})
+        self.current_plan = state.get("current_plan")
+        self.confidence_threshold = state.get("confidence_threshold", self.confidence_threshold)
+        self.uncertainty_buffer = state.get("uncertainty_buffer", [])
+    
     async def perceive(self, environment: Dict[str, Any]) -> Dict[str, Any]:
         """Enhanced perception with semantic interpretation"""
         
@@ -476,23 +505,12 @@ class CognitiveAgent(BaseAgent):
         
         logger.info(f"Cognitive agent {self.name} handling message")
         
-        # Add to conversation history
-        self.context.conversation_history.append({
-            "type": "received",
-            "message": message,
-            "timestamp": datetime.utcnow().isoformat()
-        })
-        
-        # Extract message details safely
-        try:
-            sender = getattr(message, 'sender', getattr(message, 'sender_id', 'unknown'))
-            performative = getattr(message, 'performative', 'unknown')
-            content = getattr(message, 'content', {})
-            
-            logger.info(f"Message details - From: {sender}, Type: {performative}, Content: {content}")
-        except Exception as e:
-            logger.error(f"Error extracting message details: {e}")
-            return
+        details = self._receive_for_interpretation(message)
+        if details is not None:
+            await self._interpret_message(*details)
+    
+    async def _interpret_message(self, sender: Any, performative: Any, content: Any):
+        """Interpret one message with its own LLM call and act on it"""
         
         # Interpret message
         interpretation_prompt = f"""
@@ -532,32 +550,136 @@ class CognitiveAgent(BaseAgent):
             else:
                 result = {}
             
-            # Update beliefs based on message
-            if result.get("belief_updates"):
-                await self.update_beliefs(result["belief_updates"])
+            await self._apply_interpretation(sender, result)
             
-            # Modify intentions if needed
-            if result.get("intention_changes"):
-                for change in result["intention_changes"]:
-                    if change["action"] == "add":
-                        await self.commit_to_intention(change["intention"])
-                    elif change["action"] == "remove":
-                        await self.drop_intention(change["intention"])
+        except Exception as e:
+            logger.error(f"Failed to handle message: {str(e)}")
+    
+    async def handle_messages(self, messages: List[Any]):
+        """Interpret a batch of messages with a single LLM call
+        
+        The reply holds one interpretation per message, matched back by
+        index; messages it leaves out are handled one by one.
+        """
+        if len(messages) == 1:
+            await self.handle_message(messages[0])
+            return
+        
+        logger.info(f"Cognitive agent {self.name} handling {len(messages)} messages")
+        
+        batch = []
+        for message in messages:
+            details = self._receive_for_interpretation(message)
+            if details is not None:
+                batch.append(details)
+        if not batch:
+            return
+        
+        listing = "\n".join(
+            f"[{index}] From: {sender} | Performative: {performative} | Content: {json.dumps(content, default=str)}"
+            for index, (sender, performative, content) in enumerate(batch)
+        )
+        interpretation_prompt = f"""
+        You are {self.name}, a {self.role} agent.
+        
+        You received {len(batch)} messages:
+        {listing}
+        
+        Current context:
+        - Current task: {self.context.current_task}
+        - Intentions: {self.bdi.intentions}
+        
+        Interpret each message and determine:
+        1. What is the sender's intent?
+        2. How does this relate to your current goals?
+        3. What beliefs should be updated?
+        4. Should you modify your intentions?
+        5. What response is appropriate?
+        
+        Return a JSON object {{"interpretations": [...]}} with one analysis and
+        proposed response per message, each with the "index" of its message.
+        """
+        
+        try:
+            response = await self.llm_service.generate(
+                prompt=interpretation_prompt,
+                system_prompt="You are interpreting communication to coordinate effectively.",
+                temperature=0.4,
+                json_response=True,
+                max_tokens=min(400 * len(batch), 4000)
+            )
             
-            # Generate response if appropriate
-            if result.get("response"):
-                response_action = {
-                    "type": "send_message",
-                    "receiver": message.sender,
-                    "content": result["response"]["content"],
-                    "performative": result["response"].get("performative", "inform")
-                }
-                
-                # Execute response
-                await self._execute_action(response_action)
+            if isinstance(response, dict) and response.get('success'):
+                result = response.get('response', {})
+            else:
+                result = {}
+            interpretations = {}
+            if isinstance(result, dict):
+                for item in result.get("interpretations") or []:
+                    if isinstance(item, dict) and isinstance(item.get("index"), int):
+                        interpretations[item["index"]] = item
+        except Exception as e:
+            logger.error(f"Failed to interpret message batch: {str(e)}")
+            interpretations = {}
+        
+        for index, (sender, performative, content) in enumerate(batch):
+            if index not in interpretations:
+                # Left out of the batch reply, fall back to a dedicated call
+                await self._interpret_message(sender, performative, content)
+                continue
+            try:
+                await self._apply_interpretation(sender, interpretations[index])
+            except Exception as e:
+                logger.error(f"Failed to handle message: {str(e)}")
+    
+    def _receive_for_interpretation(self, message: Any) -> Optional[Tuple[Any, Any, Any]]:
+        """Record a received message and extract (sender, performative, content)"""
+        
+        # Add to conversation history
+        self.context.conversation_history.append({
+            "type": "received",
+            "message": message,
+            "timestamp": datetime.utcnow().isoformat()
+        })
+        
+        # Extract message details safely
+        try:
+            sender = getattr(message, 'sender', getattr(message, 'sender_id', 'unknown'))
+            performative = getattr(message, 'performative', 'unknown')
+            content = getattr(message, 'content', {})
             
+            logger.info(f"Message details - From: {sender}, Type: {performative}, Content: {content}")
         except Exception as e:
-            logger.error(f"Failed to handle message: {str(e)}")
+            logger.error(f"Error extracting message details: {e}")
+            return None
+        return sender, performative, content
+    
+    async def _apply_interpretation(self, sender: Any, result: Dict[str, Any]):
+        """Update beliefs and intentions from a message interpretation, and reply"""
+        
+        # Update beliefs based on message
+        if result.get("belief_updates"):
+            await self.update_beliefs(result["belief_updates"])
+        
+        # Modify intentions if needed
+        if result.get("intention_changes"):
+            for change in result["intention_changes"]:
+                if change["action"] == "add":
+                    await self.commit_to_intention(change["intention"])
+                elif change["action"] == "remove":
+                    await self.drop_intention(change["intention"])
+        
+        # Generate response if appropriate
+        if result.get("response"):
+            response_action = {
+                "type": "send_message",
+                "receiver": sender,
+                "content": result["response"]["content"],
+                "performative": result["response"].get("performative", "inform")
+            }
+            
+            # Execute response
+            await self._execute_action(response_action)
     
     async def handle_task(self, task: Any):
         """Handle assigned tasks intelligently"""
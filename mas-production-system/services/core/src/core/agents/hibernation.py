@@ -0,0 +1,69 @@
+"""
+Storage of hibernated agent snapshots
+"""
+
+import json
+from abc import ABC, abstractmethod
+from typing import Any, Dict, Optional
+from uuid import UUID
+
+from src.cache import get as cache_get, set as cache_set, delete as cache_delete
+from src.utils.logger import get_logger
+
+logger = get_logger(__name__)
+
+
+class HibernationStore(ABC):
+    """Keeps the snapshots of hibernated agents out of process memory"""
+
+    @abstractmethod
+    async def save(self, agent_id: UUID, snapshot: Dict[str, Any]):
+        """Persist an agent snapshot"""
+
+    @abstractmethod
+    async def load(self, agent_id: UUID) -> Optional[Dict[str, Any]]:
+        """Load an agent snapshot, None if there is none"""
+
+    @abstractmethod
+    async def delete(self, agent_id: UUID):
+        """Forget an agent snapshot"""
+
+
+class RedisHibernationStore(HibernationStore):
+    """Snapshots stored as JSON strings in Redis"""
+
+    def __init__(self, prefix: str = "agent_snapshot"):
+        self.prefix = prefix
+
+    def _key(self, agent_id: UUID) -> str:
+        return f"{self.prefix}:{agent_id}"
+
+    async def save(self, agent_id: UUID, snapshot: Dict[str, Any]):
+        await cache_set(self._key(agent_id), json.dumps(snapshot, default=str))
+
+    async def load(self, agent_id: UUID) -> Optional[Dict[str, Any]]:
+        data = await cache_get(self._key(agent_id))
+        return json.loads(data) if data else None
+
+    async def delete(self, agent_id: UUID):
+        await cache_delete(self._key(agent_id))
+
+
+class InMemoryHibernationStore(HibernationStore):
+    """Snapshots kept as compact JSON strings in this process (tests, no Redis)"""
+
+    def __init__(self):
+        self._snapshots: Dict[UUID, str] = {}
+
+    async def save(self, agent_id: UUID, snapshot: Dict[str, Any]):
+        self._snapshots[agent_id] = json.dumps(snapshot, default=str)
+
+    async def load(self, agent_id: UUID) -> Optional[Dict[str, Any]]:
+        data = self._snapshots.get(agent_id)
+        return json.loads(data) if data else None
+
+    async def delete(self, agent_id: UUID):
+        self._snapshots.pop(agent_id, None)
+
+
+__all__ = ["HibernationStore", "RedisHibernationStore", "InMemoryHibernationStore"]
@@ -19,6 +19,8 @@ class HybridAgent(BaseAgent):
     Uses reflexive mode for quick responses and cognitive mode for complex reasoning
     """
     
+    agent_type = "hybrid"
+    
     def __init__(
         self,
         agent_id: UUID,
@@ -61,6 +63,29 @@ class HybridAgent(BaseAgent):
             "success_rate": 1.0
         }
     
+    def snapshot_state(self) -> Dict[str, Any]:
+        """Include rules, threshold and mode statistics in the hibernation snapshot"""
+        state = super().snapshot_state()
+        state.update({
+            "reactive_rules": self.reactive_rules,
+            "cognitive_threshold": self.cognitive_threshold,
+            "current_mode": self.current_mode,
+            "mode_history": self.mode_history,
+            "reflexive_system": self.reflexive_system,
+            "cognitive_system": self.cognitive_system
+        })
+        return state
+    
+    def restore_state(self, state: Dict[str, Any]):
+        """Restore rules, threshold and mode statistics from a hibernation snapshot"""
+        super().restore_state(state)
+        self.reactive_rules = state.get("reactive_rules", self.reactive_rules)
+        self.cognitive_threshold = state.get("cognitive_threshold", self.cognitive_threshold)
+        self.current_mode = state.get("current_mode", self.current_mode)
+        self.mode_history = state.get("mode_history", [])
+        self.reflexive_system = state.get("reflexive_system", self.reflexive_system)
+        self.cognitive_system = state.get("cognitive_system", self.cognitive_system)
+    
     async def perceive(self, environment: Dict[str, Any]) -> Dict[str, Any]:
         """Perceive environment and assess complexity"""
         # Ensure environment is not None
@@ -0,0 +1,63 @@
+"""
+In-memory representation of a message handed to an agent
+"""
+
+from dataclasses import dataclass, field
+from typing import Any, Dict, Optional
+from uuid import uuid4
+
+# FIPA-ACL performatives accepted by the messages table
+PERFORMATIVES = ('inform', 'request', 'propose', 'accept', 'reject', 'query', 'subscribe')
+
+
+@dataclass
+class AgentMessage:
+    """Message as seen by BaseAgent.receive_message/handle_message"""
+    id: Optional[str] = field(default_factory=lambda: str(uuid4()))
+    sender: Any = "Unknown"
+    receiver: Optional[str] = None
+    performative: str = "inform"
+    content: Any = field(default_factory=dict)
+    conversation_id: Optional[str] = None
+    in_reply_to: Optional[str] = None
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "AgentMessage":
+        """Build from a delivery payload (sender_id/receiver_id keys)"""
+        return cls(
+            id=data.get('id'),
+            sender=data.get('sender_id', 'Unknown'),
+            receiver=data.get('receiver_id'),
+            performative=data.get('performative', 'inform'),
+            content=data.get('content', {}),
+            conversation_id=data.get('conversation_id'),
+            in_reply_to=data.get('in_reply_to')
+        )
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Delivery payload, inverse of from_dict"""
+        return {
+            "id": self.id,
+            "sender_id": self.sender,
+            "receiver_id": self.receiver,
+            "performative": self.performative,
+            "content": self.content,
+            "conversation_id": self.conversation_id,
+            "in_reply_to": self.in_reply_to
+        }
+
+    @classmethod
+    def from_model(cls, message: Any) -> "AgentMessage":
+        """Build from a Message row (or any object with its columns)"""
+        return cls(
+            id=str(message.id),
+            sender=str(message.sender_id),
+            receiver=str(message.receiver_id),
+            performative=message.performative,
+            content=message.content,
+            conversation_id=str(message.conversation_id) if message.conversation_id else None,
+            in_reply_to=str(message.in_reply_to) if message.in_reply_to else None
+        )
+
+
+__all__ = ["PERFORMATIVES", "AgentMessage"]
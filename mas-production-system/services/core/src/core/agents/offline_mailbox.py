@@ -0,0 +1,125 @@
+"""
+Durable offline mailbox: messages stored while an agent was not running
+"""
+
+from abc import ABC, abstractmethod
+from typing import Any, AsyncIterator, Callable, Dict, List, Optional
+from uuid import UUID
+
+from sqlalchemy import select, tuple_, update
+
+from src.core.agents.messages import AgentMessage
+from src.database import AsyncSessionLocal
+from src.database.models import Message
+from src.config import settings
+from src.utils.logger import get_logger
+
+logger = get_logger(__name__)
+
+
+class OfflineMailbox(ABC):
+    """Source of the messages an agent has not received yet"""
+
+    @abstractmethod
+    def pending(self, agent_id: UUID) -> AsyncIterator[List[AgentMessage]]:
+        """Yield pages of undelivered messages, oldest first"""
+
+    @abstractmethod
+    async def mark_delivered(self, message_ids: List[str]):
+        """Record that messages reached the agent's mailbox"""
+
+
+class DatabaseOfflineMailbox(OfflineMailbox):
+    """Unread Message rows, read with keyset pagination
+
+    Each page is one query on ix_messages_receiver_unread
+    (receiver_id, is_read, created_at, id) continuing after the last
+    (created_at, id) seen, so the cost of a page does not depend on how
+    far the replay went and only one page is held in memory. Conversations
+    whose messages are marked read are dropped from `conversation_buffer`.
+    Messages not written yet by `message_store` (write-behind) are marked
+    read there, so they are not inserted unread after delivery.
+    """
+
+    def __init__(
+        self,
+        session_factory: Callable = AsyncSessionLocal,
+        page_size: Optional[int] = None,
+        conversation_buffer: Optional[Any] = None,
+        message_store: Optional[Any] = None
+    ):
+        self.session_factory = session_factory
+        self.page_size = page_size or settings.AGENT_REPLAY_PAGE_SIZE
+        self.conversation_buffer = conversation_buffer
+        self.message_store = message_store
+
+    async def pending(self, agent_id: UUID) -> AsyncIterator[List[AgentMessage]]:
+        after = None
+        while True:
+            stmt = select(
+                Message.id, Message.sender_id, Message.receiver_id, Message.performative,
+                Message.content, Message.conversation_id, Message.in_reply_to, Message.created_at
+            ).where(
+                Message.receiver_id == agent_id,
+                Message.is_read == False
+            )
+            if after is not None:
+                stmt = stmt.where(tuple_(Message.created_at, Message.id) > after)
+            stmt = stmt.order_by(Message.created_at, Message.id).limit(self.page_size)
+
+            async with self.session_factory() as db:
+                rows = (await db.execute(stmt)).all()
+            if not rows:
+                return
+
+            yield [AgentMessage.from_model(row) for row in rows]
+            if len(rows) < self.page_size:
+                return
+            after = (rows[-1].created_at, rows[-1].id)
+
+    async def mark_delivered(self, message_ids: List[str]):
+        ids = []
+        for message_id in message_ids:
+            try:
+                ids.append(message_id if isinstance(message_id, UUID) else UUID(str(message_id)))
+            except ValueError:
+                pass  # Not a stored message
+        if ids and self.message_store is not None:
+            # Rows still buffered are inserted read, the others are updated below
+            ids = [UUID(message_id) for message_id in await self.message_store.mark_read(ids)]
+        if not ids:
+            return
+        async with self.session_factory() as db:
+            result = await db.execute(
+                update(Message)
+                .where(Message.id.in_(ids))
+                .values(is_read=True)
+                .returning(Message.conversation_id)
+            )
+            conversation_ids = set(result.scalars().all())
+            await db.commit()
+        if self.conversation_buffer is not None:
+            await self.conversation_buffer.invalidate(conversation_ids)
+
+
+class InMemoryOfflineMailbox(OfflineMailbox):
+    """Offline messages kept in this process (tests, no database)"""
+
+    def __init__(self, page_size: int = 100):
+        self.page_size = page_size
+        self.messages: Dict[UUID, List[AgentMessage]] = {}
+        self.delivered: List[str] = []
+
+    def add(self, agent_id: UUID, message: AgentMessage):
+        self.messages.setdefault(agent_id, []).append(message)
+
+    async def pending(self, agent_id: UUID) -> AsyncIterator[List[AgentMessage]]:
+        unread = [m for m in self.messages.get(agent_id, []) if m.id not in self.delivered]
+        for start in range(0, len(unread), self.page_size):
+            yield unread[start:start + self.page_size]
+
+    async def mark_delivered(self, message_ids: List[str]):
+        self.delivered.extend(message_ids)
+
+
+__all__ = ["OfflineMailbox", "DatabaseOfflineMailbox", "InMemoryOfflineMailbox"]
@@ -0,0 +1,305 @@
+"""
+FIPA-ACL interaction protocols (contract-net, subscribe) run without the LLM
+"""
+
+import asyncio
+import math
+import time
+from dataclasses import dataclass, field
+from enum import IntEnum
+from typing import Any, Callable, Dict, FrozenSet, Iterable, List, Optional, Set, Tuple
+from uuid import uuid4
+
+from src.config import settings
+from src.core.agents.messages import AgentMessage
+from src.monitoring import track_protocol_round
+from src.utils.logger import get_logger
+
+logger = get_logger(__name__)
+
+CONTRACT_NET = "fipa-contract-net"
+SUBSCRIBE = "fipa-subscribe"
+
+# Protocol steps (content["step"]) and the performative they are sent with
+STEP_PERFORMATIVES = {
+    "cfp": "request",
+    "propose": "propose",
+    "refuse": "reject",
+    "accept-proposal": "accept",
+    "reject-proposal": "reject",
+    "subscribe": "subscribe",
+    "agree": "inform",
+    "cancel": "reject",
+    "inform": "inform"
+}
+
+
+def protocol_of(message: Any) -> Optional[str]:
+    """Protocol a message belongs to, None for free-form messages"""
+    content = getattr(message, "content", None)
+    if isinstance(content, dict) and content.get("protocol") in (CONTRACT_NET, SUBSCRIBE):
+        return content["protocol"]
+    return None
+
+
+class RoundState(IntEnum):
+    COLLECTING = 0
+    AWARDED = 1
+    FAILED = 2
+
+
+@dataclass(slots=True)
+class ContractNetRound:
+    """State of one call for proposals, keyed by its conversation ID"""
+    conversation_id: str
+    initiator: str
+    task: Dict[str, Any]
+    participants: FrozenSet[str]
+    proposals: Dict[str, Dict[str, Any]] = field(default_factory=dict)
+    refused: Set[str] = field(default_factory=set)
+    state: RoundState = RoundState.COLLECTING
+    done: asyncio.Event = field(default_factory=asyncio.Event)
+
+    @property
+    def pending(self) -> int:
+        return len(self.participants) - len(self.proposals) - len(self.refused)
+
+
+@dataclass(slots=True)
+class ContractNetResult:
+    """Outcome of a contract-net round"""
+    conversation_id: str
+    winner: Optional[str]
+    proposal: Optional[Dict[str, Any]]
+    proposals: Dict[str, Dict[str, Any]]
+    refused: List[str]
+    timed_out: List[str]
+    elapsed: float
+
+
+def lowest_cost(proposals: Dict[str, Dict[str, Any]]) -> Optional[str]:
+    """Default winner selection: lowest "cost", first proposal on ties"""
+    best, best_cost = None, math.inf
+    for agent_id, proposal in proposals.items():
+        cost = proposal.get("cost", math.inf)
+        if isinstance(cost, (int, float)) and cost < best_cost:
+            best, best_cost = agent_id, cost
+    return best
+
+
+class ProtocolEngine:
+    """Runs FIPA contract-net and subscribe conversations for a runtime
+
+    Protocol messages are regular agent messages (persisted, routed to other
+    shards) whose content names the protocol and step. Agents hand them to
+    the engine in receive_message, so bids, acceptances and subscriptions
+    are handled by code (BaseAgent.contract_bid/contract_awarded) instead of
+    going through the mailbox and the LLM. Informs sent to subscribers are
+    the exception: they are data for the agent and reach its mailbox.
+
+    Subscriptions live in the engine of the publisher's runtime.
+    """
+
+    def __init__(self, runtime: Any):
+        self.runtime = runtime
+        self.rounds: Dict[str, ContractNetRound] = {}
+        # (publisher, topic) -> subscriber -> lease end (monotonic, inf when unbounded)
+        self.subscriptions: Dict[Tuple[str, str], Dict[str, float]] = {}
+        self._bids: Set[asyncio.Task] = set()
+
+    async def contract_net(
+        self,
+        initiator: Any,
+        participants: Iterable[Any],
+        task: Dict[str, Any],
+        timeout: Optional[float] = None,
+        select: Callable[[Dict[str, Dict[str, Any]]], Optional[str]] = lowest_cost
+    ) -> ContractNetResult:
+        """Call for proposals, collect them until all answered or `timeout`, award the best
+
+        The winner gets an accept-proposal (and the task through
+        contract_awarded), the other bidders a reject-proposal.
+        """
+        start = time.perf_counter()
+        timeout = settings.PROTOCOL_PROPOSAL_TIMEOUT if timeout is None else timeout
+        initiator = str(initiator)
+        contract = ContractNetRound(
+            conversation_id=str(uuid4()),
+            initiator=initiator,
+            task=task,
+            participants=frozenset(str(p) for p in participants if str(p) != initiator)
+        )
+        self.rounds[contract.conversation_id] = contract
+        try:
+            cfp = {"protocol": CONTRACT_NET, "step": "cfp", "task": task, "deadline": time.time() + timeout}
+            await asyncio.gather(*(
+                self._send(initiator, participant, cfp, contract.conversation_id)
+                for participant in contract.participants
+            ))
+            if contract.pending:
+                try:
+                    await asyncio.wait_for(contract.done.wait(), timeout=timeout)
+                except asyncio.TimeoutError:
+                    pass
+        finally:
+            del self.rounds[contract.conversation_id]
+
+        winner = select(contract.proposals) if contract.proposals else None
+        contract.state = RoundState.AWARDED if winner else RoundState.FAILED
+        await asyncio.gather(*(
+            self._send(
+                initiator, bidder,
+                {"protocol": CONTRACT_NET, "step": "accept-proposal" if bidder == winner else "reject-proposal",
+                 "task": task if bidder == winner else None},
+                contract.conversation_id
+            )
+            for bidder in contract.proposals
+        ))
+
+        answered = contract.proposals.keys() | contract.refused
+        result = ContractNetResult(
+            conversation_id=contract.conversation_id,
+            winner=winner,
+            proposal=contract.proposals.get(winner),
+            proposals=contract.proposals,
+            refused=sorted(contract.refused),
+            timed_out=sorted(contract.participants - answered),
+            elapsed=time.perf_counter() - start
+        )
+        track_protocol_round(CONTRACT_NET, "awarded" if winner else "failed", result.elapsed)
+        logger.debug(
+            f"Contract-net {contract.conversation_id}: {len(contract.proposals)} proposals, "
+            f"{len(contract.refused)} refusals, {len(result.timed_out)} timeouts, winner {winner}"
+        )
+        return result
+
+    async def subscribe(self, subscriber: Any, publisher: Any, topic: str, lease: Optional[float] = None):
+        """Ask `publisher` to inform `subscriber` about `topic`, for `lease` seconds if given"""
+        await self._send(subscriber, publisher, {"protocol": SUBSCRIBE, "step": "subscribe", "topic": topic, "lease": lease})
+
+    async def unsubscribe(self, subscriber: Any, publisher: Any, topic: str):
+        """Cancel a subscription"""
+        await self._send(subscriber, publisher, {"protocol": SUBSCRIBE, "step": "cancel", "topic": topic})
+
+    async def publish(self, publisher: Any, topic: str, data: Any) -> int:
+        """Inform every live subscriber of a publisher's topic, returns how many were informed"""
+        subscribers = self.subscriptions.get((str(publisher), topic))
+        if not subscribers:
+            return 0
+        now = time.monotonic()
+        for subscriber in [s for s, lease_end in subscribers.items() if lease_end <= now]:
+            del subscribers[subscriber]
+
+        content = {"protocol": SUBSCRIBE, "step": "inform", "topic": topic, "data": data}
+        await asyncio.gather(*(self._send(publisher, subscriber, content) for subscriber in subscribers))
+        return len(subscribers)
+
+    async def receive(self, agent: Any, message: AgentMessage) -> bool:
+        """Handle a protocol message sent to `agent`, False when it belongs in the mailbox"""
+        step = message.content.get("step")
+        sender = str(message.sender)
+        handler = getattr(self, f"_on_{step.replace('-', '_')}", None) if isinstance(step, str) else None
+        if handler is None:
+            logger.warning(f"Unknown {protocol_of(message)} step {step!r} from {sender}")
+            return True
+        return await handler(agent, sender, message) is not False
+
+    # Participant side of contract-net
+
+    async def _on_cfp(self, agent: Any, sender: str, message: AgentMessage):
+        # Bid in the background: a slow bidder must not hold up the fan-out
+        task = asyncio.create_task(self._bid(agent, sender, message))
+        self._bids.add(task)
+        task.add_done_callback(self._bids.discard)
+
+    async def _bid(self, agent: Any, sender: str, message: AgentMessage):
+        proposal = None
+        if time.time() < message.content.get("deadline", math.inf):
+            try:
+                proposal = await agent.contract_bid(message.content.get("task") or {})
+            except Exception as e:
+                logger.error(f"Agent {agent.agent_id} failed to bid on {message.conversation_id}: {e}")
+        content = {"protocol": CONTRACT_NET, "step": "propose" if proposal is not None else "refuse"}
+        if proposal is not None:
+            content["proposal"] = proposal
+        await self._send(agent.agent_id, sender, content, message.conversation_id, in_reply_to=message.id)
+
+    async def _on_accept_proposal(self, agent: Any, sender: str, message: AgentMessage):
+        await agent.contract_awarded(message.content.get("task") or {}, message.conversation_id)
+
+    async def _on_reject_proposal(self, agent: Any, sender: str, message: AgentMessage):
+        logger.debug(f"Proposal of agent {agent.agent_id} rejected in {message.conversation_id}")
+
+    # Initiator side of contract-net
+
+    async def _on_propose(self, agent: Any, sender: str, message: AgentMessage):
+        contract = self._collecting(message, sender)
+        if contract is not None:
+            contract.proposals[sender] = message.content.get("proposal") or {}
+            if not contract.pending:
+                contract.done.set()
+
+    async def _on_refuse(self, agent: Any, sender: str, message: AgentMessage):
+        contract = self._collecting(message, sender)
+        if contract is not None:
+            contract.refused.add(sender)
+            if not contract.pending:
+                contract.done.set()
+
+    def _collecting(self, message: AgentMessage, sender: str) -> Optional[ContractNetRound]:
+        contract = self.rounds.get(str(message.conversation_id))
+        if contract is None or contract.state != RoundState.COLLECTING or sender not in contract.participants:
+            logger.debug(f"Late or unexpected answer from {sender} in {message.conversation_id}")
+            return None
+        return contract
+
+    # Subscribe protocol
+
+    async def _on_subscribe(self, agent: Any, sender: str, message: AgentMessage):
+        topic = message.content.get("topic")
+        lease = message.content.get("lease")
+        lease_end = time.monotonic() + lease if lease else math.inf
+        self.subscriptions.setdefault((str(agent.agent_id), topic), {})[sender] = lease_end
+        await self._send(
+            agent.agent_id, sender, {"protocol": SUBSCRIBE, "step": "agree", "topic": topic},
+            message.conversation_id, in_reply_to=message.id
+        )
+
+    async def _on_cancel(self, agent: Any, sender: str, message: AgentMessage):
+        subscribers = self.subscriptions.get((str(agent.agent_id), message.content.get("topic")), {})
+        subscribers.pop(sender, None)
+
+    async def _on_agree(self, agent: Any, sender: str, message: AgentMessage):
+        logger.debug(f"Agent {agent.agent_id} subscribed to {message.content.get('topic')} of {sender}")
+
+    async def _on_inform(self, agent: Any, sender: str, message: AgentMessage):
+        return False
+
+    async def _send(
+        self,
+        sender: Any,
+        receiver: Any,
+        content: Dict[str, Any],
+        conversation_id: Optional[str] = None,
+        in_reply_to: Optional[str] = None
+    ):
+        await self.runtime.send_message(AgentMessage(
+            id=str(uuid4()),
+            sender=str(sender),
+            receiver=str(receiver),
+            performative=STEP_PERFORMATIVES[content["step"]],
+            content=content,
+            conversation_id=conversation_id or str(uuid4()),
+            in_reply_to=in_reply_to
+        ))
+
+
+__all__ = [
+    "CONTRACT_NET",
+    "SUBSCRIBE",
+    "protocol_of",
+    "ContractNetRound",
+    "ContractNetResult",
+    "lowest_cost",
+    "ProtocolEngine"
+]
@@ -0,0 +1,315 @@
+"""
+Agent task queue ordered by priority and deadline, and bounded agent mailbox
+"""
+
+import asyncio
+import heapq
+import itertools
+import json
+from collections import defaultdict, deque
+from datetime import datetime
+from enum import Enum
+from types import SimpleNamespace
+from typing import Any, DefaultDict, Deque, List, Optional, Tuple
+
+from src.cache import rpush as cache_rpush, lpop as cache_lpop, delete as cache_delete
+from src.core.agents.messages import AgentMessage
+from src.monitoring import update_task_queue_size, update_mailbox_depth, track_mailbox_overflow
+from src.utils.logger import get_logger
+
+logger = get_logger(__name__)
+
+# Task.priority values, most urgent first
+TASK_PRIORITIES = {"critical": 0, "high": 1, "medium": 2, "low": 3}
+DEFAULT_PRIORITY = "medium"
+
+# Queued tasks per (queue name, priority) across all agents of the process
+_depths: DefaultDict[Tuple[str, str], int] = defaultdict(int)
+
+
+def _field(task: Any, name: str) -> Any:
+    if isinstance(task, dict):
+        return task.get(name)
+    return getattr(task, name, None)
+
+
+def task_priority(task: Any) -> str:
+    """Get the priority name of a Task model, dict or task-like object"""
+    priority = _field(task, "priority")
+    return priority if priority in TASK_PRIORITIES else DEFAULT_PRIORITY
+
+
+def task_deadline(task: Any) -> float:
+    """Get the deadline of a task as a POSIX timestamp (inf when it has none)
+
+    Read from `deadline`, or `deadline` in `task_metadata`/`metadata`; accepts
+    datetimes, ISO 8601 strings and timestamps.
+    """
+    deadline = _field(task, "deadline")
+    if deadline is None:
+        metadata = _field(task, "task_metadata") or _field(task, "metadata")
+        if isinstance(metadata, dict):
+            deadline = metadata.get("deadline")
+
+    try:
+        if isinstance(deadline, datetime):
+            return deadline.timestamp()
+        if isinstance(deadline, str):
+            return datetime.fromisoformat(deadline.replace("Z", "+00:00")).timestamp()
+        if isinstance(deadline, (int, float)):
+            return float(deadline)
+    except ValueError:
+        pass
+    return float("inf")
+
+
+class TaskQueue(asyncio.Queue):
+    """asyncio.Queue returning the most urgent task first
+
+    Tasks are ordered by priority (critical..low), then earliest deadline,
+    then arrival order. Depths are exported per priority through the
+    mas_task_queue_size gauge under `<name>:<priority>`.
+    """
+
+    def __init__(self, name: str = "agent_tasks", maxsize: int = 0):
+        self.name = name
+        super().__init__(maxsize)
+
+    def _init(self, maxsize: int):
+        self._queue: List[Tuple[int, float, int, str, Any]] = []
+        self._sequence = itertools.count()
+
+    def _put(self, task: Any):
+        priority = task_priority(task)
+        heapq.heappush(
+            self._queue,
+            (TASK_PRIORITIES[priority], task_deadline(task), next(self._sequence), priority, task)
+        )
+        self._track(priority, 1)
+
+    def _get(self) -> Any:
+        *_, priority, task = heapq.heappop(self._queue)
+        self._track(priority, -1)
+        return task
+
+    def peek_priority(self) -> Optional[str]:
+        """Priority of the next task, None if the queue is empty"""
+        return self._queue[0][3] if self._queue else None
+
+    def has_task_at_least(self, priority: str) -> bool:
+        """Check whether a task of `priority` or more urgent is waiting"""
+        return bool(self._queue) and self._queue[0][0] <= TASK_PRIORITIES[priority]
+
+    def clear(self) -> int:
+        """Drop every queued task, returns how many were dropped"""
+        dropped = 0
+        while not self.empty():
+            self.get_nowait()
+            self.task_done()
+            dropped += 1
+        return dropped
+
+    def _track(self, priority: str, delta: int):
+        key = (self.name, priority)
+        _depths[key] += delta
+        update_task_queue_size(f"{self.name}:{priority}", _depths[key])
+
+
+class MailboxStatus(str, Enum):
+    """What a mailbox did with an incoming message"""
+    ACCEPTED = "accepted"
+    SPILLED = "spilled"  # Stored in Redis until the in-memory mailbox drains
+    DROPPED_OLDEST = "dropped_oldest"  # Accepted, the oldest queued message was dropped
+    REJECTED = "rejected"  # Not accepted: mailbox full (drop_newest, block timeout)
+
+    @property
+    def accepted(self) -> bool:
+        return self is not MailboxStatus.REJECTED
+
+
+MAILBOX_POLICIES = ("block", "drop_oldest", "drop_newest", "spill")
+
+# Messages waiting per agent type across all mailboxes of the process
+_mailbox_depths: DefaultDict[str, int] = defaultdict(int)
+
+# Message classes rebuilt from their attributes when read back from a spill list
+_SPILL_TYPES = {"AgentMessage": AgentMessage}
+
+
+class Mailbox:
+    """Bounded FIFO agent mailbox with an overflow policy
+
+    When `capacity` messages are queued, a new message is handled according
+    to `policy`:
+      - block: the sender waits for room, up to `block_timeout` seconds
+      - drop_oldest: the oldest queued message is discarded
+      - drop_newest: the new message is rejected
+      - spill: the message is appended to a Redis list and read back, in
+        order, once the in-memory mailbox drains
+    The returned MailboxStatus is the sender's backpressure signal. If the
+    spill list cannot be read, get() waits `retry_delay` seconds and
+    reports the mailbox as empty for now; spilled messages missing from
+    the list (expired or flushed) are forgotten.
+    """
+
+    def __init__(
+        self,
+        capacity: int,
+        policy: str = "block",
+        agent_type: str = "base",
+        spill_key: Optional[str] = None,
+        block_timeout: float = 5.0,
+        retry_delay: float = 1.0
+    ):
+        if capacity < 1:
+            raise ValueError("Mailbox capacity must be at least 1")
+        if policy not in MAILBOX_POLICIES:
+            raise ValueError(f"Unknown mailbox policy: {policy}. Available: {MAILBOX_POLICIES}")
+        if policy == "spill" and not spill_key:
+            raise ValueError("The spill policy needs a spill_key")
+
+        self.capacity = capacity
+        self.policy = policy
+        self.agent_type = agent_type
+        self.spill_key = spill_key
+        self.block_timeout = block_timeout
+        self.retry_delay = retry_delay
+        self._queue: Deque[Any] = deque()
+        self._spilled = 0
+        self._not_full = asyncio.Event()
+        self._not_full.set()
+
+    def qsize(self) -> int:
+        return len(self._queue) + self._spilled
+
+    def empty(self) -> bool:
+        return self.qsize() == 0
+
+    def full(self) -> bool:
+        return len(self._queue) >= self.capacity
+
+    @property
+    def pressure(self) -> float:
+        """Fill ratio of the in-memory mailbox (1.0 when full)"""
+        return len(self._queue) / self.capacity
+
+    async def put(self, message: Any) -> MailboxStatus:
+        """Queue a message, applying the overflow policy when full"""
+        # Once something is spilled, newer messages follow it to keep FIFO order
+        if self._spilled or (self.full() and self.policy == "spill"):
+            return await self._spill(message)
+
+        if not self.full():
+            self._append(message)
+            return MailboxStatus.ACCEPTED
+
+        if self.policy == "drop_oldest":
+            self._queue.popleft()
+            self._queue.append(message)
+            track_mailbox_overflow(self.agent_type, MailboxStatus.DROPPED_OLDEST.value)
+            return MailboxStatus.DROPPED_OLDEST
+
+        if self.policy == "block":
+            try:
+                await asyncio.wait_for(self._wait_not_full(), timeout=self.block_timeout)
+            except asyncio.TimeoutError:
+                pass
+            else:
+                self._append(message)
+                return MailboxStatus.ACCEPTED
+
+        track_mailbox_overflow(self.agent_type, MailboxStatus.REJECTED.value)
+        return MailboxStatus.REJECTED
+
+    async def get(self) -> Any:
+        """Pop the oldest message, raises asyncio.QueueEmpty if there is none"""
+        if not self._queue and self._spilled:
+            try:
+                await self._refill()
+            except Exception as e:
+                logger.error(f"Failed to read spilled messages from {self.spill_key}: {e}")
+                # Throttle the retries of a run loop that still sees the messages
+                await asyncio.sleep(self.retry_delay)
+        if not self._queue:
+            raise asyncio.QueueEmpty()
+
+        message = self._queue.popleft()
+        self._track(-1)
+        self._not_full.set()
+        return message
+
+    async def clear(self) -> int:
+        """Drop every queued message (spilled ones included), returns how many"""
+        dropped = self.qsize()
+        self._track(-dropped)
+        self._queue.clear()
+        self._not_full.set()
+        if self._spilled:
+            self._spilled = 0
+            await cache_delete(self.spill_key)
+        return dropped
+
+    def _append(self, message: Any):
+        self._queue.append(message)
+        self._track(1)
+
+    async def _wait_not_full(self):
+        while self.full():
+            self._not_full.clear()
+            await self._not_full.wait()
+
+    async def _spill(self, message: Any) -> MailboxStatus:
+        try:
+            if isinstance(message, dict):
+                payload = {"dict": message}
+            elif hasattr(message, "__dict__"):
+                payload = {"attrs": vars(message), "type": type(message).__name__}
+            else:
+                payload = {"value": message}
+            self._spilled += 1
+            self._track(1)
+            await cache_rpush(self.spill_key, json.dumps(payload, default=str))
+        except Exception as e:
+            self._spilled -= 1
+            self._track(-1)
+            logger.error(f"Failed to spill message to {self.spill_key}: {e}")
+            track_mailbox_overflow(self.agent_type, MailboxStatus.REJECTED.value)
+            return MailboxStatus.REJECTED
+
+        track_mailbox_overflow(self.agent_type, MailboxStatus.SPILLED.value)
+        return MailboxStatus.SPILLED
+
+    async def _refill(self):
+        """Move spilled messages back into memory, oldest first"""
+        count = min(self._spilled, self.capacity)
+        items = await cache_lpop(self.spill_key, count)
+        if len(items) < count:
+            # The list ran out: the missing messages are gone
+            lost = self._spilled - len(items)
+            logger.warning(f"{lost} spilled messages missing from {self.spill_key}")
+            self._track(-lost)
+            self._spilled = 0
+        else:
+            self._spilled -= len(items)
+        for item in items:
+            payload = json.loads(item)
+            if "attrs" in payload:
+                message_type = _SPILL_TYPES.get(payload.get("type"), SimpleNamespace)
+                self._queue.append(message_type(**payload["attrs"]))
+            else:
+                self._queue.append(payload.get("dict", payload.get("value")))
+
+    def _track(self, delta: int):
+        _mailbox_depths[self.agent_type] += delta
+        update_mailbox_depth(self.agent_type, _mailbox_depths[self.agent_type])
+
+
+__all__ = [
+    "TASK_PRIORITIES",
+    "TaskQueue",
+    "task_priority",
+    "task_deadline",
+    "MAILBOX_POLICIES",
+    "MailboxStatus",
+    "Mailbox"
+]
@@ -17,6 +17,8 @@ class ReflexiveAgent(BaseAgent):
     No deliberation or planning, just stimulus-response patterns
     """
     
+    agent_type = "reflexive"
+    
     def __init__(
         self,
         agent_id: UUID,
@@ -40,6 +42,17 @@ class ReflexiveAgent(BaseAgent):
         
         logger.info(f"Initialized reflexive agent {name} with {len(self.reactive_rules)} rules")
     
+    def snapshot_state(self) -> Dict[str, Any]:
+        """Include the (possibly learned) rules in the hibernation snapshot"""
+        state = super().snapshot_state()
+        state["reactive_rules"] = self.reactive_rules
+        return state
+    
+    def restore_state(self, state: Dict[str, Any]):
+        """Restore rules from a hibernation snapshot"""
+        super().restore_state(state)
+        self.reactive_rules = state.get("reactive_rules", self.reactive_rules)
+    
     async def perceive(self, environment: Dict[str, Any]) -> Dict[str, Any]:
         """Perceive environment and extract relevant stimuli"""
         stimuli = {
@@ -114,12 +127,12 @@ class ReflexiveAgent(BaseAgent):
         try:
             if action_type == "respond":
                 # Send a response message
-                await self._send_message(
-                    receiver_id=action.get("receiver_id"),
-                    performative=action.get("performative", "inform"),
-                    content=action.get("content", {}),
-                    in_reply_to=action.get("in_response_to")
-                )
+                await self._send_message({
+                    "receiver": action.get("receiver_id"),
+                    "performative": action.get("performative", "inform"),
+                    "content": action.get("content", {}),
+                    "in_reply_to": action.get("in_response_to")
+                })
                 
             elif action_type == "update_state":
                 # Update internal state
@@ -148,14 +161,6 @@ class ReflexiveAgent(BaseAgent):
             self.metrics["total_actions"] += 1
             return False
     
-    async def _send_message(self, receiver_id: UUID, performative: str, content: Any, in_reply_to: Optional[UUID] = None):
-        """Send a message to another agent"""
-        # This would integrate with the message broker
-        logger.info(f"Agent {self.name} sending {performative} message to {receiver_id}")
-        
-        # Update metrics
-        self.metrics["messages_sent"] = self.metrics.get("messages_sent", 0) + 1
-    
     async def _publish_event(self, event_name: str, event_data: Any):
         """Publish an event"""
         logger.info(f"Agent {self.name} publishing event {event_name}")
@@ -0,0 +1,216 @@
+"""
+Runtime-wide scheduling of agent BDI cycles
+"""
+
+import asyncio
+import heapq
+import itertools
+import random
+from collections import OrderedDict, deque
+from contextlib import asynccontextmanager
+from typing import Any, AsyncIterator, Callable, Deque, Dict, List, Optional, Tuple
+from uuid import UUID
+
+from src.monitoring import track_bdi_schedule_lag, track_bdi_cycle, update_bdi_cycles_in_flight
+from src.utils.logger import get_logger
+
+logger = get_logger(__name__)
+
+
+class BDITimer:
+    """Single timer task firing BDI cycles for every agent of a runtime
+
+    Deadlines live in one min-heap, so thousands of agents cost one sleeping
+    task instead of one timer each. Each deadline is jittered around the
+    agent's interval so agents started together drift apart instead of
+    hitting the LLM in lockstep.
+    """
+
+    def __init__(self, jitter: float = 0.1):
+        self.jitter = jitter
+        self._heap: List[Tuple[float, int, UUID]] = []
+        # agent_id -> (sequence of its live heap entry, interval, callback, agent_type)
+        self._entries: Dict[UUID, Tuple[int, float, Callable[[], None], str]] = {}
+        self._sequence = itertools.count()
+        self._wakeup = asyncio.Event()
+        self._task: Optional[asyncio.Task] = None
+
+    def schedule(
+        self,
+        agent_id: UUID,
+        interval: float,
+        callback: Callable[[], None],
+        agent_type: str = "unknown"
+    ):
+        """Fire `callback` about every `interval` seconds until cancelled
+
+        The first deadline is drawn uniformly in [0.5, 1.5] x interval to
+        spread agents that are started at the same moment.
+        """
+        loop = asyncio.get_running_loop()
+        self._push(agent_id, loop.time() + interval * random.uniform(0.5, 1.5),
+                   interval, callback, agent_type)
+
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run())
+        self._wakeup.set()
+
+    def cancel(self, agent_id: UUID):
+        """Stop firing BDI cycles for an agent (its heap entry is skipped lazily)"""
+        self._entries.pop(agent_id, None)
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    async def stop(self):
+        """Cancel the timer task"""
+        self._entries.clear()
+        self._heap.clear()
+        if self._task and not self._task.done():
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+        self._task = None
+
+    def _push(
+        self,
+        agent_id: UUID,
+        deadline: float,
+        interval: float,
+        callback: Callable[[], None],
+        agent_type: str
+    ):
+        sequence = next(self._sequence)
+        self._entries[agent_id] = (sequence, interval, callback, agent_type)
+        heapq.heappush(self._heap, (deadline, sequence, agent_id))
+
+    async def _run(self):
+        """Sleep until the earliest deadline, then fire every due agent"""
+        loop = asyncio.get_running_loop()
+
+        while True:
+            # Drop entries of cancelled or rescheduled agents
+            while self._heap and self._is_stale(self._heap[0]):
+                heapq.heappop(self._heap)
+
+            timeout = self._heap[0][0] - loop.time() if self._heap else None
+            if timeout is None or timeout > 0:
+                self._wakeup.clear()
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), timeout=timeout)
+                except asyncio.TimeoutError:
+                    pass
+                continue
+
+            deadline, _, agent_id = heapq.heappop(self._heap)
+            _, interval, callback, agent_type = self._entries[agent_id]
+            now = loop.time()
+            track_bdi_schedule_lag(agent_type, now - deadline)
+
+            try:
+                callback()
+            except Exception as e:
+                logger.error(f"BDI timer callback failed for agent {agent_id}: {e}")
+
+            next_deadline = now + interval * random.uniform(1 - self.jitter, 1 + self.jitter)
+            self._push(agent_id, next_deadline, interval, callback, agent_type)
+
+    def _is_stale(self, item: Tuple[float, int, UUID]) -> bool:
+        entry = self._entries.get(item[2])
+        return entry is None or entry[0] != item[1]
+
+
+class BDIExecutor:
+    """Global budget of in-flight BDI cycles with per-owner fair-share queues
+
+    At most `max_concurrent` BDI cycles (each one several sequential LLM
+    calls) run at once across the runtime. When the budget is exhausted,
+    waiting cycles are queued per owner and freed slots are handed out
+    round-robin between owners, so a burst of agents from one user cannot
+    starve the agents of everyone else.
+    """
+
+    def __init__(self, max_concurrent: int):
+        if max_concurrent < 1:
+            raise ValueError("max_concurrent must be at least 1")
+        self.max_concurrent = max_concurrent
+        self._in_flight = 0
+        # owner -> waiting cycles; iteration order is the round-robin order
+        self._waiters: "OrderedDict[Any, Deque[asyncio.Future]]" = OrderedDict()
+
+    @property
+    def in_flight(self) -> int:
+        return self._in_flight
+
+    @property
+    def queued(self) -> int:
+        return sum(len(waiters) for waiters in self._waiters.values())
+
+    @asynccontextmanager
+    async def slot(self, owner: Any, agent_type: str = "unknown") -> AsyncIterator[None]:
+        """Hold one BDI slot for the duration of the block"""
+        loop = asyncio.get_running_loop()
+        queued_at = loop.time()
+        await self._acquire(owner)
+        started_at = loop.time()
+        try:
+            yield
+        finally:
+            track_bdi_cycle(agent_type, started_at - queued_at, loop.time() - started_at)
+            self._release()
+
+    @asynccontextmanager
+    async def suspended(self, owner: Any) -> AsyncIterator[None]:
+        """Give back the slot held by the current cycle for the block, then wait for one again
+
+        Used while a cycle is preempted, so that its slot keeps the budget
+        moving instead of idling. Must be nested in slot().
+        """
+        self._release()
+        try:
+            yield
+        finally:
+            try:
+                await self._acquire(owner)
+            except asyncio.CancelledError:
+                # No slot is held, but the enclosing slot() releases one on exit
+                self._in_flight += 1
+                raise
+
+    async def _acquire(self, owner: Any):
+        if self._in_flight < self.max_concurrent and not self._waiters:
+            self._in_flight += 1
+            update_bdi_cycles_in_flight(self._in_flight)
+            return
+
+        waiter = asyncio.get_running_loop().create_future()
+        self._waiters.setdefault(owner, deque()).append(waiter)
+        try:
+            await waiter
+        except asyncio.CancelledError:
+            if waiter.done() and not waiter.cancelled():
+                # The slot was handed over just before the cancellation
+                self._release()
+            raise
+
+    def _release(self):
+        """Hand the freed slot to the next owner in round-robin order"""
+        while self._waiters:
+            owner, waiters = next(iter(self._waiters.items()))
+            waiter = waiters.popleft()
+            if waiters:
+                self._waiters.move_to_end(owner)
+            else:
+                del self._waiters[owner]
+
+            if not waiter.done():
+                waiter.set_result(None)
+                return
+
+        self._in_flight -= 1
+        update_bdi_cycles_in_flight(self._in_flight)
+
+
+__all__ = ["BDITimer", "BDIExecutor"]
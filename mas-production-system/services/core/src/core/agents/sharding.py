@@ -0,0 +1,580 @@
+"""
+Sharded agent runtime spanning several worker processes
+
+Every worker process (uvicorn WORKERS) owns one shard. Agent IDs are
+consistently hashed to shards, and start, stop, deliver and metrics calls
+for an agent owned by another worker are forwarded to it over a control
+channel. Each agent therefore lives on exactly one event loop, and the
+agent population is spread across cores.
+
+An agent taking part in a conversation can be lent by its owning shard to
+the shard of the agent talking to it, so the rest of the conversation is
+exchanged in process. The move goes through the hibernation store: the
+owner snapshots the agent and the borrowing shard rehydrates it.
+"""
+
+import asyncio
+import bisect
+import hashlib
+import json
+import time
+from abc import ABC, abstractmethod
+from types import SimpleNamespace
+from typing import Any, Awaitable, Callable, Dict, Iterable, List, Optional, Set
+from uuid import UUID, uuid4
+
+from src.config import settings
+from src.core.agents.base_agent import BaseAgent
+from src.utils.logger import get_logger
+
+logger = get_logger(__name__)
+
+CommandHandler = Callable[[Dict[str, Any]], Awaitable[Any]]
+
+
+class ConsistentHashRing:
+    """Consistent hash ring mapping keys to shard IDs
+
+    Uses a stable digest (not Python's salted hash()) so every process
+    computes the same placement.
+    """
+
+    def __init__(self, shard_ids: Iterable[int], replicas: int = 64):
+        self.replicas = replicas
+        self._ring: List[int] = []
+        self._owners: Dict[int, int] = {}
+        for shard_id in shard_ids:
+            self.add_shard(shard_id)
+
+    @staticmethod
+    def _hash(key: str) -> int:
+        return int.from_bytes(hashlib.blake2b(key.encode(), digest_size=8).digest(), "big")
+
+    def add_shard(self, shard_id: int):
+        for replica in range(self.replicas):
+            point = self._hash(f"shard-{shard_id}-{replica}")
+            self._owners[point] = shard_id
+            bisect.insort(self._ring, point)
+
+    def shard_for(self, key: Any) -> int:
+        """Get the shard owning a key"""
+        if not self._ring:
+            raise ValueError("Hash ring has no shards")
+        index = bisect.bisect(self._ring, self._hash(str(key))) % len(self._ring)
+        return self._owners[self._ring[index]]
+
+
+class ControlChannel(ABC):
+    """Request/reply channel carrying runtime commands between shards"""
+
+    @abstractmethod
+    async def request(self, shard_id: int, command: Dict[str, Any], timeout: float = 5.0) -> Any:
+        """Send a command to a shard and wait for its result"""
+
+    @abstractmethod
+    async def serve(self, shard_id: int, handler: CommandHandler):
+        """Start executing the commands sent to `shard_id`"""
+
+    @abstractmethod
+    async def close(self):
+        """Stop serving and release resources"""
+
+    async def connect(self):
+        """Open the underlying transport"""
+
+    async def claim_shard(self, shard_count: int) -> int:
+        """Pick the shard ID this process should own"""
+        return 0
+
+
+class LocalControlChannel(ControlChannel):
+    """In-process channel, used with a single shard and in tests
+
+    Several runtimes sharing one LocalControlChannel behave like worker
+    processes talking through Redis.
+    """
+
+    def __init__(self):
+        self._handlers: Dict[int, CommandHandler] = {}
+
+    async def request(self, shard_id: int, command: Dict[str, Any], timeout: float = 5.0) -> Any:
+        handler = self._handlers.get(shard_id)
+        if handler is None:
+            raise ConnectionError(f"Runtime shard {shard_id} is not available")
+        # Round-trip through JSON like a real transport would
+        command = json.loads(json.dumps(command))
+        return await asyncio.wait_for(handler(command), timeout=timeout)
+
+    async def serve(self, shard_id: int, handler: CommandHandler):
+        self._handlers[shard_id] = handler
+
+    async def close(self):
+        self._handlers.clear()
+
+
+class RedisControlChannel(ControlChannel):
+    """Control channel over Redis lists
+
+    Commands are LPUSHed on a per-shard list consumed with BRPOP by the
+    owning worker; the result is pushed on a per-request reply list.
+    Shard IDs are claimed with SET NX and kept alive by a heartbeat.
+    """
+
+    def __init__(self, redis: Any = None, prefix: str = "mas:runtime", claim_ttl: int = 30):
+        self.redis = redis
+        self.prefix = prefix
+        self.claim_ttl = claim_ttl
+        self._token = uuid4().hex
+        self._tasks: List[asyncio.Task] = []
+        self._commands: Set[asyncio.Task] = set()
+
+    async def connect(self):
+        if self.redis is None:
+            from src.cache import get_cache
+            self.redis = await get_cache()
+
+    def _queue_key(self, shard_id: int) -> str:
+        return f"{self.prefix}:shard:{shard_id}"
+
+    async def request(self, shard_id: int, command: Dict[str, Any], timeout: float = 5.0) -> Any:
+        reply_key = f"{self.prefix}:reply:{uuid4().hex}"
+        await self.redis.lpush(
+            self._queue_key(shard_id),
+            json.dumps({"reply_to": reply_key, "command": command})
+        )
+        item = await self.redis.brpop(reply_key, timeout=max(int(timeout), 1))
+        if item is None:
+            raise asyncio.TimeoutError(f"Runtime shard {shard_id} did not answer within {timeout}s")
+
+        reply = json.loads(item[1])
+        if not reply["ok"]:
+            raise RuntimeError(reply["error"])
+        return reply["result"]
+
+    async def serve(self, shard_id: int, handler: CommandHandler):
+        self._tasks.append(asyncio.create_task(self._serve_loop(shard_id, handler)))
+        self._tasks.append(asyncio.create_task(self._heartbeat(shard_id)))
+
+    async def claim_shard(self, shard_count: int) -> int:
+        while True:
+            for shard_id in range(shard_count):
+                claimed = await self.redis.set(
+                    f"{self.prefix}:owner:{shard_id}", self._token, nx=True, ex=self.claim_ttl
+                )
+                if claimed:
+                    return shard_id
+            logger.warning("All runtime shards are claimed, retrying in 1s")
+            await asyncio.sleep(1)
+
+    async def close(self):
+        tasks = self._tasks + list(self._commands)
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        self._tasks.clear()
+        self._commands.clear()
+
+    async def _serve_loop(self, shard_id: int, handler: CommandHandler):
+        queue_key = self._queue_key(shard_id)
+        while True:
+            item = await self.redis.brpop(queue_key, timeout=0)
+            if item is None:
+                continue
+            # Commands run concurrently so one slow start cannot block deliveries
+            task = asyncio.create_task(self._execute(json.loads(item[1]), handler))
+            self._commands.add(task)
+            task.add_done_callback(self._commands.discard)
+
+    async def _execute(self, payload: Dict[str, Any], handler: CommandHandler):
+        try:
+            reply = {"ok": True, "result": await handler(payload["command"])}
+        except Exception as e:
+            logger.error(f"Runtime command {payload['command'].get('op')} failed: {e}")
+            reply = {"ok": False, "error": str(e)}
+
+        try:
+            pipe = self.redis.pipeline(transaction=False)
+            pipe.lpush(payload["reply_to"], json.dumps(reply, default=str))
+            pipe.expire(payload["reply_to"], self.claim_ttl)
+            await pipe.execute()
+        except Exception as e:
+            logger.error(f"Failed to reply to runtime command {payload['command'].get('op')}: {e}")
+
+    async def _heartbeat(self, shard_id: int):
+        while True:
+            await asyncio.sleep(self.claim_ttl / 3)
+            await self.redis.set(f"{self.prefix}:owner:{shard_id}", self._token, ex=self.claim_ttl)
+
+
+def build_agent_from_spec(spec: Dict[str, Any]) -> BaseAgent:
+    """Instantiate a runtime agent from a JSON-serializable agent spec"""
+    from src.core.agents import AgentFactory
+    from src.services.llm_service import LLMService
+
+    return AgentFactory.create_agent(
+        agent_type=spec["agent_type"],
+        agent_id=UUID(str(spec["agent_id"])),
+        name=spec["name"],
+        role=spec["role"],
+        capabilities=spec.get("capabilities") or [],
+        llm_service=LLMService(),
+        owner_id=UUID(str(spec["owner_id"])) if spec.get("owner_id") else None,
+        **(spec.get("configuration") or {})
+    )
+
+
+def _task_payload(task: Any) -> Dict[str, Any]:
+    """JSON-serializable fields of a Task model, dict or task-like object"""
+    if isinstance(task, dict):
+        fields = task
+    elif hasattr(task, "__table__"):
+        fields = {column.key: getattr(task, column.key) for column in task.__table__.columns}
+    else:
+        fields = vars(task)
+    return json.loads(json.dumps(fields, default=str))
+
+
+class ShardedAgentRuntime:
+    """Routes runtime operations to the shard owning each agent"""
+
+    def __init__(
+        self,
+        local_runtime: Any,
+        channel: ControlChannel,
+        shard_count: int = 1,
+        shard_id: Optional[int] = None,
+        agent_builder: Callable[[Dict[str, Any]], BaseAgent] = build_agent_from_spec,
+        request_timeout: float = 5.0
+    ):
+        self.local = local_runtime
+        self.channel = channel
+        self.shard_count = shard_count
+        self.shard_id = shard_id
+        self.agent_builder = agent_builder
+        self.request_timeout = request_timeout
+        self.ring = ConsistentHashRing(range(shard_count))
+        self._deliver_handler: Optional[Callable[[UUID, Dict[str, Any]], Awaitable[bool]]] = None
+        self._started = False
+        # Conversation placement: agents owned here but running on another
+        # shard (agent -> shard), and agents running here for another owner
+        self.pin_ttl = settings.AGENT_CONVERSATION_PIN_TTL
+        self.lent: Dict[UUID, int] = {}
+        self.borrowed: Dict[UUID, int] = {}
+        self._releaser: Optional[asyncio.Task] = None
+
+    async def start(self):
+        """Claim a shard ID (if needed) and start serving forwarded commands"""
+        if self._started:
+            return
+        await self.channel.connect()
+        if self.shard_id is None:
+            self.shard_id = await self.channel.claim_shard(self.shard_count)
+        await self.channel.serve(self.shard_id, self._handle_command)
+        if self.shard_count > 1 and self.pin_ttl > 0:
+            self._releaser = asyncio.create_task(self._release_loop())
+        self._started = True
+        logger.info(f"Runtime shard {self.shard_id}/{self.shard_count} started")
+
+    async def stop(self):
+        """Stop serving forwarded commands"""
+        if self._releaser is not None:
+            self._releaser.cancel()
+            await asyncio.gather(self._releaser, return_exceptions=True)
+            self._releaser = None
+        await self.channel.close()
+        self._started = False
+
+    def set_deliver_handler(self, handler: Callable[[UUID, Dict[str, Any]], Awaitable[bool]]):
+        """Set the coroutine delivering a message dict to a local agent"""
+        self._deliver_handler = handler
+
+    def owner_of(self, agent_id: UUID) -> int:
+        """Get the shard ID owning an agent"""
+        return self.ring.shard_for(agent_id)
+
+    def is_local(self, agent_id: UUID) -> bool:
+        """Check whether an agent runs in this process (owned here and not lent, or borrowed)"""
+        if self.shard_count == 1 or agent_id in self.borrowed:
+            return True
+        return self.owner_of(agent_id) == (self.shard_id or 0) and agent_id not in self.lent
+
+    async def start_agent(self, spec: Dict[str, Any]):
+        """Start an agent on its owning shard"""
+        agent_id = UUID(str(spec["agent_id"]))
+        if self.is_local(agent_id):
+            await self._start_local(spec)
+        else:
+            await self._forward(agent_id, {"op": "start", "spec": spec})
+
+    async def stop_agent(self, agent_id: UUID):
+        """Stop an agent on its owning shard"""
+        if self.is_local(agent_id):
+            await self.local.stop_agent(agent_id)
+            if agent_id in self.borrowed:
+                await self._give_back(agent_id, running=False)
+        else:
+            await self._forward(agent_id, {"op": "stop", "agent_id": str(agent_id)})
+
+    async def is_agent_running(self, agent_id: UUID) -> bool:
+        """Check whether an agent is running on its owning shard"""
+        if self.is_local(agent_id):
+            return await self.local.is_agent_running(agent_id)
+        return await self._forward(agent_id, {"op": "running", "agent_id": str(agent_id)})
+
+    async def deliver(self, agent_id: UUID, message_data: Dict[str, Any]) -> bool:
+        """Deliver a message dict to an agent on its owning shard"""
+        if self.is_local(agent_id):
+            if self._deliver_handler is None:
+                raise RuntimeError("No deliver handler configured")
+            return await self._deliver_handler(agent_id, message_data)
+        return await self._forward(
+            agent_id, {"op": "deliver", "agent_id": str(agent_id), "message": message_data}
+        )
+
+    async def execute_action(self, agent_id: UUID, action_type: str, params: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        """Execute an action on an agent on its owning shard, None if it is not running"""
+        if self.is_local(agent_id):
+            agent = await self.local.get_or_rehydrate(agent_id)
+            return await agent.execute_action(action_type, params) if agent else None
+        return await self._forward(agent_id, {
+            "op": "execute_action", "agent_id": str(agent_id), "action_type": action_type, "params": params
+        })
+
+    async def assign_task(self, agent_id: UUID, task: Any) -> bool:
+        """Queue a task on an agent on its owning shard, False if it is not running
+
+        Other shards receive the task's columns, rebuilt as an object with
+        the same attributes.
+        """
+        if self.is_local(agent_id):
+            agent = await self.local.get_or_rehydrate(agent_id)
+            if agent is None:
+                return False
+            await agent.add_task(task)
+            return True
+        return await self._forward(
+            agent_id, {"op": "assign_task", "agent_id": str(agent_id), "task": _task_payload(task)}
+        )
+
+    async def agent_metrics(self, agent_id: UUID) -> Optional[Dict[str, Any]]:
+        """Get the runtime metrics of an agent from its owning shard"""
+        if self.is_local(agent_id):
+            return await self._local_agent_metrics(agent_id)
+        return await self._forward(agent_id, {"op": "agent_metrics", "agent_id": str(agent_id)})
+
+    async def metrics(self) -> List[Dict[str, Any]]:
+        """Collect runtime metrics from every shard"""
+        results = []
+        for shard_id in range(self.shard_count):
+            if shard_id == (self.shard_id or 0):
+                results.append(self._local_metrics())
+                continue
+            try:
+                results.append(await self.channel.request(
+                    shard_id, {"op": "metrics"}, timeout=self.request_timeout
+                ))
+            except Exception as e:
+                results.append({"shard_id": shard_id, "error": str(e)})
+        return results
+
+    async def pin_here(self, agent_id: UUID) -> bool:
+        """Move an agent to this shard for a conversation with a local agent
+        
+        Asks the owning shard to lend the agent; it refuses while the agent
+        is busy, not running, or already lent for another conversation.
+        Returns True when the agent now runs here.
+        """
+        if self.is_local(agent_id):
+            return True
+        if self.shard_count == 1 or self.pin_ttl <= 0:
+            return False
+        try:
+            owner = self.owner_of(agent_id)
+            if owner == (self.shard_id or 0):
+                host = await self._lend(agent_id, owner)
+            else:
+                host = await self.channel.request(
+                    owner,
+                    {"op": "lend", "agent_id": str(agent_id), "shard_id": self.shard_id},
+                    timeout=self.request_timeout
+                )
+        except Exception as e:
+            logger.error(f"Failed to pin agent {agent_id} on shard {self.shard_id}: {e}")
+            return False
+        return host == self.shard_id and agent_id in self.borrowed
+    
+    async def release_idle_agents(self) -> int:
+        """Hand borrowed agents back to their owners once their conversation is idle"""
+        cutoff = time.monotonic() - self.pin_ttl
+        released = 0
+        for agent_id in list(self.borrowed):
+            agent = self.local.get_running_agent(agent_id)
+            try:
+                if agent is not None:
+                    if agent.last_activity >= cutoff or not await self.local.hibernate_agent(agent_id):
+                        continue
+                elif agent_id not in self.local.hibernated:
+                    continue
+                await self._give_back(agent_id, running=True)
+                released += 1
+            except Exception as e:
+                logger.error(f"Failed to release borrowed agent {agent_id}: {e}")
+        return released
+    
+    async def _lend(self, agent_id: UUID, shard_id: int) -> int:
+        """Lend an agent owned here to a shard, returns the shard it now runs on"""
+        if agent_id in self.lent:
+            return self.lent[agent_id]
+        if shard_id == (self.shard_id or 0):
+            return shard_id
+        
+        if self.local.get_running_agent(agent_id) is not None:
+            # Busy agents stay put, the next message of the conversation retries
+            if not await self.local.hibernate_agent(agent_id):
+                return self.shard_id
+        elif agent_id not in self.local.hibernated:
+            return self.shard_id
+        
+        self.local.hibernated.discard(agent_id)
+        self.lent[agent_id] = shard_id
+        try:
+            await self.channel.request(
+                shard_id, {"op": "adopt", "agent_id": str(agent_id), "owner": self.shard_id},
+                timeout=self.request_timeout
+            )
+        except Exception:
+            del self.lent[agent_id]
+            self.local.hibernated.add(agent_id)
+            raise
+        logger.debug(f"Lent agent {agent_id} to shard {shard_id}")
+        return shard_id
+    
+    async def _give_back(self, agent_id: UUID, running: bool):
+        """Return a borrowed agent (hibernated here, or stopped) to its owner"""
+        owner = self.borrowed.pop(agent_id)
+        self.local.hibernated.discard(agent_id)
+        await self.channel.request(
+            owner, {"op": "return", "agent_id": str(agent_id), "running": running},
+            timeout=self.request_timeout
+        )
+        logger.debug(f"Returned agent {agent_id} to shard {owner}")
+    
+    async def _release_loop(self):
+        while True:
+            await asyncio.sleep(min(self.pin_ttl, settings.AGENT_HIBERNATION_SWEEP_INTERVAL))
+            try:
+                count = await self.release_idle_agents()
+                if count:
+                    logger.info(f"Returned {count} idle borrowed agents to their owners")
+            except Exception as e:
+                logger.error(f"Error in borrowed agents sweep: {e}")
+    
+    async def _forward(self, agent_id: UUID, command: Dict[str, Any]) -> Any:
+        # The owner knows where its lent agents run, and forwards in turn
+        return await self.channel.request(
+            self.lent.get(agent_id, self.owner_of(agent_id)), command, timeout=self.request_timeout
+        )
+
+    async def _start_local(self, spec: Dict[str, Any]):
+        agent_id = UUID(str(spec["agent_id"]))
+        if await self.local.is_agent_running(agent_id):
+            return
+        agent = self.local.get_running_agent(agent_id)
+        if agent is None:
+            agent = self.agent_builder(spec)
+            await self.local.register_agent(agent)
+        await self.local.start_agent(agent)
+
+    async def _local_agent_metrics(self, agent_id: UUID) -> Optional[Dict[str, Any]]:
+        agent = self.local.get_running_agent(agent_id)
+        return await agent.get_metrics() if agent else None
+
+    def _local_metrics(self) -> Dict[str, Any]:
+        return {
+            "shard_id": self.shard_id or 0,
+            "running_agents": len(self.local.agent_tasks),
+            "registered_agents": len(self.local.running_agents),
+            "bdi_cycles_in_flight": self.local.bdi_executor.in_flight,
+            "bdi_cycles_queued": self.local.bdi_executor.queued,
+            "lent_agents": len(self.lent),
+            "borrowed_agents": len(self.borrowed)
+        }
+
+    async def _handle_command(self, command: Dict[str, Any]) -> Any:
+        """Execute a command forwarded by another shard"""
+        op = command.get("op")
+        # Agent commands go through the routing again: a lent agent runs elsewhere
+        if op == "start":
+            await self.start_agent(command["spec"])
+            return True
+        if op == "stop":
+            await self.stop_agent(UUID(command["agent_id"]))
+            return True
+        if op == "running":
+            return await self.is_agent_running(UUID(command["agent_id"]))
+        if op == "deliver":
+            agent_id = UUID(command["agent_id"])
+            if self.is_local(agent_id) and self._deliver_handler is None:
+                return False
+            return await self.deliver(agent_id, command["message"])
+        if op == "execute_action":
+            return await self.execute_action(UUID(command["agent_id"]), command["action_type"], command["params"])
+        if op == "assign_task":
+            return await self.assign_task(UUID(command["agent_id"]), SimpleNamespace(**command["task"]))
+        if op == "agent_metrics":
+            return await self.agent_metrics(UUID(command["agent_id"]))
+        if op == "metrics":
+            return self._local_metrics()
+        if op == "lend":
+            return await self._lend(UUID(command["agent_id"]), command["shard_id"])
+        if op == "adopt":
+            # Rebuilt from the owner's snapshot on its next message
+            agent_id = UUID(command["agent_id"])
+            self.borrowed[agent_id] = command["owner"]
+            self.local.hibernated.add(agent_id)
+            return True
+        if op == "return":
+            agent_id = UUID(command["agent_id"])
+            self.lent.pop(agent_id, None)
+            if command["running"]:
+                self.local.hibernated.add(agent_id)
+            return True
+        raise ValueError(f"Unknown runtime command: {op}")
+
+
+# Global sharded runtime instance
+_sharded_runtime: Optional[ShardedAgentRuntime] = None
+
+
+def get_sharded_runtime() -> ShardedAgentRuntime:
+    """Get or create the sharded runtime wrapping this process' AgentRuntime
+
+    Without RUNTIME_SHARDING every agent is local and no command ever
+    leaves the process.
+    """
+    global _sharded_runtime
+    if _sharded_runtime is None:
+        from src.core.agents import get_agent_runtime
+
+        if settings.RUNTIME_SHARDING:
+            _sharded_runtime = ShardedAgentRuntime(
+                get_agent_runtime(),
+                RedisControlChannel(),
+                shard_count=settings.RUNTIME_SHARD_COUNT or settings.WORKERS
+            )
+        else:
+            _sharded_runtime = ShardedAgentRuntime(
+                get_agent_runtime(), LocalControlChannel(), shard_count=1, shard_id=0
+            )
+    return _sharded_runtime
+
+
+__all__ = [
+    "ConsistentHashRing",
+    "ControlChannel",
+    "LocalControlChannel",
+    "RedisControlChannel",
+    "ShardedAgentRuntime",
+    "build_agent_from_spec",
+    "get_sharded_runtime"
+]
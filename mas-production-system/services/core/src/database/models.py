@@ -199,7 +199,7 @@ class Message(Base):
     
     __table_args__ = (
         Index('ix_message_conversation', 'conversation_id', 'created_at'),
-        Index('ix_message_receiver_unread', 'receiver_id', 'is_read'),
+        Index('ix_messages_receiver_unread', 'receiver_id', 'is_read', 'created_at', 'id'),
         CheckConstraint("performative IN ('inform', 'request', 'propose', 'accept', 'reject', 'query', 'subscribe')", 
                         name='check_performative'),
     )
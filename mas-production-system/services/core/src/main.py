@@ -29,10 +29,14 @@ from src.middleware import (
 )
 from src.database import engine, init_db
 from src.cache import init_cache
-from src.message_broker import init_message_broker
+from src.message_broker import init_message_broker, get_broker_consumer, close as close_message_broker
 from src.monitoring import init_monitoring
 from src.utils.logger import get_logger
 from src.services.message_delivery import get_delivery_service
+from src.services.message_store import get_message_store
+from src.services.llm_client_pool import close_llm_client_pool
+from src.services.cache_invalidation import register_cache_invalidation
+from src.core.agents.sharding import get_sharded_runtime
 
 # Use uvloop for better async performance
 asyncio.set_event_loop_policy(uvloop.EventLoopPolicy())
@@ -108,13 +112,19 @@ async def startup_event():
     # Initialize cache
     await init_cache()
     
-    # Initialize message broker
+    # Initialize message broker and start consuming events
     await init_message_broker()
+    broker_consumer = get_broker_consumer()
+    await register_cache_invalidation(broker_consumer)
+    await broker_consumer.start()
     
     # Initialize monitoring
     init_monitoring()
     
-    # Start message delivery service
+    # Join the sharded agent runtime (one shard per worker process)
+    await get_sharded_runtime().start()
+    
+    # Start message delivery service (reads this shard's delivery stream)
     delivery_service = get_delivery_service()
     await delivery_service.start()
     
@@ -129,11 +139,21 @@ async def shutdown_event():
     delivery_service = get_delivery_service()
     await delivery_service.stop()
     
+    # Leave the sharded agent runtime
+    await get_sharded_runtime().stop()
+    
+    # Write messages still buffered by the write-behind
+    await get_message_store().close()
+    
+    # Close the pooled LLM provider connections
+    await close_llm_client_pool()
+    
     # Close database connections
     await engine.dispose()
     
     # Close cache connections
-    # Close message broker connections
+    # Stop the broker consumer and close message broker connections
+    await close_message_broker()
     
     logger.info("Shutdown complete")
 
@@ -2,11 +2,14 @@
 Message broker module with async Redis pub/sub support
 """
 import redis.asyncio as aioredis
-import json
-from typing import Dict, Any, Callable, Optional
+import orjson
+import time
+from dataclasses import dataclass
+from typing import Dict, Any, Awaitable, Callable, List, Optional, Tuple
 import asyncio
 
 from src.config import settings
+from src.monitoring import track_broker_event, track_broker_lag
 from src.utils.logger import get_logger
 
 logger = get_logger(__name__)
@@ -14,7 +17,6 @@ logger = get_logger(__name__)
 # Async Redis client for pub/sub
 broker = None
 pubsub = None
-subscribers = {}
 
 async def init_message_broker():
     """Initialize async Redis connection for message broker"""
@@ -34,65 +36,271 @@ async def get_broker():
         await init_message_broker()
     return broker
 
+def _encode_event(event_type: str, data: Dict[str, Any], timestamp: float, published_at: float) -> bytes:
+    return orjson.dumps({
+        "event_type": event_type,
+        "data": data,
+        "timestamp": timestamp,
+        "published_at": published_at  # Wall clock, consumers derive their lag from it
+    }, default=str)
+
+def _event_encoder(data: Dict[str, Any], timestamp: float, published_at: float) -> Callable[[str], bytes]:
+    """Encoder of one event under several event types, `data` being encoded once"""
+    head = b'{"event_type":'
+    # orjson keeps key order: the event type is spliced in front of the rest
+    tail = _encode_event("", data, timestamp, published_at)[len(head) + 2:]
+    return lambda event_type: head + orjson.dumps(event_type) + tail
+
 async def publish_event(event_type: str, data: Dict[str, Any]):
     """Publish event to channel"""
     if broker is None:
         await init_message_broker()
     
-    message = {
-        "event_type": event_type,
-        "data": data,
-        "timestamp": asyncio.get_event_loop().time()
-    }
-    
-    await broker.publish(event_type, json.dumps(message))
+    message = _encode_event(event_type, data, asyncio.get_event_loop().time(), time.time())
+    await broker.publish(event_type, message)
     logger.debug(f"Published event {event_type}: {data}")
 
-async def subscribe(channel: str, handler: Callable):
-    """Subscribe to channel with handler"""
-    if pubsub is None:
+async def publish_events(events: List[Tuple[str, Dict[str, Any]]]):
+    """Publish many events in one pipelined round trip"""
+    if not events:
+        return
+    if broker is None:
         await init_message_broker()
     
-    await pubsub.subscribe(channel)
-    subscribers[channel] = handler
-    logger.info(f"Subscribed to channel: {channel}")
+    timestamp = asyncio.get_event_loop().time()
+    published_at = time.time()
+    pipe = broker.pipeline(transaction=False)
+    for event_type, data in events:
+        pipe.publish(event_type, _encode_event(event_type, data, timestamp, published_at))
+    await pipe.execute()
+    logger.debug(f"Published {len(events)} events")
 
-async def unsubscribe(channel: str):
-    """Unsubscribe from channel"""
-    if pubsub is None:
-        return
+
+@dataclass
+class BrokerEvent:
+    """Event received on a broker channel"""
+    channel: str
+    event_type: str
+    data: Dict[str, Any]
+    timestamp: Optional[float] = None
+    published_at: Optional[float] = None
+
+EventHandler = Callable[[BrokerEvent], Awaitable[Any]]
+
+
+class _Subscription:
+    """Handlers of one channel or pattern, with their queue and workers"""
     
-    await pubsub.unsubscribe(channel)
-    subscribers.pop(channel, None)
-    logger.info(f"Unsubscribed from channel: {channel}")
+    def __init__(self, name: str, pattern: bool, concurrency: int, queue_size: int):
+        self.name = name
+        self.pattern = pattern
+        self.concurrency = concurrency
+        self.handlers: List[EventHandler] = []
+        self.queue: asyncio.Queue = asyncio.Queue(queue_size)
+        self.workers: List[asyncio.Task] = []
 
-async def listen():
-    """Listen for messages on subscribed channels"""
-    if pubsub is None:
-        await init_message_broker()
+
+class BrokerConsumer:
+    """Managed pub/sub listener dispatching events to handlers
+    
+    Every subscription (a channel, or a glob pattern such as "agent.*") has
+    its own bounded queue drained by its own pool of workers, so a slow
+    handler only delays its own subscription. When a queue is full, new
+    events for it are dropped (pub/sub gives no delivery guarantee anyway)
+    and counted. Handler latency and publish-to-handle lag are exported
+    per subscription.
+    """
+    
+    def __init__(self, redis: Any = None, concurrency: Optional[int] = None, queue_size: Optional[int] = None):
+        self.redis = redis
+        self.concurrency = concurrency or settings.BROKER_HANDLER_CONCURRENCY
+        self.queue_size = queue_size or settings.BROKER_QUEUE_SIZE
+        self._subscriptions: Dict[str, _Subscription] = {}
+        self._pubsub = None
+        self._listener: Optional[asyncio.Task] = None
+    
+    @property
+    def running(self) -> bool:
+        return self._listener is not None and not self._listener.done()
     
-    async for message in pubsub.listen():
-        if message["type"] == "message":
-            channel = message["channel"]
-            if channel in subscribers:
+    async def subscribe(
+        self,
+        channel: str,
+        handler: EventHandler,
+        pattern: bool = False,
+        concurrency: Optional[int] = None
+    ):
+        """Add a handler for a channel (or a pattern when `pattern` is set)"""
+        subscription = self._subscriptions.get(channel)
+        if subscription is None:
+            subscription = _Subscription(channel, pattern, concurrency or self.concurrency, self.queue_size)
+            self._subscriptions[channel] = subscription
+            if self.running:
+                await self._activate(subscription)
+        subscription.handlers.append(handler)
+        logger.info(f"Subscribed to {'pattern' if pattern else 'channel'}: {channel}")
+    
+    async def unsubscribe(self, channel: str):
+        """Remove every handler of a channel or pattern"""
+        subscription = self._subscriptions.pop(channel, None)
+        if subscription is None:
+            return
+        if self._pubsub is not None:
+            if subscription.pattern:
+                await self._pubsub.punsubscribe(channel)
+            else:
+                await self._pubsub.unsubscribe(channel)
+        await self._stop_workers(subscription)
+        logger.info(f"Unsubscribed from channel: {channel}")
+    
+    async def start(self):
+        """Subscribe to every registered channel and start dispatching"""
+        if self.running:
+            return
+        if self.redis is None:
+            self.redis = await get_broker()
+        self._pubsub = self.redis.pubsub()
+        for subscription in self._subscriptions.values():
+            await self._activate(subscription)
+        self._listener = asyncio.create_task(self._listen())
+        logger.info(f"Broker consumer started with {len(self._subscriptions)} subscriptions")
+    
+    async def stop(self):
+        """Stop listening and cancel the workers"""
+        if self._listener is not None:
+            self._listener.cancel()
+            await asyncio.gather(self._listener, return_exceptions=True)
+            self._listener = None
+        for subscription in self._subscriptions.values():
+            await self._stop_workers(subscription)
+        if self._pubsub is not None:
+            await self._pubsub.close()
+            self._pubsub = None
+        logger.info("Broker consumer stopped")
+    
+    async def _activate(self, subscription: _Subscription):
+        if subscription.pattern:
+            await self._pubsub.psubscribe(subscription.name)
+        else:
+            await self._pubsub.subscribe(subscription.name)
+        subscription.workers = [
+            asyncio.create_task(self._work(subscription)) for _ in range(subscription.concurrency)
+        ]
+    
+    async def _stop_workers(self, subscription: _Subscription):
+        for worker in subscription.workers:
+            worker.cancel()
+        await asyncio.gather(*subscription.workers, return_exceptions=True)
+        subscription.workers = []
+    
+    async def _listen(self):
+        while True:
+            try:
+                message = await self._pubsub.get_message(ignore_subscribe_messages=True, timeout=1.0)
+                if message is not None:
+                    self._dispatch(message)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"Error in broker consumer: {e}")
+                await asyncio.sleep(1.0)
+    
+    def _dispatch(self, message: Dict[str, Any]):
+        """Queue a raw pub/sub message on its subscription"""
+        name = message["pattern"] if message["type"] == "pmessage" else message["channel"]
+        subscription = self._subscriptions.get(name)
+        if subscription is None:
+            return
+        try:
+            payload = orjson.loads(message["data"])
+            event = BrokerEvent(
+                channel=message["channel"],
+                event_type=payload.get("event_type", message["channel"]),
+                data=payload.get("data", {}),
+                timestamp=payload.get("timestamp"),
+                published_at=payload.get("published_at")
+            )
+        except (orjson.JSONDecodeError, AttributeError) as e:
+            logger.error(f"Invalid event on {message['channel']}: {e}")
+            track_broker_event(name, "invalid")
+            return
+        
+        try:
+            subscription.queue.put_nowait(event)
+        except asyncio.QueueFull:
+            logger.warning(f"Handlers of {name} are saturated, dropping event {event.event_type}")
+            track_broker_event(name, "dropped")
+    
+    async def _work(self, subscription: _Subscription):
+        while True:
+            event = await subscription.queue.get()
+            if event.published_at is not None:
+                track_broker_lag(subscription.name, max(time.time() - event.published_at, 0.0))
+            for handler in subscription.handlers:
+                start = time.perf_counter()
                 try:
-                    data = json.loads(message["data"])
-                    await subscribers[channel](data)
+                    await handler(event)
+                    outcome = "handled"
                 except Exception as e:
-                    logger.error(f"Error handling message on {channel}: {e}")
+                    logger.error(f"Error handling {event.event_type} on {event.channel}: {e}")
+                    outcome = "failed"
+                track_broker_event(subscription.name, outcome, time.perf_counter() - start)
+
+
+# Global consumer instance
+_consumer: Optional[BrokerConsumer] = None
+
+def get_broker_consumer() -> BrokerConsumer:
+    """Get or create the broker consumer"""
+    global _consumer
+    if _consumer is None:
+        _consumer = BrokerConsumer()
+    return _consumer
 
-async def broadcast(event_type: str, data: Dict[str, Any], channels: list[str]):
-    """Broadcast event to multiple channels"""
-    tasks = []
-    for channel in channels:
-        task = publish_event(f"{channel}:{event_type}", data)
-        tasks.append(task)
+async def subscribe(channel: str, handler: Callable):
+    """Subscribe to channel with handler (receives the decoded event dict)"""
+    async def call(event: BrokerEvent):
+        await handler({"event_type": event.event_type, "data": event.data, "timestamp": event.timestamp})
+    
+    await get_broker_consumer().subscribe(channel, call)
+
+async def unsubscribe(channel: str):
+    """Unsubscribe from channel"""
+    await get_broker_consumer().unsubscribe(channel)
+
+async def listen():
+    """Start dispatching events of subscribed channels (see BrokerConsumer)"""
+    await get_broker_consumer().start()
+
+async def broadcast(event_type: str, data: Dict[str, Any], channels: list[str], chunk_size: int = 1000):
+    """Broadcast event to multiple channels
+    
+    The event is published to `<channel>:<event_type>`, which is also its
+    event_type as with publish_event, through pipelines of `chunk_size`
+    commands, one round trip per chunk. The data is encoded once. Returns
+    how many subscribers received it.
+    """
+    if not channels:
+        return 0
+    if broker is None:
+        await init_message_broker()
     
-    await asyncio.gather(*tasks)
+    encode = _event_encoder(data, asyncio.get_event_loop().time(), time.time())
+    receivers = 0
+    for i in range(0, len(channels), chunk_size):
+        pipe = broker.pipeline(transaction=False)
+        for channel in channels[i:i + chunk_size]:
+            name = f"{channel}:{event_type}"
+            pipe.publish(name, encode(name))
+        receivers += sum(await pipe.execute())
+    logger.debug(f"Broadcast {event_type} to {len(channels)} channels")
+    return receivers
 
 async def close():
     """Close Redis connections"""
     global broker, pubsub
+    if _consumer is not None:
+        await _consumer.stop()
     if pubsub:
         await pubsub.close()
         pubsub = None
@@ -103,6 +311,10 @@ async def close():
 __all__ = [
     "init_message_broker",
     "publish_event",
+    "publish_events",
+    "BrokerEvent",
+    "BrokerConsumer",
+    "get_broker_consumer",
     "subscribe",
     "unsubscribe",
     "listen",
@@ -6,7 +6,7 @@ from prometheus_client import generate_latest, CONTENT_TYPE_LATEST
 from fastapi import Response
 import time
 from functools import wraps
-from typing import Callable, Any
+from typing import Callable, Any, Optional
 
 from src.utils.logger import get_logger
 
@@ -65,6 +65,115 @@ cache_operations = Counter(
     registry=registry
 )
 
+bdi_schedule_lag = Histogram(
+    'mas_bdi_schedule_lag_seconds',
+    'Delay between a BDI cycle deadline and the moment it was fired',
+    ['agent_type'],
+    buckets=(0.001, 0.005, 0.01, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0),
+    registry=registry
+)
+
+bdi_queue_wait = Histogram(
+    'mas_bdi_queue_wait_seconds',
+    'Time a BDI cycle waited for a slot in the global BDI budget',
+    ['agent_type'],
+    buckets=(0.01, 0.05, 0.1, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0),
+    registry=registry
+)
+
+bdi_run_time = Histogram(
+    'mas_bdi_run_seconds',
+    'Duration of a BDI cycle once it holds a slot',
+    ['agent_type'],
+    buckets=(0.01, 0.05, 0.1, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0),
+    registry=registry
+)
+
+bdi_cycles_in_flight = Gauge(
+    'mas_bdi_cycles_in_flight',
+    'Number of BDI cycles currently running',
+    registry=registry
+)
+
+mailbox_depth = Gauge(
+    'mas_agent_mailbox_depth',
+    'Messages waiting in agent mailboxes (including spilled ones)',
+    ['agent_type'],
+    registry=registry
+)
+
+mailbox_overflows = Counter(
+    'mas_agent_mailbox_overflows_total',
+    'Messages that hit a full agent mailbox',
+    ['agent_type', 'outcome'],
+    registry=registry
+)
+
+hibernated_agents = Gauge(
+    'mas_hibernated_agents',
+    'Number of registered agents currently hibernated',
+    registry=registry
+)
+
+agent_hibernation_events = Counter(
+    'mas_agent_hibernation_events_total',
+    'Agent hibernations and rehydrations',
+    ['agent_type', 'event'],
+    registry=registry
+)
+
+message_delivery_latency = Histogram(
+    'mas_message_delivery_latency_seconds',
+    'Time from enqueueing a message on its delivery stream to the agent mailbox',
+    buckets=(0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 5.0),
+    registry=registry
+)
+
+message_deliveries = Counter(
+    'mas_message_deliveries_total',
+    'Messages read from delivery streams, by outcome',
+    ['outcome'],
+    registry=registry
+)
+
+protocol_rounds = Counter(
+    'mas_protocol_rounds_total',
+    'Interaction protocol rounds, by protocol and outcome',
+    ['protocol', 'outcome'],
+    registry=registry
+)
+
+protocol_round_duration = Histogram(
+    'mas_protocol_round_duration_seconds',
+    'Duration of interaction protocol rounds',
+    ['protocol'],
+    buckets=(0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1.0, 5.0, 30.0),
+    registry=registry
+)
+
+broker_events = Counter(
+    'mas_broker_events_total',
+    'Pub/sub events received by the broker consumer, by subscription and outcome',
+    ['subscription', 'outcome'],
+    registry=registry
+)
+
+broker_handler_duration = Histogram(
+    'mas_broker_handler_duration_seconds',
+    'Broker event handler execution time',
+    ['subscription'],
+    buckets=(0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1.0, 5.0),
+    registry=registry
+)
+
+broker_event_lag = Histogram(
+    'mas_broker_event_lag_seconds',
+    'Time from publishing an event to a handler picking it up',
+    ['subscription'],
+    buckets=(0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 5.0),
+    registry=registry
+)
+
 llm_requests = Counter(
     'mas_llm_requests_total',
     'LLM API requests',
@@ -79,6 +188,57 @@ llm_tokens = Counter(
     registry=registry
 )
 
+llm_cache_lookups = Counter(
+    'mas_llm_cache_lookups_total',
+    'LLM response cache lookups, by tier and outcome',
+    ['tier', 'outcome'],
+    registry=registry
+)
+
+llm_coalesced_calls = Counter(
+    'mas_llm_coalesced_calls_total',
+    'LLM calls answered by an identical call already in flight',
+    ['model'],
+    registry=registry
+)
+
+llm_concurrency_limit = Gauge(
+    'mas_llm_concurrency_limit',
+    'Adaptive concurrency limit of LLM calls per provider',
+    ['provider'],
+    registry=registry
+)
+
+llm_calls_in_flight = Gauge(
+    'mas_llm_calls_in_flight',
+    'LLM calls admitted by the limiter and not finished, per provider',
+    ['provider'],
+    registry=registry
+)
+
+llm_limiter_wait = Histogram(
+    'mas_llm_limiter_wait_seconds',
+    'Time LLM calls waited for admission, by provider and priority',
+    ['provider', 'priority'],
+    buckets=(0.001, 0.01, 0.1, 0.5, 1.0, 5.0, 15.0, 60.0),
+    registry=registry
+)
+
+llm_congestion = Counter(
+    'mas_llm_congestion_total',
+    'Congestion signals from LLM providers (rate_limited, timeout, slow)',
+    ['provider', 'signal'],
+    registry=registry
+)
+
+llm_batch_size = Histogram(
+    'mas_llm_batch_size',
+    'LLM calls dispatched together by the micro-batcher',
+    ['provider'],
+    buckets=(1, 2, 4, 8, 16, 32, 64, 128),
+    registry=registry
+)
+
 system_info = Info(
     'mas_system_info',
     'System information',
@@ -128,10 +288,81 @@ def track_llm_request(model: str, success: bool, input_tokens: int = 0, output_t
     if success and output_tokens > 0:
         llm_tokens.labels(model=model, token_type="output").inc(output_tokens)
 
+def track_llm_cache(tier: str, outcome: str):
+    """Track an LLM response cache lookup (hit, miss or bypass)"""
+    llm_cache_lookups.labels(tier=tier, outcome=outcome).inc()
+
+def track_llm_coalesced(model: str):
+    """Track an LLM call collapsed into an identical in-flight call"""
+    llm_coalesced_calls.labels(model=model).inc()
+
+def update_llm_concurrency(provider: str, limit: float, in_flight: int):
+    """Update the adaptive concurrency limit and in-flight calls of a provider"""
+    llm_concurrency_limit.labels(provider=provider).set(limit)
+    llm_calls_in_flight.labels(provider=provider).set(in_flight)
+
+def track_llm_limiter_wait(provider: str, priority: str, wait: float):
+    """Track the time an LLM call waited for admission"""
+    llm_limiter_wait.labels(provider=provider, priority=priority).observe(wait)
+
+def track_llm_congestion(provider: str, signal: str):
+    """Track a congestion signal from an LLM provider"""
+    llm_congestion.labels(provider=provider, signal=signal).inc()
+
+def track_llm_batch(provider: str, size: int):
+    """Track the size of a micro-batch of LLM calls"""
+    llm_batch_size.labels(provider=provider).observe(size)
+
 def update_task_queue_size(queue_name: str, size: int):
     """Update task queue size gauge"""
     task_queue_size.labels(queue_name=queue_name).set(size)
 
+def track_bdi_schedule_lag(agent_type: str, lag: float):
+    """Track how late a BDI cycle was fired"""
+    bdi_schedule_lag.labels(agent_type=agent_type).observe(max(lag, 0.0))
+
+def track_bdi_cycle(agent_type: str, queue_wait: float, run_time: float):
+    """Track queue wait and run time of a BDI cycle"""
+    bdi_queue_wait.labels(agent_type=agent_type).observe(queue_wait)
+    bdi_run_time.labels(agent_type=agent_type).observe(run_time)
+
+def update_bdi_cycles_in_flight(count: int):
+    """Update in-flight BDI cycles gauge"""
+    bdi_cycles_in_flight.set(count)
+
+def update_mailbox_depth(agent_type: str, depth: int):
+    """Update mailbox depth gauge"""
+    mailbox_depth.labels(agent_type=agent_type).set(depth)
+
+def track_mailbox_overflow(agent_type: str, outcome: str):
+    """Track a message that hit a full mailbox"""
+    mailbox_overflows.labels(agent_type=agent_type, outcome=outcome).inc()
+
+def track_agent_hibernation(agent_type: str, event: str, hibernated: int):
+    """Track an agent hibernation or rehydration"""
+    agent_hibernation_events.labels(agent_type=agent_type, event=event).inc()
+    hibernated_agents.set(hibernated)
+
+def track_message_delivery(outcome: str, latency: float):
+    """Track a message read from a delivery stream"""
+    message_deliveries.labels(outcome=outcome).inc()
+    message_delivery_latency.observe(latency)
+
+def track_protocol_round(protocol: str, outcome: str, duration: float):
+    """Track a finished interaction protocol round"""
+    protocol_rounds.labels(protocol=protocol, outcome=outcome).inc()
+    protocol_round_duration.labels(protocol=protocol).observe(duration)
+
+def track_broker_event(subscription: str, outcome: str, duration: Optional[float] = None):
+    """Track a broker event handled, failed, dropped or invalid"""
+    broker_events.labels(subscription=subscription, outcome=outcome).inc()
+    if duration is not None:
+        broker_handler_duration.labels(subscription=subscription).observe(duration)
+
+def track_broker_lag(subscription: str, lag: float):
+    """Track the publish-to-handle lag of a broker event"""
+    broker_event_lag.labels(subscription=subscription).observe(lag)
+
 def update_db_connections(pool_name: str, active: int, idle: int, total: int):
     """Update database connection pool metrics"""
     db_connections.labels(pool_name=pool_name, state="active").set(active)
@@ -201,7 +432,23 @@ __all__ = [
     "update_active_agents",
     "track_cache_operation",
     "track_llm_request",
+    "track_llm_cache",
+    "track_llm_coalesced",
+    "update_llm_concurrency",
+    "track_llm_limiter_wait",
+    "track_llm_congestion",
+    "track_llm_batch",
     "update_task_queue_size",
+    "track_bdi_schedule_lag",
+    "track_bdi_cycle",
+    "update_bdi_cycles_in_flight",
+    "update_mailbox_depth",
+    "track_mailbox_overflow",
+    "track_agent_hibernation",
+    "track_message_delivery",
+    "track_protocol_round",
+    "track_broker_event",
+    "track_broker_lag",
     "update_db_connections",
     "timing_decorator",
     "get_metrics"
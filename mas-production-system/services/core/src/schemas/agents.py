@@ -47,6 +47,23 @@ class AgentDetail(BaseModel):
     class Config:
         orm_mode = True
 
+class AgentBatchCreate(BaseModel):
+    agents: List[AgentCreate]
+    start: bool = False
+
+class AgentBatchItemResult(BaseModel):
+    index: int
+    success: bool
+    agent: Optional[AgentResponse] = None
+    started: bool = False
+    error: Optional[str] = None
+
+class AgentBatchResponse(BaseModel):
+    items: List[AgentBatchItemResult]
+    created: int
+    started: int
+    failed: int
+
 class AgentList(BaseModel):
     items: List[AgentResponse]
     total: int
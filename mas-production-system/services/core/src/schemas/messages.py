@@ -2,7 +2,7 @@
 Message schemas for API validation
 """
 
-from typing import Optional, Dict, Any
+from typing import Optional, Dict, Any, List
 from uuid import UUID
 from datetime import datetime
 from pydantic import BaseModel, Field, validator
@@ -49,6 +49,7 @@ class MessageResponse(BaseModel):
     in_reply_to: Optional[UUID]
     is_read: bool
     created_at: datetime
+    delivery_status: Optional[str] = None  # Set on send: accepted, spilled, rejected, not_running...
     
     class Config:
         orm_mode = True
@@ -68,6 +69,26 @@ class MessageResponse(BaseModel):
         }
 
 
+class MessageBatchCreate(BaseModel):
+    """Schema for sending many messages from one agent"""
+    messages: List[MessageCreate]
+
+
+class MessageBatchItemResult(BaseModel):
+    """Outcome of one message of a batch"""
+    index: int
+    success: bool
+    message: Optional[MessageResponse] = None
+    error: Optional[str] = None
+
+
+class MessageBatchResponse(BaseModel):
+    """Schema for batch send response"""
+    items: List[MessageBatchItemResult]
+    sent: int
+    failed: int
+
+
 class MessageList(BaseModel):
     """Schema for paginated message list"""
     items: list[MessageResponse]
@@ -13,6 +13,8 @@ from sqlalchemy.orm import Session
 from src.database.models import Agent, Memory, Message, Task
 from src.schemas.agents import AgentCreate, AgentUpdate, MemoryCreate
 from src.core.agents import AgentFactory, get_agent_runtime
+from src.core.agents.messages import AgentMessage
+from src.core.agents.sharding import get_sharded_runtime
 from src.services.llm_service import LLMService
 from src.services.embedding_service import EmbeddingService
 from src.utils.logger import get_logger
@@ -28,6 +30,7 @@ class AgentService:
     def __init__(self):
         self.agent_factory = AgentFactory()
         self.runtime = get_agent_runtime()  # Use global runtime instance
+        self.shards = get_sharded_runtime()  # Routes agents owned by other workers
         # self.embedding_service = EmbeddingService()  # TODO: fix initialization
         
     async def create_agent(
@@ -53,30 +56,67 @@ class AgentService:
             configuration=agent_data.configuration or {}
         )
         
+        await self.register_runtime_agent(agent, llm_service)
+        
+        logger.info(f"Created agent {agent.id} of type {agent.agent_type}")
+        
+        return agent
+        
+    def build_agent_rows(
+        self,
+        owner_id: UUID,
+        agents_data: List[AgentCreate]
+    ) -> List[Dict[str, Any]]:
+        """Build agents table rows for a single multi-row insert"""
+        return [
+            {
+                "id": uuid4(),
+                "owner_id": owner_id,
+                "name": agent_data.name,
+                "role": agent_data.role,
+                "agent_type": agent_data.agent_type,
+                "beliefs": agent_data.initial_beliefs or {},
+                "desires": agent_data.initial_desires or [],
+                "intentions": [],
+                "capabilities": agent_data.capabilities or [],
+                "reactive_rules": agent_data.reactive_rules or {},
+                "configuration": agent_data.configuration or {},
+                "status": "idle",
+                "is_active": True,
+                "total_actions": 0,
+                "successful_actions": 0,
+                "total_messages": 0
+            }
+            for agent_data in agents_data
+        ]
+        
+    async def register_runtime_agent(self, agent: Agent, llm_service: LLMService):
+        """Create the runtime instance of a new agent and register it"""
+        # Agents owned by another worker are built there when started
+        if not self.shards.is_local(agent.id):
+            return
+        
         # Create runtime instance with all necessary parameters
         factory_params = {
-            "agent_type": agent_data.agent_type,
+            "agent_type": agent.agent_type,
             "agent_id": agent.id,
             "name": agent.name,
             "role": agent.role,
             "capabilities": agent.capabilities,
             "llm_service": llm_service,
-            "reactive_rules": agent_data.reactive_rules or {}
+            "owner_id": agent.owner_id,
+            "reactive_rules": agent.reactive_rules or {}
         }
         
         # Add configuration parameters
-        if agent_data.configuration:
-            factory_params.update(agent_data.configuration)
+        if agent.configuration:
+            factory_params.update(agent.configuration)
         
         runtime_agent = self.agent_factory.create_agent(**factory_params)
         
         # Register with runtime
         await self.runtime.register_agent(runtime_agent)
         
-        logger.info(f"Created agent {agent.id} of type {agent.agent_type}")
-        
-        return agent
-        
     async def update_agent(
         self,
         agent: Agent,
@@ -107,10 +147,16 @@ class AgentService:
         """Start agent execution"""
         
         # Check if already running
-        if await self.runtime.is_agent_running(agent.id):
+        if await self.shards.is_agent_running(agent.id):
             logger.warning(f"Agent {agent.id} is already running")
             return
         
+        # Forward to the worker owning the agent
+        if not self.shards.is_local(agent.id):
+            await self.shards.start_agent(self._agent_spec(agent))
+            logger.info(f"Started agent {agent.id} on shard {self.shards.owner_of(agent.id)}")
+            return
+        
         # Create runtime instance if not exists
         runtime_agent = self.runtime.get_running_agent(agent.id)
         if not runtime_agent:
@@ -123,6 +169,7 @@ class AgentService:
                 role=agent.role,
                 capabilities=agent.capabilities,
                 llm_service=llm_service,
+                owner_id=agent.owner_id,
                 **agent.configuration
             )
             await self.runtime.register_agent(runtime_agent)
@@ -135,14 +182,26 @@ class AgentService:
     async def stop_agent(self, agent: Agent):
         """Stop agent execution"""
         
-        if not await self.runtime.is_agent_running(agent.id):
+        if not await self.shards.is_agent_running(agent.id):
             logger.warning(f"Agent {agent.id} is not running")
             return
         
-        await self.runtime.stop_agent(agent.id)
+        await self.shards.stop_agent(agent.id)
         
         logger.info(f"Stopped agent {agent.id}")
         
+    def _agent_spec(self, agent: Agent) -> Dict[str, Any]:
+        """Serializable description used to build the agent on another worker"""
+        return {
+            "agent_type": agent.agent_type,
+            "agent_id": str(agent.id),
+            "name": agent.name,
+            "role": agent.role,
+            "capabilities": agent.capabilities or [],
+            "owner_id": str(agent.owner_id) if agent.owner_id else None,
+            "configuration": agent.configuration or {}
+        }
+        
     async def add_memory(
         self,
         agent: Agent,
@@ -220,10 +279,9 @@ class AgentService:
             "average_response_time": 0
         }
         
-        # Get runtime metrics if available
-        runtime_agent = self.runtime.get_running_agent(agent.id)
-        if runtime_agent:
-            runtime_metrics = await runtime_agent.get_metrics()
+        # Get runtime metrics if available (from the worker owning the agent)
+        runtime_metrics = await self.shards.agent_metrics(agent.id)
+        if runtime_metrics:
             metrics.update(runtime_metrics)
         
         # Cache for 1 minute
@@ -237,46 +295,53 @@ class AgentService:
         action_type: str,
         params: Dict[str, Any]
     ) -> Dict[str, Any]:
-        """Execute an agent action"""
-        
-        runtime_agent = self.runtime.get_running_agent(agent.id)
-        if not runtime_agent:
-            raise ValueError(f"Agent {agent.id} is not running")
+        """Execute an agent action on the worker owning the agent"""
         
         try:
-            result = await runtime_agent.execute_action(action_type, params)
-            
-            # Update metrics
-            agent.total_actions += 1
-            if result.get("success"):
-                agent.successful_actions += 1
-            
-            # Publish event
-            await publish_event("agent.action_executed", {
-                "agent_id": str(agent.id),
-                "action_type": action_type,
-                "success": result.get("success", False)
-            })
-            
-            return result
-            
+            result = await self.shards.execute_action(agent.id, action_type, params)
         except Exception as e:
             logger.error(f"Failed to execute action for agent {agent.id}: {str(e)}")
             agent.total_actions += 1
             raise
+        if result is None:
+            raise ValueError(f"Agent {agent.id} is not running")
+        
+        # Update metrics
+        agent.total_actions += 1
+        if result.get("success"):
+            agent.successful_actions += 1
+        
+        # Publish event
+        await publish_event("agent.action_executed", {
+            "agent_id": str(agent.id),
+            "action_type": action_type,
+            "success": result.get("success", False)
+        })
+        
+        return result
             
     async def handle_message(
         self,
         agent: Agent,
         message: Message
     ) -> Optional[Message]:
-        """Handle incoming message for agent"""
+        """Handle incoming message for agent
         
-        runtime_agent = self.runtime.get_running_agent(agent.id)
+        An agent running on another worker gets the message in its mailbox
+        and answers asynchronously, so no response is returned.
+        """
+        
+        if not self.shards.is_local(agent.id):
+            if not await self.shards.deliver(agent.id, AgentMessage.from_model(message).to_dict()):
+                logger.warning(f"Agent {agent.id} is not running, message left in its offline mailbox")
+                return None
+            agent.total_messages += 1
+            return None
+        
+        runtime_agent = await self.runtime.get_or_rehydrate(agent.id)
         if not runtime_agent:
-            logger.warning(f"Agent {agent.id} is not running, queueing message")
-            # Queue message for later processing
-            await cache.rpush(f"agent_message_queue:{agent.id}", message.json())
+            # The message stays unread and is replayed when the agent starts
+            logger.warning(f"Agent {agent.id} is not running, message left in its offline mailbox")
             return None
         
         try:
@@ -297,14 +362,11 @@ class AgentService:
         agent: Agent,
         task: Task
     ):
-        """Assign task to agent"""
+        """Assign task to agent on the worker owning it"""
         
-        runtime_agent = self.runtime.get_running_agent(agent.id)
-        if not runtime_agent:
+        if not await self.shards.assign_task(agent.id, task):
             raise ValueError(f"Agent {agent.id} is not running")
         
-        await runtime_agent.add_task(task)
-        
         # Update task assignment
         if not task.assigned_agents:
             task.assigned_agents = []
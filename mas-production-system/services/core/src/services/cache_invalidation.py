@@ -0,0 +1,46 @@
+"""
+Cache invalidation driven by broker events
+"""
+
+from typing import Any
+
+from src.cache import delete as cache_delete, get as cache_get, incr as cache_incr
+from src.message_broker import BrokerConsumer, BrokerEvent
+from src.utils.logger import get_logger
+
+logger = get_logger(__name__)
+
+
+async def agent_list_cache_key(owner_id: Any, *params: Any) -> str:
+    """Cache key of an agent list page, under the owner's current list version"""
+    version = await cache_get(f"user_agents_version:{owner_id}") or 0
+    return ":".join(str(part) for part in ("user_agents", owner_id, f"v{version}", *params))
+
+
+async def invalidate_agent_lists(event: BrokerEvent):
+    """Retire every cached agent list page of the agent's owner
+
+    Bumping the owner's list version is one INCR whatever the size of the
+    keyspace; pages cached under older versions expire on their own.
+    """
+    owner_id = event.data.get("owner_id")
+    if not owner_id:
+        logger.debug(f"{event.event_type} event without owner_id, nothing to invalidate")
+        return
+    await cache_incr(f"user_agents_version:{owner_id}")
+
+
+async def invalidate_agent_metrics(event: BrokerEvent):
+    """Drop the cached metrics of a message sender (its message counter moved)"""
+    sender_id = event.data.get("sender_id")
+    if sender_id:
+        await cache_delete(f"agent_metrics:{sender_id}")
+
+
+async def register_cache_invalidation(consumer: BrokerConsumer):
+    """Subscribe the invalidation handlers on a broker consumer"""
+    await consumer.subscribe("agent.*", invalidate_agent_lists, pattern=True)
+    await consumer.subscribe("message.sent", invalidate_agent_metrics)
+
+
+__all__ = ["agent_list_cache_key", "invalidate_agent_lists", "invalidate_agent_metrics", "register_cache_invalidation"]
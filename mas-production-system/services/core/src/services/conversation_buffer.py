@@ -0,0 +1,175 @@
+"""
+Hot buffer of recent conversations, serving conversation reads without the database
+"""
+
+from collections import defaultdict
+from typing import Any, Awaitable, Callable, Dict, Iterable, List, Optional
+
+import orjson
+from redis.exceptions import WatchError
+
+from src.cache import get_cache
+from src.config import settings
+from src.utils.logger import get_logger
+
+logger = get_logger(__name__)
+
+
+class ConversationBuffer:
+    """Messages of recently read conversations, as Redis lists shared by every worker
+
+    A conversation is loaded from the database on its first read, then kept
+    up to date by appending the rows the message writers store (RPUSHX only
+    extends conversations already buffered). Every write bumps a version
+    key, so a load racing with a write is not cached. Conversations whose
+    read state changed are dropped and loaded again on their next read.
+    Conversations longer than `max_messages` are dropped and marked too
+    long for `ttl` seconds, so their reads go straight to the database
+    without a load. Entries expire after `ttl` seconds without writes.
+    """
+
+    def __init__(self, redis: Any = None, max_messages: Optional[int] = None, ttl: Optional[int] = None):
+        self.redis = redis
+        self.max_messages = max_messages or settings.CONVERSATION_BUFFER_MAX_MESSAGES
+        self.ttl = ttl or settings.CONVERSATION_BUFFER_TTL
+
+    def _key(self, conversation_id: Any) -> str:
+        return f"conversation:{conversation_id}:messages"
+
+    def _version_key(self, conversation_id: Any) -> str:
+        return f"conversation:{conversation_id}:version"
+
+    def _too_long_key(self, conversation_id: Any) -> str:
+        return f"conversation:{conversation_id}:too_long"
+
+    async def _client(self):
+        if self.redis is None:
+            self.redis = await get_cache()
+        return self.redis
+
+    async def get(self, conversation_id: Any) -> Optional[List[Dict[str, Any]]]:
+        """Buffered messages of a conversation, oldest first; None when not buffered"""
+        redis = await self._client()
+        entries = await redis.lrange(self._key(conversation_id), 0, -1)
+        return [orjson.loads(entry) for entry in entries] if entries else None
+
+    async def get_or_load(
+        self,
+        conversation_id: Any,
+        loader: Callable[[int], Awaitable[List[Dict[str, Any]]]]
+    ) -> Optional[List[Dict[str, Any]]]:
+        """Buffered messages of a conversation, loading them on a miss
+
+        `loader(limit)` returns up to `limit` message dicts, oldest first.
+        Returns None if the conversation does not fit in the buffer.
+        """
+        try:
+            redis = await self._client()
+            pipe = redis.pipeline(transaction=False)
+            pipe.lrange(self._key(conversation_id), 0, -1)
+            pipe.exists(self._too_long_key(conversation_id))
+            pipe.get(self._version_key(conversation_id))
+            entries, too_long, version = await pipe.execute()
+        except Exception as e:
+            logger.error(f"Conversation buffer unavailable: {e}")
+            return None
+        if entries:
+            return [orjson.loads(entry) for entry in entries]
+        if too_long:
+            return None
+
+        messages = await loader(self.max_messages + 1)
+        if not messages:
+            return None
+        if len(messages) > self.max_messages:
+            try:
+                await redis.set(self._too_long_key(conversation_id), 1, ex=self.ttl)
+            except Exception as e:
+                logger.error(f"Failed to mark conversation {conversation_id} as too long: {e}")
+            return None
+
+        try:
+            await self._store(conversation_id, messages, version)
+        except WatchError:
+            logger.debug(f"Conversation {conversation_id} changed while loading, not buffered")
+        except Exception as e:
+            logger.error(f"Failed to buffer conversation {conversation_id}: {e}")
+        return messages
+
+    async def append(self, rows: Iterable[Dict[str, Any]]):
+        """Add stored message rows to the conversations being buffered"""
+        by_conversation: Dict[str, List[bytes]] = defaultdict(list)
+        for row in rows:
+            by_conversation[str(row["conversation_id"])].append(orjson.dumps(row, default=str))
+        if not by_conversation:
+            return
+
+        try:
+            redis = await self._client()
+            pipe = redis.pipeline(transaction=False)
+            for conversation_id, entries in by_conversation.items():
+                pipe.incr(self._version_key(conversation_id))
+                pipe.expire(self._version_key(conversation_id), self.ttl)
+                pipe.rpushx(self._key(conversation_id), *entries)
+                pipe.expire(self._key(conversation_id), self.ttl)
+            results = await pipe.execute()
+
+            # RPUSHX replies with the new length: drop conversations that outgrew the buffer
+            lengths = results[2::4]
+            too_long = [
+                conversation_id
+                for conversation_id, length in zip(by_conversation, lengths)
+                if length > self.max_messages
+            ]
+            if too_long:
+                pipe = redis.pipeline(transaction=False)
+                pipe.delete(*(self._key(conversation_id) for conversation_id in too_long))
+                for conversation_id in too_long:
+                    pipe.set(self._too_long_key(conversation_id), 1, ex=self.ttl)
+                await pipe.execute()
+        except Exception as e:
+            logger.error(f"Failed to append {sum(map(len, by_conversation.values()))} messages to conversation buffers: {e}")
+
+    async def invalidate(self, conversation_ids: Iterable[Any]):
+        """Drop buffered conversations (e.g. after their read state changed)"""
+        conversation_ids = {str(conversation_id) for conversation_id in conversation_ids if conversation_id}
+        if not conversation_ids:
+            return
+        try:
+            redis = await self._client()
+            pipe = redis.pipeline(transaction=False)
+            for conversation_id in conversation_ids:
+                pipe.incr(self._version_key(conversation_id))
+                pipe.expire(self._version_key(conversation_id), self.ttl)
+                pipe.delete(self._key(conversation_id))
+            await pipe.execute()
+        except Exception as e:
+            logger.error(f"Failed to invalidate {len(conversation_ids)} buffered conversations: {e}")
+
+    async def _store(self, conversation_id: Any, messages: List[Dict[str, Any]], version: Optional[str]):
+        """Buffer a loaded conversation unless it was written since `version` was read"""
+        key, version_key = self._key(conversation_id), self._version_key(conversation_id)
+        async with (await self._client()).pipeline(transaction=True) as pipe:
+            await pipe.watch(version_key)
+            if await pipe.get(version_key) != version:
+                raise WatchError(f"Conversation {conversation_id} was written during the load")
+            pipe.multi()
+            pipe.delete(key)
+            pipe.rpush(key, *(orjson.dumps(message, default=str) for message in messages))
+            pipe.expire(key, self.ttl)
+            await pipe.execute()
+
+
+# Global instance
+_conversation_buffer: Optional[ConversationBuffer] = None
+
+
+def get_conversation_buffer() -> ConversationBuffer:
+    """Get or create the conversation buffer"""
+    global _conversation_buffer
+    if _conversation_buffer is None:
+        _conversation_buffer = ConversationBuffer()
+    return _conversation_buffer
+
+
+__all__ = ["ConversationBuffer", "get_conversation_buffer"]
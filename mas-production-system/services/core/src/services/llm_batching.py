@@ -0,0 +1,197 @@
+"""
+Micro-batching of concurrent LLM calls for local inference servers
+"""
+
+import asyncio
+from contextlib import nullcontext
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
+
+from src.config import settings
+from src.monitoring import track_llm_batch
+from src.services.llm_limiter import LLM_PRIORITIES, AdaptiveLimiter, current_llm_priority
+from src.utils.logger import get_logger
+
+logger = get_logger(__name__)
+
+BATCH_MODES = ("parallel", "completions")
+
+Single = Callable[[], Awaitable[str]]
+
+# params, single, estimated tokens, priority, future of the text
+Call = Tuple[Dict[str, Any], Single, float, str, asyncio.Future]
+
+
+def render_prompt(messages: List[Dict[str, Any]]) -> str:
+    """Plain-text rendering of chat messages for the completions endpoint"""
+    return "\n\n".join(f"{m['role']}: {m['content']}" for m in messages) + "\n\nassistant:"
+
+
+class MicroBatcher:
+    """Gathers the calls made to one local inference server within `window` seconds
+
+    Local servers (Ollama, LM Studio, llama.cpp, vLLM) batch the sequences
+    they decode together, so throughput depends on how requests arrive. A
+    batch is dispatched when `window` expires or `max_batch` calls are
+    waiting, in one of two modes:
+      - parallel: the calls are sent as individual chat requests over at
+        most `parallelism` streams, matching the server's parallel slots
+        (OLLAMA_NUM_PARALLEL, LM Studio's parallel requests), so the server
+        starts them together instead of queueing a burst
+      - completions: calls with the same model, temperature and max_tokens
+        are sent as one /v1/completions request with a list of prompts (for
+        servers accepting prompt lists), and the choices are dispatched back
+        by index; other calls go through the parallel path
+
+    With a `limiter`, each request sent to the server takes one admission
+    (a prompt-list request is admitted once, for the tokens of all its
+    prompts), so calls waiting in the batcher do not hold slots and a batch
+    can be larger than the concurrency limit.
+    """
+
+    def __init__(
+        self,
+        client: Any,
+        provider: str,
+        window: Optional[float] = None,
+        max_batch: Optional[int] = None,
+        parallelism: Optional[int] = None,
+        mode: Optional[str] = None,
+        limiter: Optional[AdaptiveLimiter] = None
+    ):
+        mode = mode or settings.LLM_BATCH_MODE
+        if mode not in BATCH_MODES:
+            raise ValueError(f"Unknown batch mode: {mode}. Available: {BATCH_MODES}")
+        self.client = client
+        self.provider = provider
+        self.window = settings.LLM_BATCH_WINDOW_MS / 1000 if window is None else window
+        self.max_batch = max_batch or settings.LLM_BATCH_MAX_SIZE
+        self.parallelism = parallelism or settings.LLM_BATCH_PARALLELISM
+        self.mode = mode
+        self.limiter = limiter
+        self._pending: List[Call] = []
+        self._timer: Optional[asyncio.TimerHandle] = None
+        self._streams: Optional[asyncio.Semaphore] = None
+        self._dispatches = set()
+
+    async def submit(
+        self,
+        params: Dict[str, Any],
+        single: Single,
+        tokens: float = 0,
+        priority: Optional[str] = None
+    ) -> str:
+        """Text generated for chat completion `params`
+
+        `single()` sends the call on its own; the batcher decides when.
+        `tokens` and `priority` are used for the limiter admission.
+        """
+        future = asyncio.get_running_loop().create_future()
+        self._pending.append((params, single, tokens, priority or current_llm_priority(), future))
+        if len(self._pending) >= self.max_batch:
+            self._flush()
+        elif self._timer is None:
+            self._timer = asyncio.get_running_loop().call_later(self.window, self._flush)
+        return await future
+
+    def _flush(self):
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        batch = [call for call in self._pending if not call[-1].done()]
+        self._pending = []
+        if not batch:
+            return
+        track_llm_batch(self.provider, len(batch))
+        task = asyncio.create_task(self._dispatch(batch))
+        self._dispatches.add(task)
+        task.add_done_callback(self._dispatches.discard)
+
+    def _slot(self, calls: List[Call]):
+        """Limiter admission of one request carrying `calls`"""
+        if self.limiter is None:
+            return nullcontext()
+        tokens = sum(call[2] for call in calls)
+        priority = min((call[3] for call in calls), key=lambda p: LLM_PRIORITIES.get(p, 0))
+        return self.limiter.slot(tokens, priority)
+
+    async def _dispatch(self, batch: List[Call]):
+        if self.mode == "parallel":
+            await asyncio.gather(*(self._send_single(call) for call in batch))
+            return
+
+        groups: Dict[Tuple[Any, ...], List[Call]] = {}
+        singles = []
+        for call in batch:
+            params = call[0]
+            if "response_format" in params:
+                singles.append(call)
+            else:
+                groups.setdefault((params["model"], params["temperature"], params["max_tokens"]), []).append(call)
+        batched = []
+        for group in groups.values():
+            if len(group) > 1:
+                batched.append(group)
+            else:
+                singles.extend(group)
+        await asyncio.gather(
+            *(self._send_completions(group) for group in batched),
+            *(self._send_single(call) for call in singles)
+        )
+
+    async def _send_single(self, call: Call):
+        _, single, *_, future = call
+        if self._streams is None:
+            self._streams = asyncio.Semaphore(self.parallelism)
+        async with self._streams:
+            if future.done():
+                return
+            try:
+                async with self._slot([call]):
+                    text = await single()
+            except Exception as e:
+                if not future.done():
+                    future.set_exception(e)
+                return
+        if not future.done():
+            future.set_result(text)
+
+    async def _send_completions(self, group: List[Call]):
+        params = group[0][0]
+        try:
+            async with self._slot(group):
+                response = await self.client.completions.create(
+                    model=params["model"],
+                    prompt=[render_prompt(call[0]["messages"]) for call in group],
+                    temperature=params["temperature"],
+                    max_tokens=params["max_tokens"],
+                    timeout=params.get("timeout")
+                )
+        except Exception as e:
+            for *_, future in group:
+                if not future.done():
+                    future.set_exception(e)
+            return
+
+        texts = {choice.index: choice.text for choice in response.choices}
+        for index, (*_, future) in enumerate(group):
+            if future.done():
+                continue
+            if index in texts:
+                future.set_result(texts[index])
+            else:
+                future.set_exception(RuntimeError(f"No completion for prompt {index} of the batch"))
+
+
+# Global instances, one per client (i.e. per provider endpoint)
+_llm_batchers: Dict[int, MicroBatcher] = {}
+
+
+def get_llm_batcher(provider: str, client: Any, limiter: Optional[AdaptiveLimiter] = None) -> MicroBatcher:
+    """Get or create the micro-batcher of a pooled provider client"""
+    batcher = _llm_batchers.get(id(client))
+    if batcher is None or batcher.client is not client:
+        batcher = _llm_batchers[id(client)] = MicroBatcher(client, provider, limiter=limiter)
+    return batcher
+
+
+__all__ = ["BATCH_MODES", "render_prompt", "MicroBatcher", "get_llm_batcher"]
@@ -0,0 +1,219 @@
+"""
+Response cache for LLMService.generate: exact-match tier and optional semantic tier
+"""
+
+import hashlib
+import time
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
+
+import numpy as np
+import orjson
+
+from src.cache import get_cache
+from src.config import settings
+from src.monitoring import track_llm_cache
+from src.utils.logger import get_logger
+
+logger = get_logger(__name__)
+
+Embed = Callable[[List[str]], Awaitable[List[List[float]]]]
+
+
+def _digest(*parts: Any) -> str:
+    return hashlib.sha256(orjson.dumps(parts)).hexdigest()
+
+
+@dataclass(slots=True)
+class CachedRequest:
+    """What a generated response depends on"""
+    model: str
+    system_prompt: Optional[str]
+    prompt: str
+    temperature: float
+    json_response: bool
+    key: str = field(init=False)
+    # Requests whose prompts may be compared by the semantic tier
+    scope: str = field(init=False)
+    embedding: Optional[np.ndarray] = field(default=None, init=False)
+
+    def __post_init__(self):
+        self.scope = _digest(self.model, self.system_prompt, self.temperature, self.json_response)
+        self.key = _digest(self.scope, self.prompt)
+
+
+class LLMResponseCache:
+    """Two-tier cache of successful LLM responses, shared by every LLMService of the process
+
+    The exact tier keys responses on model, system prompt, prompt,
+    temperature and json_response: an in-process LRU of `max_entries`
+    in front of Redis, so workers share what any of them generated. The
+    semantic tier, when enabled, also answers a prompt whose embedding is
+    within `similarity_threshold` (cosine) of a cached prompt with the same
+    model, system prompt and settings; prompt embeddings are kept in
+    process memory only. Entries expire after `ttl` seconds. Calls hotter
+    than `max_temperature` bypass both tiers, since their answers are
+    meant to vary.
+    """
+
+    def __init__(
+        self,
+        redis: Any = None,
+        max_entries: Optional[int] = None,
+        ttl: Optional[int] = None,
+        max_temperature: Optional[float] = None,
+        semantic: Optional[bool] = None,
+        similarity_threshold: Optional[float] = None,
+        semantic_max_entries: Optional[int] = None
+    ):
+        self.redis = redis
+        self.max_entries = max_entries or settings.LLM_CACHE_MAX_ENTRIES
+        self.ttl = ttl or settings.LLM_CACHE_TTL
+        self.max_temperature = settings.LLM_CACHE_MAX_TEMPERATURE if max_temperature is None else max_temperature
+        self.semantic = settings.LLM_SEMANTIC_CACHE_ENABLED if semantic is None else semantic
+        self.similarity_threshold = similarity_threshold or settings.LLM_SEMANTIC_CACHE_THRESHOLD
+        self.semantic_max_entries = semantic_max_entries or settings.LLM_SEMANTIC_CACHE_MAX_ENTRIES
+        # key -> (expiry, encoded response)
+        self._entries: OrderedDict[str, Tuple[float, bytes]] = OrderedDict()
+        # key -> (scope, normalized prompt embedding, expiry)
+        self._vectors: OrderedDict[str, Tuple[str, np.ndarray, float]] = OrderedDict()
+
+    def _redis_key(self, key: str) -> str:
+        return f"llm_cache:{key}"
+
+    async def _client(self):
+        if self.redis is None:
+            self.redis = await get_cache()
+        return self.redis
+
+    def cacheable(self, request: CachedRequest) -> bool:
+        return request.temperature <= self.max_temperature
+
+    async def get(self, request: CachedRequest, embed: Optional[Embed] = None) -> Optional[Dict[str, Any]]:
+        """Cached response for a request, None on a miss
+
+        `embed` computes prompt embeddings for the semantic tier; the
+        embedding is kept on the request for the following `set`.
+        """
+        if not self.cacheable(request):
+            track_llm_cache("exact", "bypass")
+            return None
+
+        response = await self._get_exact(request.key)
+        track_llm_cache("exact", "hit" if response is not None else "miss")
+        if response is not None:
+            response["cached"] = "exact"
+            return response
+
+        if not self.semantic or embed is None:
+            return None
+        key = await self._nearest(request, embed)
+        response = await self._get_exact(key) if key else None
+        track_llm_cache("semantic", "hit" if response is not None else "miss")
+        if response is not None:
+            response["cached"] = "semantic"
+        elif key:
+            self._vectors.pop(key, None)
+        return response
+
+    async def set(self, request: CachedRequest, response: Dict[str, Any], embed: Optional[Embed] = None):
+        """Cache a successful response"""
+        if not self.cacheable(request) or not response.get("success"):
+            return
+
+        payload = orjson.dumps(response, default=str)
+        self._remember(request.key, payload, time.monotonic() + self.ttl)
+        try:
+            redis = await self._client()
+            await redis.set(self._redis_key(request.key), payload, ex=self.ttl)
+        except Exception as e:
+            logger.error(f"Failed to store LLM response in Redis: {e}")
+
+        if self.semantic and embed is not None:
+            if request.embedding is None:
+                request.embedding = await self._embed(request.prompt, embed)
+            if request.embedding is not None:
+                self._vectors[request.key] = (request.scope, request.embedding, time.monotonic() + self.ttl)
+                self._vectors.move_to_end(request.key)
+                while len(self._vectors) > self.semantic_max_entries:
+                    self._vectors.popitem(last=False)
+
+    def clear(self):
+        """Forget the in-process entries (Redis entries expire on their own)"""
+        self._entries.clear()
+        self._vectors.clear()
+
+    async def _get_exact(self, key: str) -> Optional[Dict[str, Any]]:
+        now = time.monotonic()
+        entry = self._entries.get(key)
+        if entry is not None:
+            expires_at, payload = entry
+            if expires_at > now:
+                self._entries.move_to_end(key)
+                return orjson.loads(payload)
+            del self._entries[key]
+
+        try:
+            redis = await self._client()
+            pipe = redis.pipeline(transaction=False)
+            pipe.get(self._redis_key(key))
+            pipe.ttl(self._redis_key(key))
+            payload, ttl = await pipe.execute()
+        except Exception as e:
+            logger.error(f"Failed to read LLM response from Redis: {e}")
+            return None
+        if payload is None:
+            return None
+        payload = payload.encode() if isinstance(payload, str) else payload
+        self._remember(key, payload, now + (ttl if ttl > 0 else self.ttl))
+        return orjson.loads(payload)
+
+    def _remember(self, key: str, payload: bytes, expires_at: float):
+        self._entries[key] = (expires_at, payload)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    async def _nearest(self, request: CachedRequest, embed: Embed) -> Optional[str]:
+        """Key of the most similar cached prompt in the request's scope, if similar enough"""
+        now = time.monotonic()
+        candidates = [
+            (key, vector) for key, (scope, vector, expires_at) in self._vectors.items()
+            if scope == request.scope and expires_at > now
+        ]
+        if not candidates:
+            return None
+        request.embedding = await self._embed(request.prompt, embed)
+        if request.embedding is None:
+            return None
+
+        similarities = np.stack([vector for _, vector in candidates]) @ request.embedding
+        best = int(np.argmax(similarities))
+        if similarities[best] < self.similarity_threshold:
+            return None
+        return candidates[best][0]
+
+    async def _embed(self, prompt: str, embed: Embed) -> Optional[np.ndarray]:
+        try:
+            vector = np.asarray((await embed([prompt]))[0], dtype=np.float32)
+        except Exception as e:
+            logger.error(f"Failed to embed prompt for the semantic cache: {e}")
+            return None
+        norm = np.linalg.norm(vector)
+        return vector / norm if norm else None
+
+
+# Global instance
+_llm_response_cache: Optional[LLMResponseCache] = None
+
+
+def get_llm_response_cache() -> LLMResponseCache:
+    """Get or create the LLM response cache"""
+    global _llm_response_cache
+    if _llm_response_cache is None:
+        _llm_response_cache = LLMResponseCache()
+    return _llm_response_cache
+
+
+__all__ = ["CachedRequest", "LLMResponseCache", "get_llm_response_cache"]
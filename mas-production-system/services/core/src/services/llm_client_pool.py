@@ -0,0 +1,118 @@
+"""
+Process-wide pool of LLM provider clients shared by every LLMService
+"""
+
+import importlib.util
+from typing import Any, Dict, Optional, Tuple
+
+import httpx
+from openai import AsyncOpenAI
+
+from src.config import settings
+from src.utils.logger import get_logger
+
+logger = get_logger(__name__)
+
+# Providers served by a local inference server (HTTP/1.1 only)
+LOCAL_PROVIDERS = ("ollama", "lmstudio")
+
+
+def http2_available() -> bool:
+    """HTTP/2 needs the optional h2 package (httpx[http2])"""
+    return importlib.util.find_spec("h2") is not None
+
+
+class LLMClientPool:
+    """One AsyncOpenAI client, and so one httpx connection pool, per provider endpoint
+
+    LLMService instances are handles onto these clients: starting an agent
+    no longer opens a pool of its own, and every agent of the process
+    reuses the same keep-alive connections. Hosted providers get
+    `max_connections` connections and HTTP/2 when enabled (many requests
+    multiplexed on a few connections); local inference servers get
+    `local_max_connections` connections, since they serve few requests in
+    parallel anyway.
+    """
+
+    def __init__(
+        self,
+        max_connections: Optional[int] = None,
+        local_max_connections: Optional[int] = None,
+        max_keepalive_connections: Optional[int] = None,
+        keepalive_expiry: Optional[float] = None,
+        http2: Optional[bool] = None
+    ):
+        self.max_connections = max_connections or settings.LLM_POOL_MAX_CONNECTIONS
+        self.local_max_connections = local_max_connections or settings.LLM_LOCAL_POOL_MAX_CONNECTIONS
+        self.max_keepalive_connections = max_keepalive_connections or settings.LLM_POOL_MAX_KEEPALIVE
+        self.keepalive_expiry = keepalive_expiry or settings.LLM_POOL_KEEPALIVE_EXPIRY
+        self.http2 = settings.LLM_HTTP2 if http2 is None else http2
+        if self.http2 and not http2_available():
+            logger.warning("HTTP/2 requested for LLM clients but h2 is not installed, using HTTP/1.1")
+            self.http2 = False
+        # (provider, base_url, api_key) -> client
+        self._clients: Dict[Tuple[str, Optional[str], str], AsyncOpenAI] = {}
+
+    def limits_for(self, provider: str) -> httpx.Limits:
+        max_connections = self.local_max_connections if provider in LOCAL_PROVIDERS else self.max_connections
+        return httpx.Limits(
+            max_connections=max_connections,
+            max_keepalive_connections=min(self.max_keepalive_connections, max_connections),
+            keepalive_expiry=self.keepalive_expiry
+        )
+
+    def client(
+        self,
+        provider: str,
+        api_key: str,
+        base_url: Optional[str] = None,
+        timeout: Any = None
+    ) -> AsyncOpenAI:
+        """Shared client of a provider endpoint, created on first use"""
+        key = (provider, base_url, api_key)
+        client = self._clients.get(key)
+        if client is None:
+            http_client = httpx.AsyncClient(
+                limits=self.limits_for(provider),
+                timeout=timeout,
+                http2=self.http2 and provider not in LOCAL_PROVIDERS
+            )
+            client = AsyncOpenAI(api_key=api_key, base_url=base_url, timeout=timeout, http_client=http_client)
+            self._clients[key] = client
+            logger.info(f"Created pooled {provider} LLM client for {base_url or 'default endpoint'}")
+        return client
+
+    def __len__(self) -> int:
+        return len(self._clients)
+
+    async def close(self):
+        """Close every pooled client and its connections"""
+        clients, self._clients = list(self._clients.values()), {}
+        for client in clients:
+            try:
+                await client.close()
+            except Exception as e:
+                logger.error(f"Failed to close LLM client: {e}")
+
+
+# Global instance
+_llm_client_pool: Optional[LLMClientPool] = None
+
+
+def get_llm_client_pool() -> LLMClientPool:
+    """Get or create the LLM client pool"""
+    global _llm_client_pool
+    if _llm_client_pool is None:
+        _llm_client_pool = LLMClientPool()
+    return _llm_client_pool
+
+
+async def close_llm_client_pool():
+    """Close the pooled LLM clients (on shutdown)"""
+    global _llm_client_pool
+    if _llm_client_pool is not None:
+        await _llm_client_pool.close()
+        _llm_client_pool = None
+
+
+__all__ = ["LOCAL_PROVIDERS", "LLMClientPool", "get_llm_client_pool", "close_llm_client_pool"]
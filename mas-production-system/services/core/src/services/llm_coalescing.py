@@ -0,0 +1,65 @@
+"""
+Single-flight coalescing of identical in-flight LLM calls
+"""
+
+import asyncio
+import hashlib
+from typing import Any, Awaitable, Callable, Dict, Optional, Tuple
+
+import orjson
+
+from src.utils.logger import get_logger
+
+logger = get_logger(__name__)
+
+
+def request_fingerprint(*parts: Any) -> str:
+    """Stable digest of everything an upstream call's result depends on"""
+    return hashlib.sha256(orjson.dumps(parts, default=str)).hexdigest()
+
+
+class SingleFlight:
+    """Runs one call per key at a time and shares its result with concurrent callers
+
+    The call runs in its own task: a caller that is cancelled does not
+    cancel it for the others. The key is released once the call finishes,
+    so later callers start a new one.
+    """
+
+    def __init__(self):
+        self._calls: Dict[str, asyncio.Future] = {}
+
+    @property
+    def in_flight(self) -> int:
+        return len(self._calls)
+
+    async def do(self, key: str, call: Callable[[], Awaitable[Any]]) -> Tuple[Any, bool]:
+        """Result of `call()`, or of the identical call in flight; True when shared"""
+        future = self._calls.get(key)
+        shared = future is not None
+        if future is None:
+            future = asyncio.ensure_future(call())
+            self._calls[key] = future
+            future.add_done_callback(lambda done: self._release(key, done))
+        return await asyncio.shield(future), shared
+
+    def _release(self, key: str, future: asyncio.Future):
+        if self._calls.get(key) is future:
+            del self._calls[key]
+        if not future.cancelled() and future.exception() is not None:
+            logger.debug(f"Coalesced call {key[:12]} failed: {future.exception()}")
+
+
+# Global instance
+_llm_single_flight: Optional[SingleFlight] = None
+
+
+def get_llm_single_flight() -> SingleFlight:
+    """Get or create the process-wide single-flight group of LLM calls"""
+    global _llm_single_flight
+    if _llm_single_flight is None:
+        _llm_single_flight = SingleFlight()
+    return _llm_single_flight
+
+
+__all__ = ["request_fingerprint", "SingleFlight", "get_llm_single_flight"]
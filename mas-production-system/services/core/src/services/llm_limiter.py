@@ -0,0 +1,234 @@
+"""
+Adaptive concurrency limiter and token-bucket rate control for LLM providers
+"""
+
+import asyncio
+import heapq
+import itertools
+import time
+from contextlib import asynccontextmanager, contextmanager
+from contextvars import ContextVar
+from typing import Dict, List, Optional, Tuple
+
+import httpx
+from openai import APITimeoutError, RateLimitError
+
+from src.config import settings
+from src.services.llm_client_pool import get_llm_client_pool
+from src.monitoring import track_llm_congestion, track_llm_limiter_wait, update_llm_concurrency
+from src.utils.logger import get_logger
+
+logger = get_logger(__name__)
+
+# Admission order of waiting calls, most urgent first
+LLM_PRIORITIES = {"interactive": 0, "background": 1}
+
+_priority: ContextVar[str] = ContextVar("llm_priority", default="interactive")
+
+
+@contextmanager
+def llm_priority(priority: str):
+    """Run the LLM calls of a block with `priority` (e.g. background for BDI cycles)"""
+    if priority not in LLM_PRIORITIES:
+        raise ValueError(f"Unknown LLM priority: {priority}. Available: {list(LLM_PRIORITIES)}")
+    token = _priority.set(priority)
+    try:
+        yield
+    finally:
+        _priority.reset(token)
+
+
+def current_llm_priority() -> str:
+    return _priority.get()
+
+
+def congestion_signal(error: BaseException) -> Optional[str]:
+    """How a provider error reflects on its load, None when it does not"""
+    if isinstance(error, RateLimitError):
+        return "rate_limited"
+    if isinstance(error, (APITimeoutError, asyncio.TimeoutError, httpx.TimeoutException)):
+        return "timeout"
+    return None
+
+
+class TokenBucket:
+    """Refills `per_minute` units per minute, holding at most one minute's worth"""
+
+    def __init__(self, per_minute: float):
+        self.rate = per_minute / 60
+        self.capacity = per_minute
+        self.tokens = float(per_minute)
+        self.updated = time.monotonic()
+
+    def _refill(self):
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def wait_time(self, amount: float) -> float:
+        """Seconds until `amount` units are available (requests above capacity wait for a full bucket)"""
+        self._refill()
+        amount = min(amount, self.capacity)
+        return 0.0 if self.tokens >= amount else (amount - self.tokens) / self.rate
+
+    def take(self, amount: float):
+        self.tokens -= min(amount, self.capacity)
+
+    def drain(self):
+        """Empty the bucket, e.g. when the provider says we are over its rate"""
+        self._refill()
+        self.tokens = min(self.tokens, 0.0)
+
+
+class AdaptiveLimiter:
+    """Admits calls to one LLM provider under an AIMD concurrency limit and rate buckets
+
+    The concurrency limit grows by one per window of successful calls while
+    it is fully used (additive increase) and is multiplied by `backoff` on
+    a 429, a timeout or a call slower than `latency_target` (multiplicative
+    decrease), once per window: signals from calls started before the last
+    decrease are ignored. Calls also wait for the requests-per-minute and
+    tokens-per-minute buckets when those are set. Waiting calls are
+    admitted by priority (interactive before background), then in order.
+    """
+
+    def __init__(
+        self,
+        provider: str,
+        max_concurrency: int,
+        initial_concurrency: Optional[int] = None,
+        min_concurrency: int = 1,
+        requests_per_minute: Optional[int] = None,
+        tokens_per_minute: Optional[int] = None,
+        latency_target: Optional[float] = None,
+        backoff: Optional[float] = None
+    ):
+        self.provider = provider
+        self.max_concurrency = max(max_concurrency, min_concurrency)
+        self.min_concurrency = min_concurrency
+        initial = initial_concurrency or settings.LLM_CONCURRENCY_INITIAL
+        self.limit = float(min(max(initial, min_concurrency), self.max_concurrency))
+        self.latency_target = latency_target or settings.LLM_LATENCY_TARGET
+        self.backoff = backoff or settings.LLM_CONCURRENCY_BACKOFF
+        rpm = settings.LLM_REQUESTS_PER_MINUTE if requests_per_minute is None else requests_per_minute
+        tpm = settings.LLM_TOKENS_PER_MINUTE if tokens_per_minute is None else tokens_per_minute
+        self.requests = TokenBucket(rpm) if rpm else None
+        self.tokens = TokenBucket(tpm) if tpm else None
+        self.in_flight = 0
+        self._waiters: List[Tuple[int, int, float, asyncio.Future]] = []
+        self._sequence = itertools.count()
+        self._timer: Optional[asyncio.TimerHandle] = None
+        self._last_decrease = 0.0
+        self._track()
+
+    @property
+    def waiting(self) -> int:
+        return sum(1 for *_, future in self._waiters if not future.done())
+
+    @asynccontextmanager
+    async def slot(self, tokens: float = 0, priority: Optional[str] = None):
+        """Hold an admission for the duration of one provider call"""
+        priority = priority or current_llm_priority()
+        requested = time.monotonic()
+        await self._acquire(tokens, priority)
+        started = time.monotonic()
+        track_llm_limiter_wait(self.provider, priority, started - requested)
+        signal = None
+        try:
+            yield
+        except BaseException as e:
+            signal = congestion_signal(e)
+            raise
+        finally:
+            if signal is None and time.monotonic() - started > self.latency_target:
+                signal = "slow"
+            self._release(started, signal)
+
+    async def _acquire(self, tokens: float, priority: str):
+        future = asyncio.get_running_loop().create_future()
+        heapq.heappush(self._waiters, (LLM_PRIORITIES.get(priority, 0), next(self._sequence), tokens, future))
+        self._admit()
+        try:
+            await future
+        except asyncio.CancelledError:
+            if future.done() and not future.cancelled():
+                # Admitted while being cancelled: give the slot back
+                self.in_flight -= 1
+            self._admit()
+            raise
+
+    def _admit(self):
+        """Admit waiting calls while the limit and the buckets allow"""
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        while self._waiters:
+            *_, tokens, future = self._waiters[0]
+            if future.done():
+                heapq.heappop(self._waiters)
+                continue
+            if self.in_flight >= int(self.limit):
+                break
+            wait = max(
+                self.requests.wait_time(1) if self.requests else 0.0,
+                self.tokens.wait_time(tokens) if self.tokens else 0.0
+            )
+            if wait > 0:
+                self._timer = asyncio.get_running_loop().call_later(wait, self._admit)
+                break
+            heapq.heappop(self._waiters)
+            if self.requests:
+                self.requests.take(1)
+            if self.tokens:
+                self.tokens.take(tokens)
+            self.in_flight += 1
+            future.set_result(None)
+        self._track()
+
+    def _release(self, started: float, signal: Optional[str]):
+        saturated = self.in_flight >= int(self.limit)
+        self.in_flight -= 1
+        if signal is not None:
+            track_llm_congestion(self.provider, signal)
+            if started >= self._last_decrease:
+                self.limit = max(float(self.min_concurrency), self.limit * self.backoff)
+                self._last_decrease = time.monotonic()
+                logger.info(f"LLM provider {self.provider} congested ({signal}), concurrency limit {self.limit:.1f}")
+            if signal == "rate_limited" and self.requests:
+                self.requests.drain()
+        elif saturated:
+            self.limit = min(float(self.max_concurrency), self.limit + 1 / self.limit)
+        self._admit()
+
+    def _track(self):
+        update_llm_concurrency(self.provider, self.limit, self.in_flight)
+
+
+def estimate_tokens(*texts: Optional[str], max_tokens: int = 0) -> int:
+    """Rough token cost of a call: ~4 characters per prompt token plus the completion budget"""
+    return sum(len(text) for text in texts if text) // 4 + max_tokens
+
+
+# Global instances, one per provider
+_llm_limiters: Dict[str, AdaptiveLimiter] = {}
+
+
+def get_llm_limiter(provider: str) -> AdaptiveLimiter:
+    """Get or create the limiter of a provider, its concurrency capped by its connection pool"""
+    limiter = _llm_limiters.get(provider)
+    if limiter is None:
+        max_concurrency = get_llm_client_pool().limits_for(provider).max_connections
+        limiter = _llm_limiters[provider] = AdaptiveLimiter(provider, max_concurrency)
+    return limiter
+
+
+__all__ = [
+    "LLM_PRIORITIES",
+    "llm_priority",
+    "current_llm_priority",
+    "congestion_signal",
+    "TokenBucket",
+    "AdaptiveLimiter",
+    "estimate_tokens",
+    "get_llm_limiter"
+]
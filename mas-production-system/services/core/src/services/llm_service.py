@@ -3,16 +3,22 @@ Service LLM avec gestion robuste des timeouts et du streaming
 """
 
 import asyncio
+import copy
 import json
 import logging
 import os
 import time
 from typing import Optional, Dict, Any, List
-from openai import AsyncOpenAI
 import httpx
 from tenacity import retry, stop_after_attempt, wait_exponential
 
 from ..config import settings
+from ..monitoring import track_llm_coalesced
+from .llm_cache import CachedRequest, get_llm_response_cache
+from .llm_batching import get_llm_batcher
+from .llm_client_pool import LOCAL_PROVIDERS, get_llm_client_pool
+from .llm_coalescing import get_llm_single_flight, request_fingerprint
+from .llm_limiter import current_llm_priority, estimate_tokens, get_llm_limiter
 
 logger = logging.getLogger(__name__)
 
@@ -44,13 +50,14 @@ class LLMService:
         invalid_key = self.api_key in ["dummy_key", "mock_key_for_testing", None, ""] and not (provider_is_lmstudio or provider_is_ollama)
         
         # Debug logging
-        logger.info(f"LLM Service init: provider={settings.LLM_PROVIDER}, enable_mock_env={enable_mock_env}, invalid_key={invalid_key}")
+        logger.debug(f"LLM Service init: provider={settings.LLM_PROVIDER}, enable_mock_env={enable_mock_env}, invalid_key={invalid_key}")
         
         # Don't use getattr with False default - it might override env vars
         settings_enable_mock = hasattr(settings, 'ENABLE_MOCK_LLM') and settings.ENABLE_MOCK_LLM
         self.enable_mock = enable_mock_env or provider_is_mock or settings_enable_mock or (invalid_key and not (provider_is_lmstudio or provider_is_ollama))
         
-        # Client avec timeout adaptatif
+        # Client avec timeout adaptatif, partagé via le pool du processus : ce
+        # service n'est qu'un handle léger, créé à chaque démarrage d'agent
         self.timeout = httpx.Timeout(
             connect=30.0,
             read=600.0,    # 10 minutes pour la lecture
@@ -64,12 +71,13 @@ class LLMService:
         elif provider_is_lmstudio:
             # LMStudio doesn't need an API key
             try:
-                self.client = AsyncOpenAI(
+                self.client = get_llm_client_pool().client(
+                    'lmstudio',
                     api_key="lm-studio",  # LMStudio ignores this
                     base_url=settings.LLM_BASE_URL or settings.LMSTUDIO_BASE_URL,
                     timeout=self.timeout
                 )
-                logger.info(f"LLM Service initialized with LMStudio at {settings.LLM_BASE_URL}")
+                logger.debug(f"LLM Service initialized with LMStudio at {settings.LLM_BASE_URL}")
             except Exception as e:
                 logger.error(f"Failed to initialize LMStudio client: {e}")
                 self.client = None
@@ -77,23 +85,25 @@ class LLMService:
         elif provider_is_ollama:
             # Ollama doesn't need an API key either
             try:
-                self.client = AsyncOpenAI(
+                self.client = get_llm_client_pool().client(
+                    'ollama',
                     api_key="ollama",  # Ollama ignores this
                     base_url=settings.LLM_BASE_URL or settings.OLLAMA_HOST,
                     timeout=self.timeout
                 )
-                logger.info(f"LLM Service initialized with Ollama at {settings.LLM_BASE_URL}")
+                logger.debug(f"LLM Service initialized with Ollama at {settings.LLM_BASE_URL}")
             except Exception as e:
                 logger.error(f"Failed to initialize Ollama client: {e}")
                 self.client = None
                 self.enable_mock = True
         elif self.api_key and self.api_key not in ["dummy_key", "mock_key_for_testing"]:
             try:
-                self.client = AsyncOpenAI(
+                self.client = get_llm_client_pool().client(
+                    'openai',
                     api_key=self.api_key,
                     timeout=self.timeout
                 )
-                logger.info(f"LLM Service initialized with real API key")
+                logger.debug(f"LLM Service initialized with real API key")
             except Exception as e:
                 logger.error(f"Failed to initialize OpenAI client: {e}")
                 self.client = None
@@ -103,7 +113,18 @@ class LLMService:
             self.enable_mock = True
             logger.warning("LLM Service initialized without valid API key - using mock mode")
         
-        logger.info(f"LLM Service initialized with model: {self.model}, mock_mode: {self.enable_mock}")
+        # Cache des réponses partagé par tous les services du processus
+        self.response_cache = get_llm_response_cache() if settings.LLM_CACHE_ENABLED and not self.enable_mock else None
+        # Les appels identiques simultanés partagent un seul appel au fournisseur
+        self.single_flight = get_llm_single_flight() if settings.LLM_COALESCING_ENABLED else None
+        # Limiteur de concurrence et de débit partagé par les services du même fournisseur
+        self.limiter = get_llm_limiter(settings.LLM_PROVIDER) if settings.LLM_LIMITER_ENABLED and not self.enable_mock else None
+        # Micro-batching des appels simultanés vers un serveur d'inférence local
+        self.batcher = None
+        if settings.LLM_BATCHING_ENABLED and self.client and settings.LLM_PROVIDER in LOCAL_PROVIDERS:
+            self.batcher = get_llm_batcher(settings.LLM_PROVIDER, self.client, self.limiter)
+        
+        logger.debug(f"LLM Service initialized with model: {self.model}, mock_mode: {self.enable_mock}")
     
     def _get_timeout_for_task(self, task_type: str = 'default', 
                              model: Optional[str] = None) -> int:
@@ -112,10 +133,6 @@ class LLMService:
             return self.TIMEOUT_CONFIG.get('reasoning', 600)
         return self.TIMEOUT_CONFIG.get(task_type, self.TIMEOUT_CONFIG['default'])
     
-    @retry(
-        stop=stop_after_attempt(5),
-        wait=wait_exponential(multiplier=2, min=10, max=60)
-    )
     async def generate(
         self,
         prompt: str,
@@ -124,11 +141,20 @@ class LLMService:
         max_tokens: Optional[int] = None,
         json_response: bool = True,
         task_type: str = 'normal',
-        stream: bool = False
+        stream: bool = False,
+        priority: Optional[str] = None
     ) -> Dict[str, Any]:
         """
         Génère une réponse avec gestion robuste des timeouts et du streaming
         
+        Les réponses réussies sont mises en cache (voir LLMResponseCache) : un
+        prompt identique, ou paraphrasé si le cache sémantique est activé, est
+        servi sans appel au fournisseur. Les réponses servies du cache portent
+        la clé "cached" ("exact" ou "semantic"). Les appels identiques lancés
+        pendant qu'un autre est en cours attendent et partagent son résultat.
+        Les appels au fournisseur passent par son limiteur adaptatif (voir
+        AdaptiveLimiter), qui sert les appels interactifs avant les cycles BDI.
+        
         Args:
             prompt: Le prompt utilisateur
             system_prompt: Le prompt système (optionnel)
@@ -137,6 +163,8 @@ class LLMService:
             json_response: Si True, force une réponse JSON valide
             task_type: Type de tâche pour ajuster le timeout
             stream: Si True, utilise le streaming pour éviter les timeouts
+            priority: "interactive" ou "background" (par défaut, celle du
+                contexte, voir llm_priority)
         
         Returns:
             Dictionnaire contenant la réponse
@@ -145,6 +173,50 @@ class LLMService:
         if self.enable_mock or not self.client:
             return self._generate_mock_response(prompt, json_response)
         
+        priority = priority or current_llm_priority()
+        request = None
+        embed = None
+        if self.response_cache is not None:
+            request = CachedRequest(self.model, system_prompt, prompt, temperature, json_response)
+            embed = self.generate_embeddings if self.response_cache.semantic else None
+            cached = await self.response_cache.get(request, embed)
+            if cached is not None:
+                return cached
+        
+        async def call() -> Dict[str, Any]:
+            response = await self._generate(
+                prompt, system_prompt, temperature, max_tokens, json_response, task_type, stream, priority
+            )
+            if request is not None:
+                await self.response_cache.set(request, response, embed)
+            return response
+        
+        if self.single_flight is None:
+            return await call()
+        
+        key = request_fingerprint(self.model, system_prompt, prompt, temperature, max_tokens, json_response)
+        response, shared = await self.single_flight.do(key, call)
+        if shared:
+            track_llm_coalesced(self.model)
+        # Chaque appelant reçoit sa propre copie de la réponse partagée
+        return copy.deepcopy(response)
+    
+    @retry(
+        stop=stop_after_attempt(5),
+        wait=wait_exponential(multiplier=2, min=10, max=60)
+    )
+    async def _generate(
+        self,
+        prompt: str,
+        system_prompt: Optional[str],
+        temperature: float,
+        max_tokens: Optional[int],
+        json_response: bool,
+        task_type: str,
+        stream: bool,
+        priority: Optional[str] = None
+    ) -> Dict[str, Any]:
+        """Appel au fournisseur, sans cache"""
         try:
             messages = []
             
@@ -195,21 +267,14 @@ The JSON object MUST start with {{ and end with }}. Do not include any text afte
             if json_response and self.model in ['gpt-4-1106-preview', 'gpt-3.5-turbo-1106']:
                 generation_params["response_format"] = {"type": "json_object"}
             
-            # Génération avec ou sans streaming
-            if stream:
-                response_text = await self._generate_streaming(generation_params)
+            # Génération avec ou sans streaming, admise par le limiteur du fournisseur
+            tokens = estimate_tokens(system_prompt, user_content, max_tokens=generation_params["max_tokens"])
+            if self.limiter is None or (self.batcher is not None and not stream):
+                # Le micro-batcher prend une admission par requête envoyée au serveur
+                response_text = await self._complete(generation_params, stream, tokens, priority)
             else:
-                response = await self.client.chat.completions.create(**generation_params)
-                # Handle phi-4-mini-reasoning format which uses reasoning_content
-                message = response.choices[0].message
-                if hasattr(message, 'content') and message.content:
-                    response_text = message.content
-                elif hasattr(message, 'reasoning_content') and message.reasoning_content:
-                    response_text = message.reasoning_content
-                else:
-                    # Try to get content from dict representation
-                    msg_dict = message.model_dump() if hasattr(message, 'model_dump') else message.__dict__
-                    response_text = msg_dict.get('content') or msg_dict.get('reasoning_content') or ""
+                async with self.limiter.slot(tokens, priority):
+                    response_text = await self._complete(generation_params, stream)
             
             logger.info(f"Generated response length: {len(response_text)} characters")
             
@@ -268,6 +333,35 @@ The JSON object MUST start with {{ and end with }}. Do not include any text afte
                 "fallback_response": self._create_fallback_response(prompt)
             }
     
+    async def _complete(self, params: Dict[str, Any], stream: bool, tokens: float = 0,
+                        priority: Optional[str] = None) -> str:
+        """Un appel au fournisseur, renvoie le texte généré"""
+        if stream:
+            return await self._generate_streaming(params)
+        if self.batcher is not None:
+            return await self.batcher.submit(params, lambda: self._chat_completion(params), tokens, priority)
+        return await self._chat_completion(params)
+    
+    async def _chat_completion(self, params: Dict[str, Any]) -> str:
+        """Une requête de chat completion, renvoie le texte généré"""
+        response = await self.client.chat.completions.create(**params)
+        # Handle phi-4-mini-reasoning format which uses reasoning_content
+        message = response.choices[0].message
+        if hasattr(message, 'content') and message.content:
+            return message.content
+        elif hasattr(message, 'reasoning_content') and message.reasoning_content:
+            return message.reasoning_content
+        # Try to get content from dict representation
+        msg_dict = message.model_dump() if hasattr(message, 'model_dump') else message.__dict__
+        return msg_dict.get('content') or msg_dict.get('reasoning_content') or ""
+    
+    async def generate_embeddings(self, texts: List[str]) -> List[List[float]]:
+        """Calcule les embeddings de plusieurs textes en un appel"""
+        if self.enable_mock or not self.client:
+            raise RuntimeError("Embeddings are not available in mock mode")
+        response = await self.client.embeddings.create(model=settings.LLM_EMBEDDING_MODEL, input=texts)
+        return [item.embedding for item in response.data]
+    
     async def _generate_streaming(self, params: Dict[str, Any]) -> str:
         """Génère une réponse en mode streaming pour éviter les timeouts"""
         params['stream'] = True
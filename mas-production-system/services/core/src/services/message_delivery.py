@@ -4,36 +4,84 @@ Service de livraison des messages aux agents actifs
 
 import asyncio
 import json
-from typing import Optional
+import os
+import socket
+import time
+from typing import Any, Dict, List, Optional, Tuple
 from uuid import UUID
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import select, and_
+from redis.exceptions import ResponseError
 
 from src.database.models import Message, Agent
 from src.core.agents import get_agent_runtime
+from src.core.agents.sharding import get_sharded_runtime
+from src.core.agents.queues import MailboxStatus
+from src.core.agents.messages import AgentMessage
+from src.config import settings
+from src.monitoring import track_message_delivery
 from src.utils.logger import get_logger
-from src.cache import get as cache_get
+from src.cache import get_cache
 
 logger = get_logger(__name__)
 
+# Statuts de livraison : ceux de la boîte aux lettres (MailboxStatus), plus
+NOT_RUNNING = "not_running"
+FAILED = "failed"
+QUEUED = "queued"  # Ajouté au flux de livraison du shard destinataire
+# Statuts pour lesquels l'agent a bien reçu le message
+DELIVERED_STATUSES = {
+    MailboxStatus.ACCEPTED.value,
+    MailboxStatus.SPILLED.value,
+    MailboxStatus.DROPPED_OLDEST.value
+}
+
+STREAM_PREFIX = "mas:messages:shard"
+CONSUMER_GROUP = "delivery"
+
 
 class MessageDeliveryService:
-    """Service pour livrer les messages aux agents en cours d'exécution"""
+    """Service pour livrer les messages aux agents en cours d'exécution
+    
+    Les messages sont ajoutés (XADD) au flux Redis du shard qui possède
+    l'agent destinataire ; chaque worker lit son flux via un groupe de
+    consommateurs (XREADGROUP bloquant) et acquitte (XACK) une fois le
+    message accepté par la boîte aux lettres : livraison au moins une fois.
+    Les entrées non acquittées (boîte pleine, échec) sont reprises avec
+    XAUTOCLAIM après MESSAGE_STREAM_RETRY_IDLE_MS.
+    """
     
-    def __init__(self):
+    def __init__(self, redis: Any = None):
         self.runtime = get_agent_runtime()
+        # Messages for agents owned by another worker are forwarded to it
+        self.shards = get_sharded_runtime()
+        self.shards.set_deliver_handler(self._deliver_local)
+        # Messages between agents of different workers go through the streams
+        self.runtime.set_message_forwarder(self._forward)
+        self.redis = redis
+        self.consumer = f"{socket.gethostname()}-{os.getpid()}"
         self._running = False
         self._delivery_task = None
         
+    def stream_key(self, shard_id: int) -> str:
+        """Clé du flux de livraison d'un shard"""
+        return f"{STREAM_PREFIX}:{shard_id}"
+        
     async def start(self):
         """Démarrer le service de livraison"""
         if self._running:
             logger.warning("Message delivery service already running")
             return
-            
+        
+        if self.redis is None:
+            self.redis = await get_cache()
+        # Le shard de ce worker doit être connu pour savoir quel flux lire
+        await self.shards.start()
+        await self._ensure_group(self.stream_key(self.shards.shard_id))
+        
         self._running = True
         self._delivery_task = asyncio.create_task(self._delivery_loop())
-        logger.info("Message delivery service started")
+        logger.info(f"Message delivery service started on stream {self.stream_key(self.shards.shard_id)}")
         
     async def stop(self):
         """Arrêter le service de livraison"""
@@ -46,85 +94,170 @@ class MessageDeliveryService:
                 pass
         logger.info("Message delivery service stopped")
         
+    async def _ensure_group(self, stream: str):
+        """Créer le groupe de consommateurs (et le flux) s'il n'existe pas"""
+        try:
+            await self.redis.xgroup_create(stream, CONSUMER_GROUP, id="0", mkstream=True)
+        except ResponseError as e:
+            if "BUSYGROUP" not in str(e):
+                raise
+        
+    async def enqueue(self, agent_id: UUID, message_data: dict) -> str:
+        """Ajouter un message au flux du shard qui possède l'agent"""
+        stream, fields = self._stream_entry(agent_id, message_data)
+        await self.redis.xadd(stream, fields, maxlen=settings.MESSAGE_STREAM_MAXLEN, approximate=True)
+        return QUEUED
+        
+    async def _forward(self, agent_id: UUID, message: AgentMessage) -> Optional[MailboxStatus]:
+        """Transmettre un message d'agent à agent vers un autre worker
+        
+        Dans une conversation, le destinataire est d'abord amené sur ce
+        shard : la suite des échanges reste en mémoire.
+        """
+        if message.conversation_id and await self.shards.pin_here(agent_id):
+            agent = await self.runtime.get_or_rehydrate(agent_id)
+            if agent is not None:
+                return await agent.receive_message(message)
+        if await self.shards.is_agent_running(agent_id):
+            await self.enqueue(agent_id, message.to_dict())
+        return None
+        
+    async def enqueue_many(self, messages: List[Tuple[UUID, dict]]) -> List[str]:
+        """Ajouter plusieurs messages aux flux de leurs shards en un seul aller-retour"""
+        pipe = self.redis.pipeline(transaction=False)
+        for agent_id, message_data in messages:
+            stream, fields = self._stream_entry(agent_id, message_data)
+            pipe.xadd(stream, fields, maxlen=settings.MESSAGE_STREAM_MAXLEN, approximate=True)
+        await pipe.execute()
+        return [QUEUED] * len(messages)
+        
+    def _stream_entry(self, agent_id: UUID, message_data: dict) -> Tuple[str, Dict[str, str]]:
+        stream = self.stream_key(self.shards.owner_of(agent_id))
+        return stream, {"agent_id": str(agent_id), "message": json.dumps(message_data, default=str)}
+        
     async def _delivery_loop(self):
         """Boucle principale de livraison des messages"""
+        stream = self.stream_key(self.shards.shard_id)
+        next_retry = 0.0
         while self._running:
             try:
-                # Vérifier les messages dans le cache Redis
-                await self._check_cached_messages()
+                # Bloque jusqu'à l'arrivée de messages : aucun appel Redis par agent inactif
+                entries = await self.redis.xreadgroup(
+                    CONSUMER_GROUP,
+                    self.consumer,
+                    {stream: ">"},
+                    count=settings.MESSAGE_STREAM_READ_COUNT,
+                    block=settings.MESSAGE_STREAM_BLOCK_MS
+                )
+                for _, items in entries or []:
+                    await self._process_entries(stream, items)
                 
-                # Petit délai pour éviter de surcharger
-                await asyncio.sleep(1.0)
+                # Reprendre les entrées restées en attente (ici ou sur un worker arrêté)
+                if time.monotonic() >= next_retry:
+                    next_retry = time.monotonic() + settings.MESSAGE_STREAM_RETRY_IDLE_MS / 1000
+                    await self._retry_pending(stream)
                 
+            except asyncio.CancelledError:
+                raise
             except Exception as e:
                 logger.error(f"Error in message delivery loop: {e}")
                 await asyncio.sleep(5.0)
                 
-    async def _check_cached_messages(self):
-        """Vérifier et livrer les messages depuis le cache Redis"""
-        # Récupérer tous les agents en cours d'exécution
-        running_agents = self.runtime.list_running_agents()
+    async def _retry_pending(self, stream: str):
+        """Réclamer et relivrer les entrées non acquittées depuis trop longtemps"""
+        start_id = "0-0"
+        while True:
+            reply = await self.redis.xautoclaim(
+                stream,
+                CONSUMER_GROUP,
+                self.consumer,
+                min_idle_time=settings.MESSAGE_STREAM_RETRY_IDLE_MS,
+                start_id=start_id,
+                count=settings.MESSAGE_STREAM_READ_COUNT
+            )
+            start_id, items = reply[0], reply[1]
+            await self._process_entries(stream, [item for item in items if item[1]], retry=True)
+            if start_id in ("0-0", b"0-0"):
+                break
+                
+    async def _process_entries(self, stream: str, items: List[Tuple[str, Dict[str, str]]], retry: bool = False):
+        """Livrer des entrées du flux et acquitter celles qui sont traitées"""
+        acked = []
+        delivered = []
+        for entry_id, fields in items:
+            outcome = await self._deliver_entry(fields)
+            # Contre-pression ou échec transitoire : l'entrée reste en attente.
+            # Un échec après reprise est abandonné, le message reste non lu en base.
+            if outcome in DELIVERED_STATUSES or outcome == NOT_RUNNING or (retry and outcome == FAILED):
+                acked.append(entry_id)
+            if outcome in DELIVERED_STATUSES:
+                delivered.append(json.loads(fields["message"]).get("id"))
+            enqueued_ms = int(str(entry_id).split("-")[0])
+            track_message_delivery(outcome, max(time.time() - enqueued_ms / 1000, 0.0))
         
-        for agent_id in running_agents:
+        if acked:
+            await self.redis.xack(stream, CONSUMER_GROUP, *acked)
+        # Les messages livrés sortent de la boîte hors ligne (pas de rejeu au démarrage)
+        delivered = [message_id for message_id in delivered if message_id]
+        if delivered and self.runtime.offline_mailbox is not None:
             try:
-                # Vérifier s'il y a des messages dans le cache pour cet agent
-                queue_key = f"agent_message_queue:{agent_id}"
-                
-                # Récupérer jusqu'à 10 messages à la fois
-                for _ in range(10):
-                    message_data = await cache_get(queue_key)
-                    if not message_data:
-                        break
-                        
-                    # Parser le message
-                    try:
-                        if isinstance(message_data, str):
-                            message = json.loads(message_data)
-                        else:
-                            message = message_data
-                            
-                        # Livrer au runtime agent
-                        await self.deliver_to_agent(agent_id, message)
-                        
-                    except json.JSONDecodeError:
-                        logger.error(f"Invalid message format for agent {agent_id}")
-                        
+                await self.runtime.offline_mailbox.mark_delivered(delivered)
             except Exception as e:
-                logger.error(f"Error processing messages for agent {agent_id}: {e}")
-                
-    async def deliver_to_agent(self, agent_id: UUID, message_data: dict):
-        """Livrer un message à un agent spécifique"""
+                logger.error(f"Failed to mark {len(delivered)} delivered messages as read: {e}")
+            
+    async def _deliver_entry(self, fields: Dict[str, str]) -> str:
+        """Livrer une entrée du flux, sauf si la boîte de l'agent est presque pleine"""
+        try:
+            agent_id = UUID(fields["agent_id"])
+            message_data = json.loads(fields["message"])
+        except (KeyError, ValueError) as e:
+            logger.error(f"Invalid delivery stream entry: {e}")
+            return NOT_RUNNING  # Acquittée : inutile de la relivrer
+        
+        # Contre-pression : ne pas remplir davantage une boîte presque pleine
         agent = self.runtime.get_running_agent(agent_id)
+        if agent and agent.mailbox_pressure >= settings.AGENT_MAILBOX_HIGH_WATERMARK:
+            return MailboxStatus.REJECTED.value
+        
+        return await self.deliver_to_agent(agent_id, message_data)
+                
+    async def deliver_to_agent(self, agent_id: UUID, message_data: dict) -> str:
+        """Livrer un message à un agent spécifique, sur le worker qui le possède
+        
+        Retourne le statut de livraison (voir DELIVERED_STATUSES) ; "rejected"
+        signale une boîte aux lettres pleine.
+        """
+        try:
+            return await self.shards.deliver(agent_id, message_data)
+        except Exception as e:
+            logger.error(f"Failed to forward message to agent {agent_id}: {e}")
+            return FAILED
+            
+    async def _deliver_local(self, agent_id: UUID, message_data: dict) -> str:
+        """Livrer un message à un agent de ce processus (réveillé s'il hiberne)"""
+        agent = await self.runtime.get_or_rehydrate(agent_id)
         
         if not agent:
             logger.warning(f"Agent {agent_id} not running, cannot deliver message")
-            return False
+            return NOT_RUNNING
             
         try:
-            # Créer un objet message-like pour l'agent
-            class MessageWrapper:
-                def __init__(self, data):
-                    self.id = data.get('id')
-                    self.sender = data.get('sender_id', 'Unknown')
-                    self.receiver = data.get('receiver_id')
-                    self.performative = data.get('performative', 'inform')
-                    self.content = data.get('content', {})
-                    self.conversation_id = data.get('conversation_id')
-                    self.in_reply_to = data.get('in_reply_to')
-                    
-            message = MessageWrapper(message_data)
+            message = AgentMessage.from_dict(message_data)
             
             # Appeler receive_message sur l'agent
-            await agent.receive_message(message)
+            status = await agent.receive_message(message)
             
-            logger.info(f"Delivered message to agent {agent_id}")
-            return True
+            if status.accepted:
+                logger.debug(f"Delivered message to agent {agent_id} ({status.value})")
+            else:
+                logger.warning(f"Mailbox of agent {agent_id} is full, message rejected")
+            return status.value
             
         except Exception as e:
             logger.error(f"Failed to deliver message to agent {agent_id}: {e}")
-            return False
+            return FAILED
             
-    async def deliver_message_from_db(self, db: AsyncSession, message_id: UUID):
+    async def deliver_message_from_db(self, db: AsyncSession, message_id: UUID) -> str:
         """Livrer un message spécifique depuis la base de données"""
         # Récupérer le message
         stmt = select(Message).where(Message.id == message_id)
@@ -133,37 +266,56 @@ class MessageDeliveryService:
         
         if not message:
             logger.error(f"Message {message_id} not found")
-            return False
-            
-        # Vérifier que l'agent destinataire est en cours d'exécution
-        if not await self.runtime.is_agent_running(message.receiver_id):
-            logger.warning(f"Receiver agent {message.receiver_id} is not running")
-            # Stocker dans le cache pour livraison ultérieure
-            queue_key = f"agent_message_queue:{message.receiver_id}"
-            message_data = {
-                "id": str(message.id),
-                "sender_id": str(message.sender_id),
-                "receiver_id": str(message.receiver_id),
-                "performative": message.performative,
-                "content": json.loads(message.content) if isinstance(message.content, str) else message.content,
-                "conversation_id": str(message.conversation_id) if message.conversation_id else None,
-                "in_reply_to": str(message.in_reply_to) if message.in_reply_to else None
-            }
-            # await cache_rpush(queue_key, json.dumps(message_data))
-            return False
-            
-        # Livrer directement
-        message_data = {
-            "id": str(message.id),
-            "sender_id": str(message.sender_id),
-            "receiver_id": str(message.receiver_id),
-            "performative": message.performative,
-            "content": json.loads(message.content) if isinstance(message.content, str) else message.content,
-            "conversation_id": str(message.conversation_id) if message.conversation_id else None,
-            "in_reply_to": str(message.in_reply_to) if message.in_reply_to else None
-        }
-        
-        return await self.deliver_to_agent(message.receiver_id, message_data)
+            return FAILED
+        
+        return await self.deliver_message(message)
+        
+    async def deliver_message(self, message: Message) -> str:
+        """Livrer un message déjà chargé (ou tout juste inséré), sans relecture"""
+        return (await self.deliver_messages([message]))[0]
+        
+    async def deliver_messages(self, messages: List[Message]) -> List[str]:
+        """Livrer des messages en mémoire, un statut par message
+        
+        L'état de chaque destinataire n'est vérifié qu'une fois, et tous les
+        messages sont ajoutés aux flux dans un seul pipeline Redis.
+        """
+        receiver_ids = list({message.receiver_id for message in messages})
+        running = dict(zip(
+            receiver_ids,
+            await asyncio.gather(*(self.shards.is_agent_running(agent_id) for agent_id in receiver_ids))
+        ))
+        
+        statuses = [NOT_RUNNING] * len(messages)
+        queued = []
+        for index, message in enumerate(messages):
+            # Sinon le message reste non lu en base, rejoué au démarrage de l'agent
+            if running[message.receiver_id]:
+                queued.append(index)
+        if len(queued) < len(messages):
+            logger.warning(f"{len(messages) - len(queued)} messages for agents that are not running")
+        
+        if queued:
+            # Ajouter aux flux des shards destinataires, livrés en quelques millisecondes
+            results = await self.enqueue_many([
+                (messages[index].receiver_id, message_payload(messages[index])) for index in queued
+            ])
+            for index, status in zip(queued, results):
+                statuses[index] = status
+        return statuses
+
+
+def message_payload(message: Message) -> dict:
+    """Données de livraison d'un message (voir AgentMessage.from_dict)"""
+    return {
+        "id": str(message.id),
+        "sender_id": str(message.sender_id),
+        "receiver_id": str(message.receiver_id),
+        "performative": message.performative,
+        "content": json.loads(message.content) if isinstance(message.content, str) else message.content,
+        "conversation_id": str(message.conversation_id) if message.conversation_id else None,
+        "in_reply_to": str(message.in_reply_to) if message.in_reply_to else None
+    }
 
 
 # Instance globale
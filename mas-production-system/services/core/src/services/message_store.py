@@ -0,0 +1,273 @@
+"""
+Write-behind persistence of agent messages
+"""
+
+import asyncio
+from collections import Counter
+from datetime import datetime, timezone
+from typing import Any, Callable, Dict, List, Optional
+from uuid import UUID, uuid4
+
+from sqlalchemy import bindparam, func, insert, update
+from sqlalchemy.exc import DataError, IntegrityError
+
+from src.core.agents.messages import AgentMessage
+from src.database import AsyncSessionLocal
+from src.services.conversation_buffer import ConversationBuffer, get_conversation_buffer
+from src.database.models import Agent, Message
+from src.config import settings
+from src.utils.logger import get_logger
+
+logger = get_logger(__name__)
+
+# Key marking a message delivered before its row was written, by message ID
+READ_MARKER_PREFIX = "message_read:"
+
+
+def _uuid(value: Any) -> Optional[UUID]:
+    if value is None or isinstance(value, UUID):
+        return value
+    try:
+        return UUID(str(value))
+    except ValueError:
+        return None
+
+
+def message_row(message: AgentMessage, is_read: bool = False) -> Dict[str, Any]:
+    """Row of the messages table for an in-memory message"""
+    return {
+        "id": _uuid(message.id) or uuid4(),
+        "sender_id": _uuid(message.sender),
+        "receiver_id": _uuid(message.receiver),
+        "performative": message.performative,
+        "content": message.content,
+        "protocol": 'fipa-acl',
+        "conversation_id": _uuid(message.conversation_id) or uuid4(),
+        "in_reply_to": _uuid(message.in_reply_to),
+        "is_read": is_read,
+        "created_at": datetime.now(timezone.utc)
+    }
+
+
+class MessageWriteBehind:
+    """Buffers message rows and writes them to the messages table in batches
+
+    A flush starts as soon as `batch_size` rows are buffered, and at most
+    `flush_interval` seconds after a row was added. Each flush is one
+    transaction: an executemany INSERT of the rows plus one executemany
+    UPDATE of the senders' message counters. At most `max_pending` rows are
+    ever left unflushed, which bounds what a crash can lose: add() writes
+    the buffer itself once it is full. close() writes what is left on
+    shutdown. Written rows are appended to `conversation_buffer`.
+
+    A message can be delivered before its row is written, by this worker
+    or by another one. mark_read() flips the rows still buffered here and
+    leaves a short-lived Redis marker for the others; every flush checks
+    the markers of its unread rows once committed and marks those read.
+    """
+
+    def __init__(
+        self,
+        session_factory: Callable = AsyncSessionLocal,
+        batch_size: Optional[int] = None,
+        flush_interval: Optional[float] = None,
+        max_pending: Optional[int] = None,
+        conversation_buffer: Optional[ConversationBuffer] = None,
+        redis: Any = None,
+        read_marker_ttl: Optional[int] = None
+    ):
+        self.session_factory = session_factory
+        self.conversation_buffer = conversation_buffer
+        self.redis = redis
+        self.read_marker_ttl = read_marker_ttl or settings.MESSAGE_READ_MARKER_TTL
+        self.batch_size = batch_size or settings.MESSAGE_WRITE_BEHIND_BATCH_SIZE
+        self.flush_interval = flush_interval or settings.MESSAGE_WRITE_BEHIND_INTERVAL
+        self.max_pending = max(max_pending or settings.MESSAGE_WRITE_BEHIND_MAX_PENDING, self.batch_size)
+        self._buffer: List[Dict[str, Any]] = []
+        self._lock = asyncio.Lock()  # One flush at a time, rows stay in order
+        self._batch_ready = asyncio.Event()
+        self._flusher: Optional[asyncio.Task] = None
+
+    @property
+    def pending(self) -> int:
+        """Rows waiting to be written"""
+        return len(self._buffer)
+
+    async def add(self, row: Dict[str, Any]):
+        """Queue a row, writing the buffer right away if it is full"""
+        self._buffer.append(row)
+        if len(self._buffer) >= self.max_pending:
+            await self.flush()
+        elif len(self._buffer) >= self.batch_size:
+            self._batch_ready.set()
+        if self._buffer and (self._flusher is None or self._flusher.done()):
+            self._flusher = asyncio.create_task(self._flush_loop())
+
+    async def add_message(self, message: AgentMessage, is_read: bool = False):
+        """Queue an in-memory agent message, giving it the ID of its row"""
+        row = message_row(message, is_read)
+        message.id = str(row["id"])
+        await self.add(row)
+
+    async def mark_read(self, message_ids: List[str]) -> List[str]:
+        """Mark messages as read before their rows are written
+
+        Rows buffered here are flipped in place. The others get a read
+        marker and a flush in progress is waited for, so that an UPDATE of
+        the messages table issued afterwards covers every row already
+        written. Returns the IDs that were not buffered here, which the
+        caller still has to mark read in the database.
+        """
+        ids = {str(message_id) for message_id in message_ids}
+        found = set()
+        for row in self._buffer:
+            if str(row["id"]) in ids:
+                row["is_read"] = True
+                found.add(str(row["id"]))
+        remaining = [str(message_id) for message_id in message_ids if str(message_id) not in found]
+        if not remaining:
+            return []
+
+        redis = await self._get_redis()
+        pipe = redis.pipeline(transaction=False)
+        for message_id in remaining:
+            pipe.set(f"{READ_MARKER_PREFIX}{message_id}", 1, ex=self.read_marker_ttl)
+        await pipe.execute()
+        if self._lock.locked():
+            async with self._lock:
+                pass
+        return remaining
+
+    async def flush(self) -> int:
+        """Write every buffered row, returns how many were written
+
+        Rows the database rejects (constraint or data errors) are isolated
+        and dropped; if the database is unreachable the rows are kept for
+        the next flush, within max_pending.
+        """
+        async with self._lock:
+            rows, self._buffer = self._buffer, []
+            if not rows:
+                return 0
+            try:
+                await self._write(rows)
+                await self._apply_read_markers(rows)
+                await self._buffer_conversations(rows)
+                return len(rows)
+            except (IntegrityError, DataError) as e:
+                logger.warning(f"Batch of {len(rows)} messages rejected ({e.orig}), retrying row by row")
+            except Exception:
+                self._requeue(rows)
+                raise
+
+            written = []
+            for index, row in enumerate(rows):
+                try:
+                    await self._write([row])
+                    written.append(row)
+                except (IntegrityError, DataError) as e:
+                    logger.error(f"Dropping message {row['id']} that cannot be stored: {e.orig}")
+                except Exception:
+                    self._requeue(rows[index:])
+                    await self._apply_read_markers(written)
+                    await self._buffer_conversations(written)
+                    raise
+            await self._apply_read_markers(written)
+            await self._buffer_conversations(written)
+            return len(written)
+
+    async def close(self):
+        """Stop the background flusher and write what is left"""
+        if self._flusher and not self._flusher.done():
+            self._flusher.cancel()
+            await asyncio.gather(self._flusher, return_exceptions=True)
+        try:
+            written = await self.flush()
+            if written:
+                logger.info(f"Flushed {written} buffered messages on shutdown")
+        except Exception as e:
+            logger.error(f"Lost {self.pending} buffered messages on shutdown: {e}")
+
+    def _requeue(self, rows: List[Dict[str, Any]]):
+        """Put rows back in front of the buffer, dropping the oldest beyond max_pending"""
+        self._buffer[:0] = rows
+        overflow = len(self._buffer) - self.max_pending
+        if overflow > 0:
+            del self._buffer[:overflow]
+            logger.error(f"Message buffer full while the database is unavailable, dropped {overflow} messages")
+
+    async def _write(self, rows: List[Dict[str, Any]]):
+        sent = Counter(row["sender_id"] for row in rows)
+        async with self.session_factory() as db:
+            await db.execute(insert(Message), rows)
+            await db.execute(
+                update(Agent.__table__)
+                .where(Agent.__table__.c.id == bindparam("sender"))
+                .values(
+                    total_messages=Agent.__table__.c.total_messages + bindparam("count"),
+                    last_active_at=func.now()
+                ),
+                [{"sender": sender_id, "count": count} for sender_id, count in sent.items()]
+            )
+            await db.commit()
+
+    async def _get_redis(self) -> Any:
+        if self.redis is None:
+            from src.cache import get_cache
+            self.redis = await get_cache()
+        return self.redis
+
+    async def _apply_read_markers(self, rows: List[Dict[str, Any]]):
+        """Mark written rows read when their message was delivered before the insert"""
+        unread = [row for row in rows if not row["is_read"]]
+        if not unread:
+            return
+        try:
+            redis = await self._get_redis()
+            keys = [f"{READ_MARKER_PREFIX}{row['id']}" for row in unread]
+            marked = [row for row, value in zip(unread, await redis.mget(keys)) if value]
+            if not marked:
+                return
+            await self._mark_written_read([row["id"] for row in marked])
+            for row in marked:
+                row["is_read"] = True
+            await redis.delete(*[f"{READ_MARKER_PREFIX}{row['id']}" for row in marked])
+        except Exception as e:
+            # The rows are written: they stay unread and are replayed at worst
+            logger.error(f"Failed to apply read markers to {len(unread)} messages: {e}")
+
+    async def _mark_written_read(self, message_ids: List[UUID]):
+        async with self.session_factory() as db:
+            await db.execute(update(Message).where(Message.id.in_(message_ids)).values(is_read=True))
+            await db.commit()
+
+    async def _buffer_conversations(self, rows: List[Dict[str, Any]]):
+        if self.conversation_buffer is not None and rows:
+            await self.conversation_buffer.append(rows)
+
+    async def _flush_loop(self):
+        while self._buffer:
+            try:
+                await asyncio.wait_for(self._batch_ready.wait(), timeout=self.flush_interval)
+            except asyncio.TimeoutError:
+                pass
+            self._batch_ready.clear()
+            try:
+                await self.flush()
+            except Exception as e:
+                logger.error(f"Error flushing messages, {self.pending} kept for retry: {e}")
+
+
+# Global instance
+_message_store: Optional[MessageWriteBehind] = None
+
+
+def get_message_store() -> MessageWriteBehind:
+    """Get or create the message write-behind buffer"""
+    global _message_store
+    if _message_store is None:
+        _message_store = MessageWriteBehind(conversation_buffer=get_conversation_buffer())
+    return _message_store
+
+
+__all__ = ["READ_MARKER_PREFIX", "MessageWriteBehind", "message_row", "get_message_store"]
@@ -3,7 +3,9 @@ Tool Service for managing and executing agent tools
 """
 import importlib
 import inspect
-from typing import Dict, Any, Callable, List, Optional, Type
+from collections import deque
+from types import MappingProxyType
+from typing import Dict, Any, Callable, Deque, Iterable, List, Mapping, Optional, Type
 import asyncio
 from uuid import UUID
 
@@ -40,10 +42,15 @@ class Tool:
         return True
 
 class ToolRegistry:
-    """Registry for managing available tools"""
+    """Registry for managing available tools
+    
+    Building it imports and instantiates every built-in tool, so the
+    process shares one instance (see get_tool_registry).
+    """
     
     def __init__(self):
         self.tools: Dict[str, Tool] = {}
+        self.version = 0  # Bumped on every registration, invalidates derived views
         self._load_builtin_tools()
     
     def _load_builtin_tools(self):
@@ -80,6 +87,7 @@ class ToolRegistry:
     def register_tool(self, tool: Tool):
         """Register a tool"""
         self.tools[tool.name] = tool
+        self.version += 1
         logger.info(f"Registered tool: {tool.name}")
     
     def register_function_as_tool(
@@ -137,9 +145,15 @@ class ToolRegistry:
 class ToolService:
     """Service for executing tools on behalf of agents"""
     
-    def __init__(self):
-        self.registry = ToolRegistry()
-        self.execution_history: Dict[UUID, List[Dict[str, Any]]] = {}
+    # Executions kept per agent in the history
+    history_size = 100
+    
+    def __init__(self, registry: Optional[ToolRegistry] = None):
+        self.registry = registry or get_tool_registry()
+        self.execution_history: Dict[UUID, Deque[Dict[str, Any]]] = {}
+        # Read-only tool views shared by every agent with the same capabilities
+        self._views: Dict[frozenset, Mapping[str, Tool]] = {}
+        self._views_version = self.registry.version
         
         # Capability to tools mapping
         self.capability_tools = {
@@ -164,6 +178,25 @@ class ToolService:
                 
         return tools
     
+    def get_tools_for_capabilities(self, capabilities: Iterable[str]) -> Mapping[str, Tool]:
+        """Get the read-only tool view for a set of capabilities
+        
+        Views are computed once per distinct capability set and shared, so
+        creating an agent costs a dict lookup instead of a registry scan.
+        """
+        if self._views_version != self.registry.version:
+            self._views.clear()
+            self._views_version = self.registry.version
+        
+        key = frozenset(capabilities)
+        view = self._views.get(key)
+        if view is None:
+            tools: Dict[str, Tool] = {}
+            for capability in sorted(key):
+                tools.update(self.get_tools_for_capability(capability))
+            view = self._views[key] = MappingProxyType(tools)
+        return view
+    
     async def execute_tool(
         self,
         agent_id: UUID,
@@ -205,7 +238,7 @@ class ToolService:
             
             # Store in history
             if agent_id not in self.execution_history:
-                self.execution_history[agent_id] = []
+                self.execution_history[agent_id] = deque(maxlen=self.history_size)
             
             self.execution_history[agent_id].append({
                 "tool": tool_name,
@@ -234,7 +267,7 @@ class ToolService:
         limit: Optional[int] = None
     ) -> List[Dict[str, Any]]:
         """Get tool execution history for an agent"""
-        history = self.execution_history.get(agent_id, [])
+        history = list(self.execution_history.get(agent_id, ()))
         
         if limit:
             return history[-limit:]
@@ -428,9 +461,17 @@ class HTTPRequestTool(Tool):
             logger.error(f"HTTP request failed: {e}")
             raise
 
-# Global instance
+# Global instances
+_tool_registry: Optional[ToolRegistry] = None
 _tool_service: Optional[ToolService] = None
 
+def get_tool_registry() -> ToolRegistry:
+    """Get or create the process-wide tool registry"""
+    global _tool_registry
+    if _tool_registry is None:
+        _tool_registry = ToolRegistry()
+    return _tool_registry
+
 def get_tool_service() -> ToolService:
     """Get or create tool service instance"""
     global _tool_service
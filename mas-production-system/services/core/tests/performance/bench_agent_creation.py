@@ -0,0 +1,82 @@
+"""
+Benchmark: agent creation latency and memory
+
+Compares agents built with a private ToolService/ToolRegistry each (legacy
+behaviour) with agents sharing the process-wide tool catalog.
+
+Run from services/core (DATABASE_URL and REDIS_URL must be set, no server is
+contacted; FileSystemTool creates its workspace directory once):
+
+    python -m tests.performance.bench_agent_creation --agents 1000 10000
+"""
+
+import argparse
+import gc
+import json
+import logging
+import time
+import tracemalloc
+from typing import Any, Dict, List
+from uuid import uuid4
+
+from src.core.agents.reflexive_agent import ReflexiveAgent
+from src.services.tool_service import ToolRegistry, ToolService
+
+CAPABILITIES = ["conversation", "analyse", "coding"]
+
+
+class LegacyToolsAgent(ReflexiveAgent):
+    """Reflexive agent building its own tool registry, as before"""
+
+    def _load_tools(self):
+        self.tool_service = ToolService(ToolRegistry())
+        self.tools = {}
+        for capability in self.capabilities:
+            self.tools.update(self.tool_service.get_tools_for_capability(capability))
+
+
+def measure(agent_class: type, count: int) -> Dict[str, Any]:
+    """Create `count` agents and measure latency and retained memory"""
+    gc.collect()
+    tracemalloc.start()
+    latencies: List[float] = []
+
+    agents = []
+    for i in range(count):
+        start = time.perf_counter()
+        agents.append(agent_class(uuid4(), f"agent-{i}", "worker", CAPABILITIES))
+        latencies.append(time.perf_counter() - start)
+
+    retained, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    latencies.sort()
+
+    return {
+        "agents": count,
+        "agent_class": agent_class.__name__,
+        "total_seconds": round(sum(latencies), 3),
+        "p50_us": round(latencies[len(latencies) // 2] * 1e6, 1),
+        "p99_us": round(latencies[int(len(latencies) * 0.99)] * 1e6, 1),
+        "retained_mb": round(retained / 2**20, 2),
+        "retained_kb_per_agent": round(retained / 1024 / count, 2)
+    }
+
+
+def main(counts: List[int]):
+    # Build the shared catalog outside of the measurements
+    ReflexiveAgent(uuid4(), "warmup", "worker", CAPABILITIES)
+
+    results = []
+    for count in counts:
+        for agent_class in (LegacyToolsAgent, ReflexiveAgent):
+            results.append(measure(agent_class, count))
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[1])
+    parser.add_argument("--agents", type=int, nargs="+", default=[1000, 10000])
+    args = parser.parse_args()
+
+    logging.disable(logging.WARNING)
+    main(args.agents)
@@ -0,0 +1,74 @@
+"""
+Benchmark: broadcast fan-out
+
+Compares the legacy broadcast (one publish_event coroutine, JSON dump and
+round trip per channel, gathered) with the pipelined broadcast encoding the
+payload once.
+
+Run from services/core against the Redis of REDIS_URL (DATABASE_URL must be
+set too), or in process with --fake (no network, round trips are nearly free
+so only the serialization and command overhead shows):
+
+    python -m tests.performance.bench_broadcast --channels 100 1000 10000
+"""
+
+import argparse
+import asyncio
+import json
+import logging
+import time
+from typing import Any, Dict, List
+
+from src import message_broker
+from src.message_broker import broadcast, init_message_broker, publish_event
+
+PAYLOAD = {"organization_id": "org-1", "text": "maintenance at 22:00", "tags": ["ops"] * 10}
+
+
+async def legacy_broadcast(event_type: str, data: Dict[str, Any], channels: List[str]):
+    """broadcast() as it was: one publish_event per channel"""
+    await asyncio.gather(*(publish_event(f"{channel}:{event_type}", data) for channel in channels))
+
+
+async def measure(name: str, func, channels: List[str], rounds: int) -> Dict[str, Any]:
+    timings = []
+    for _ in range(rounds):
+        start = time.perf_counter()
+        await func("announcement", PAYLOAD, channels)
+        timings.append(time.perf_counter() - start)
+    timings.sort()
+    best = timings[0]
+    return {
+        "implementation": name,
+        "channels": len(channels),
+        "best_ms": round(best * 1e3, 2),
+        "median_ms": round(timings[len(timings) // 2] * 1e3, 2),
+        "channels_per_second": round(len(channels) / best)
+    }
+
+
+async def main(counts: List[int], rounds: int, fake: bool):
+    if fake:
+        import fakeredis
+        message_broker.broker = fakeredis.FakeAsyncRedis(decode_responses=True, max_connections=2**31)
+    else:
+        await init_message_broker()
+
+    results = []
+    for count in counts:
+        channels = [f"agent:{i}" for i in range(count)]
+        results.append(await measure("gather", legacy_broadcast, channels, rounds))
+        results.append(await measure("pipeline", broadcast, channels, rounds))
+    print(json.dumps(results, indent=2))
+    await message_broker.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[1])
+    parser.add_argument("--channels", type=int, nargs="+", default=[100, 1000, 10000])
+    parser.add_argument("--rounds", type=int, default=5)
+    parser.add_argument("--fake", action="store_true", help="use an in-process fakeredis")
+    args = parser.parse_args()
+
+    logging.disable(logging.WARNING)
+    asyncio.run(main(args.channels, args.rounds, args.fake))
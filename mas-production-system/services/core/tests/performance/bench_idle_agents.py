@@ -0,0 +1,101 @@
+"""
+Benchmark: CPU cost of idle agents
+
+Compares the legacy run loop (wake up every 100 ms to poll the queues) with
+the event-driven BaseAgent.run loop, for N agents that never receive work.
+
+Run from services/core (DATABASE_URL and REDIS_URL must be set, no server is
+contacted):
+
+    python -m tests.performance.bench_idle_agents --agents 1000 --duration 10
+"""
+
+import argparse
+import asyncio
+import json
+import logging
+import time
+from typing import Any, Dict, List
+from uuid import uuid4
+
+from src.core.agents.base_agent import BaseAgent
+
+
+class IdleAgent(BaseAgent):
+    """Agent with no-op BDI hooks"""
+
+    async def perceive(self, environment: Dict[str, Any]) -> Dict[str, Any]:
+        return {}
+
+    async def deliberate(self) -> List[str]:
+        return []
+
+    async def act(self) -> List[Dict[str, Any]]:
+        return []
+
+    async def handle_message(self, message: Any):
+        pass
+
+    async def handle_task(self, task: Any):
+        pass
+
+
+class PollingAgent(IdleAgent):
+    """Idle agent running the legacy 100 ms polling loop"""
+
+    async def run(self):
+        self._running = True
+        loop = asyncio.get_running_loop()
+        last_bdi_cycle = loop.time()
+        while self._running:
+            if not self._message_queue.empty():
+                await self._process_messages()
+            await self._process_tasks()
+            if loop.time() - last_bdi_cycle > self.bdi_cycle_interval:
+                await self._bdi_cycle()
+                last_bdi_cycle = loop.time()
+            await asyncio.sleep(0.1)
+
+
+async def measure(agent_class: type, count: int, duration: float) -> Dict[str, Any]:
+    """Run `count` idle agents for `duration` seconds and measure CPU time"""
+    agents = [
+        agent_class(agent_id=uuid4(), name=f"idle-{i}", role="idle", capabilities=[])
+        for i in range(count)
+    ]
+    tasks = [asyncio.create_task(agent.run()) for agent in agents]
+    await asyncio.sleep(0.5)  # Let every loop reach its steady state
+
+    cpu_start = time.process_time()
+    wall_start = time.perf_counter()
+    await asyncio.sleep(duration)
+    cpu_seconds = time.process_time() - cpu_start
+    wall_seconds = time.perf_counter() - wall_start
+
+    for agent in agents:
+        await agent.stop()
+    await asyncio.gather(*tasks, return_exceptions=True)
+
+    return {
+        "loop": agent_class.__name__,
+        "agents": count,
+        "cpu_seconds": round(cpu_seconds, 4),
+        "cpu_percent": round(100 * cpu_seconds / wall_seconds, 2)
+    }
+
+
+async def main(count: int, duration: float):
+    results = []
+    for agent_class in (PollingAgent, IdleAgent):
+        results.append(await measure(agent_class, count, duration))
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[1])
+    parser.add_argument("--agents", type=int, default=1000)
+    parser.add_argument("--duration", type=float, default=10.0)
+    args = parser.parse_args()
+
+    logging.disable(logging.WARNING)
+    asyncio.run(main(args.agents, args.duration))
@@ -0,0 +1,127 @@
+"""
+Benchmark: LLM throughput with and without micro-batching, local provider
+
+Runs 1, 8, 32 and 128 concurrent agents, each calling LLMService.generate in
+a closed loop with distinct prompts (cache and coalescing off), against a
+mock OpenAI-compatible server simulating a local inference server: prefill
+one request at a time, then continuous-batching decode over a fixed number
+of slots (see InferenceEngine). Modes:
+  - direct: every call is its own chat request (LLM_BATCHING_ENABLED off)
+  - parallel: micro-batched, sent over LLM_BATCH_PARALLELISM streams
+  - completions: micro-batched into one /v1/completions prompt-list request
+and reports completion tokens per second, HTTP requests and call latency.
+
+Run from services/core (DATABASE_URL and REDIS_URL must be set, nothing is
+contacted but the mock server):
+
+    python -m tests.performance.bench_llm_batching --agents 1 8 32 128 --output batching.json
+"""
+
+import argparse
+import asyncio
+import json
+import logging
+import time
+from typing import Any, Dict, List
+
+from src.config import settings
+from src.services import llm_batching, llm_limiter
+from src.services.llm_client_pool import close_llm_client_pool
+from src.services.llm_service import LLMService
+from tests.performance.mock_openai_server import InferenceEngine, MockOpenAIServer
+
+MODES = ("direct", "parallel", "completions")
+
+
+async def run(mode: str, agent_count: int, server: MockOpenAIServer, args) -> Dict[str, Any]:
+    settings.LLM_BATCHING_ENABLED = mode != "direct"
+    settings.LLM_BATCH_MODE = "completions" if mode == "completions" else "parallel"
+    llm_batching._llm_batchers.clear()
+    agents = [LLMService() for _ in range(agent_count)]
+
+    latencies: List[float] = []
+    failures = 0
+    deadline = time.perf_counter() + args.duration
+
+    async def agent(service: LLMService, index: int):
+        nonlocal failures
+        call = 0
+        while time.perf_counter() < deadline:
+            sent = time.perf_counter()
+            response = await service.generate(
+                f"Agent {index}, cycle {call}: summarize your beliefs",
+                temperature=0.0,
+                max_tokens=args.tokens
+            )
+            latencies.append(time.perf_counter() - sent)
+            failures += not response.get("success")
+            call += 1
+
+    server.reset()
+    start = time.perf_counter()
+    await asyncio.gather(*(agent(service, i) for i, service in enumerate(agents)))
+    elapsed = time.perf_counter() - start
+
+    latencies.sort()
+    return {
+        "mode": mode,
+        "agents": agent_count,
+        "calls": len(latencies),
+        "failures": failures,
+        "http_requests": server.requests,
+        "tokens_per_second": round(server.tokens / elapsed),
+        "p50_ms": round(latencies[len(latencies) // 2] * 1e3, 1),
+        "p99_ms": round(latencies[min(int(len(latencies) * 0.99), len(latencies) - 1)] * 1e3, 1)
+    }
+
+
+async def main(args) -> Dict[str, Any]:
+    engine = InferenceEngine(slots=args.slots)
+    server = MockOpenAIServer(completion_tokens=args.tokens, engine=engine)
+    base_url = await server.start()
+
+    settings.LLM_PROVIDER = "lmstudio"
+    settings.LLM_BASE_URL = base_url
+    settings.LLM_MODEL = "mock"
+    settings.ENABLE_MOCK_LLM = False
+    settings.LLM_CACHE_ENABLED = False
+    settings.LLM_COALESCING_ENABLED = False
+    settings.LLM_LOCAL_POOL_MAX_CONNECTIONS = args.pool_size
+    settings.LLM_CONCURRENCY_INITIAL = args.pool_size
+    settings.LLM_BATCH_WINDOW_MS = args.window_ms
+    settings.LLM_BATCH_MAX_SIZE = args.slots
+    settings.LLM_BATCH_PARALLELISM = args.slots
+    llm_limiter._llm_limiters.clear()
+
+    results = []
+    for agent_count in args.agents:
+        for mode in MODES:
+            results.append(await run(mode, agent_count, server, args))
+
+    await close_llm_client_pool()
+    await server.stop()
+    return {
+        "server": {"slots": args.slots, "completion_tokens": args.tokens},
+        "window_ms": args.window_ms,
+        "duration_seconds": args.duration,
+        "results": results
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[1])
+    parser.add_argument("--agents", type=int, nargs="+", default=[1, 8, 32, 128])
+    parser.add_argument("--duration", type=float, default=3.0, help="seconds of calls per mode and agent count")
+    parser.add_argument("--tokens", type=int, default=20, help="completion tokens per call")
+    parser.add_argument("--slots", type=int, default=32, help="parallel sequences of the mock server")
+    parser.add_argument("--window-ms", type=float, default=5.0, help="LLM_BATCH_WINDOW_MS")
+    parser.add_argument("--pool-size", type=int, default=128, help="LLM_LOCAL_POOL_MAX_CONNECTIONS")
+    parser.add_argument("--output", help="write the JSON report to this file")
+    args = parser.parse_args()
+
+    logging.disable(logging.WARNING)
+    report = asyncio.run(main(args))
+    print(json.dumps(report, indent=2))
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
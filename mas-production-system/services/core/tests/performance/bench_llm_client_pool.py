@@ -0,0 +1,105 @@
+"""
+Benchmark: LLM client connection churn, per-agent clients vs the shared pool
+
+Starts `--agents` agents `--restarts` times against a local mock
+OpenAI-compatible server; every agent start gets an LLM client and sends
+`--calls` chat completions, all agents at once. Compares:
+  - per_agent: a new AsyncOpenAI (and httpx pool) per agent start, as
+    AgentService.start_agent used to create
+  - pooled: LLMService handles onto the process-wide LLMClientPool
+and reports the TCP connections the server accepted, the peak of open
+connections, handle creation time and request throughput.
+
+Run from services/core (DATABASE_URL and REDIS_URL must be set, nothing is
+contacted but the mock server):
+
+    python -m tests.performance.bench_llm_client_pool --agents 200 --restarts 3
+"""
+
+import argparse
+import asyncio
+import gc
+import json
+import logging
+import time
+from typing import Any, Callable, Dict, List
+
+from openai import AsyncOpenAI
+
+from src.config import settings
+from src.services.llm_client_pool import close_llm_client_pool
+from src.services.llm_service import LLMService
+from tests.performance.mock_openai_server import MockOpenAIServer
+
+
+async def run(name: str, new_client: Callable[[], Any], server: MockOpenAIServer, args) -> Dict[str, Any]:
+    server.reset()
+    creation = 0.0
+    latencies: List[float] = []
+    start = time.perf_counter()
+    for restart in range(args.restarts):
+        created = time.perf_counter()
+        clients = [new_client() for _ in range(args.agents)]
+        creation += time.perf_counter() - created
+
+        async def agent(client: Any, index: int):
+            for call in range(args.calls):
+                sent = time.perf_counter()
+                await client.chat.completions.create(
+                    model="mock",
+                    messages=[{"role": "user", "content": f"agent {index} restart {restart} call {call}"}],
+                    max_tokens=20
+                )
+                latencies.append(time.perf_counter() - sent)
+
+        await asyncio.gather(*(agent(client, i) for i, client in enumerate(clients)))
+        # Agents stop: their clients are dropped, as a stopped agent's would be
+        del clients
+        gc.collect()
+    elapsed = time.perf_counter() - start
+
+    latencies.sort()
+    return {
+        "mode": name,
+        "requests": server.requests,
+        "connections_opened": server.connections,
+        "peak_open_connections": server.peak_connections,
+        "client_creation_ms": round(creation * 1e3, 1),
+        "requests_per_second": round(server.requests / elapsed),
+        "p50_ms": round(latencies[len(latencies) // 2] * 1e3, 2),
+        "p99_ms": round(latencies[min(int(len(latencies) * 0.99), len(latencies) - 1)] * 1e3, 2)
+    }
+
+
+async def main(args) -> List[Dict[str, Any]]:
+    server = MockOpenAIServer(latency=args.latency)
+    base_url = await server.start()
+
+    settings.LLM_PROVIDER = "lmstudio"
+    settings.LLM_BASE_URL = base_url
+    settings.ENABLE_MOCK_LLM = False
+    settings.LLM_LOCAL_POOL_MAX_CONNECTIONS = args.pool_size
+
+    def per_agent() -> AsyncOpenAI:
+        return AsyncOpenAI(api_key="lm-studio", base_url=base_url, timeout=60.0)
+
+    def pooled() -> Any:
+        return LLMService().client
+
+    results = [await run("per_agent", per_agent, server, args), await run("pooled", pooled, server, args)]
+    await close_llm_client_pool()
+    await server.stop()
+    return results
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[1])
+    parser.add_argument("--agents", type=int, default=200)
+    parser.add_argument("--restarts", type=int, default=3, help="times every agent is started")
+    parser.add_argument("--calls", type=int, default=5, help="chat completions per agent start")
+    parser.add_argument("--latency", type=float, default=0.02, help="mock server latency in seconds")
+    parser.add_argument("--pool-size", type=int, default=16, help="LLM_LOCAL_POOL_MAX_CONNECTIONS")
+    args = parser.parse_args()
+
+    logging.disable(logging.WARNING)
+    print(json.dumps(asyncio.run(main(args)), indent=2))
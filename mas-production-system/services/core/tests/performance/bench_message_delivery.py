@@ -0,0 +1,253 @@
+"""
+Benchmark: end-to-end message delivery latency and throughput
+
+Drives messages into BaseAgent.receive_message at increasing open-loop
+rates through the two delivery paths and reports latency percentiles and
+the highest rate sustained:
+  - in_process: AgentRuntime.send_message, receiver in the same runtime
+  - stream: MessageDeliveryService.enqueue (what the send endpoints do after
+    the insert) -> shard stream -> XREADGROUP -> mailbox
+Redis is an in-process fakeredis unless --redis-url points to a scratch
+Redis database (pure-Python fakeredis caps the stream path far below a
+real server). With --database-url (a local Postgres with the schema),
+in-process messages are also persisted by the write-behind store, as in
+production.
+
+Run from services/core (DATABASE_URL and REDIS_URL must be set):
+
+    python -m tests.performance.bench_message_delivery --rates 1000 5000 20000 --output delivery.json
+
+A rate is sustained when at least 95% of its messages were received within
+the drain timeout, at 95% of the target rate or more (from the first send
+to the last reception). Rates are tried in increasing order and a path
+stops at its first unsustained rate, so its backlog does not skew the next.
+
+With --baseline (a previous report), the run fails (exit code 1) when a
+path sustains a lower rate, or its p99 at a common rate grows by more than
+--tolerance:
+
+    python -m tests.performance.bench_message_delivery --baseline delivery.json
+"""
+
+import argparse
+import asyncio
+import json
+import logging
+import sys
+import time
+from typing import Any, Dict, List, Optional
+from uuid import uuid4
+
+from src.config import settings
+from src.core.agents import get_agent_runtime
+from src.core.agents.base_agent import BaseAgent
+from src.core.agents.messages import AgentMessage
+from src.core.agents.queues import MailboxStatus
+
+
+class SinkAgent(BaseAgent):
+    """Agent recording the latency of every message it receives"""
+
+    latencies: List[float] = []
+    last_received = 0.0
+
+    async def perceive(self, environment: Dict[str, Any]) -> Dict[str, Any]:
+        return {}
+
+    async def deliberate(self) -> List[str]:
+        return []
+
+    async def act(self) -> List[Dict[str, Any]]:
+        return []
+
+    async def handle_message(self, message: Any):
+        pass
+
+    async def handle_task(self, task: Any):
+        pass
+
+    async def receive_message(self, message: Any) -> MailboxStatus:
+        SinkAgent.last_received = time.perf_counter()
+        SinkAgent.latencies.append(SinkAgent.last_received - message.content["sent_at"])
+        return await super().receive_message(message)
+
+
+def percentile(values: List[float], fraction: float) -> Optional[float]:
+    if not values:
+        return None
+    return round(values[min(int(len(values) * fraction), len(values) - 1)] * 1e3, 3)
+
+
+async def drive(path: str, send, agents: List[SinkAgent], rate: int, duration: float, drain: float) -> Dict[str, Any]:
+    """Send `rate` messages per second for `duration` seconds, open loop"""
+    SinkAgent.latencies = []
+    total = int(rate * duration)
+    sender = str(uuid4())
+    pending = set()
+    failures = []
+
+    def sent(task: asyncio.Task):
+        pending.discard(task)
+        if not task.cancelled() and task.exception() is not None:
+            failures.append(task.exception())
+
+    start = time.perf_counter()
+    for i in range(total):
+        delay = start + i / rate - time.perf_counter()
+        if delay > 0:
+            await asyncio.sleep(delay)
+        message = AgentMessage(
+            id=str(uuid4()),
+            sender=sender,
+            receiver=str(agents[i % len(agents)].agent_id),
+            performative="inform",
+            content={"seq": i, "sent_at": time.perf_counter()},
+            conversation_id=str(uuid4())
+        )
+        task = asyncio.create_task(send(message))
+        pending.add(task)
+        task.add_done_callback(sent)
+    send_seconds = time.perf_counter() - start
+
+    deadline = time.perf_counter() + drain
+    while len(SinkAgent.latencies) < total and time.perf_counter() < deadline:
+        await asyncio.sleep(0.01)
+    await asyncio.gather(*pending, return_exceptions=True)
+
+    received = len(SinkAgent.latencies)
+    latencies = sorted(SinkAgent.latencies)
+    elapsed = SinkAgent.last_received - start
+    throughput = received / elapsed if received else 0.0
+    return {
+        "path": path,
+        "target_rate": rate,
+        "sent": total,
+        "received": received,
+        "send_errors": len(failures),
+        "send_seconds": round(send_seconds, 3),
+        "throughput": round(throughput),
+        "p50_ms": percentile(latencies, 0.50),
+        "p95_ms": percentile(latencies, 0.95),
+        "p99_ms": percentile(latencies, 0.99),
+        "max_ms": round(latencies[-1] * 1e3, 3) if latencies else None,
+        "sustained": received >= total * 0.95 and throughput >= rate * 0.95
+    }
+
+
+async def main(
+    rates: List[int],
+    agent_count: int,
+    duration: float,
+    drain: float,
+    database_url: Optional[str],
+    redis_url: Optional[str]
+) -> Dict[str, Any]:
+    from src.services.message_delivery import MessageDeliveryService
+
+    settings.MESSAGE_STREAM_BLOCK_MS = 50
+    runtime = get_agent_runtime()
+    runtime.hibernate_after = 0
+    runtime.offline_mailbox = None
+    runtime.message_store = None
+    store = None
+    if database_url:
+        from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+        from src.services.message_store import MessageWriteBehind
+        engine = create_async_engine(database_url)
+        store = MessageWriteBehind(session_factory=async_sessionmaker(engine, expire_on_commit=False))
+        runtime.message_store = store
+
+    if redis_url:
+        import redis.asyncio as aioredis
+        redis = aioredis.from_url(redis_url, decode_responses=True)
+    else:
+        import fakeredis
+        redis = fakeredis.FakeAsyncRedis(decode_responses=True, max_connections=2**31)
+    service = MessageDeliveryService(redis=redis)
+    await service.start()
+
+    agents = [
+        SinkAgent(agent_id=uuid4(), name=f"sink-{i}", role="sink", capabilities=[], mailbox_capacity=100000)
+        for i in range(agent_count)
+    ]
+    for agent in agents:
+        await runtime.register_agent(agent)
+        await runtime.start_agent(agent)
+
+    async def via_stream(message: AgentMessage):
+        await service.enqueue(message.receiver, message.to_dict())
+
+    results = []
+    for path, send in (("in_process", runtime.send_message), ("stream", via_stream)):
+        for rate in sorted(rates):
+            results.append(await drive(path, send, agents, rate, duration, drain))
+            if store is not None:
+                await store.flush()
+            if not results[-1]["sustained"]:
+                break
+
+    await service.stop()
+    await runtime.stop_all_agents()
+    if store is not None:
+        await store.close()
+
+    summary = {}
+    for path in ("in_process", "stream"):
+        sustained = [r["target_rate"] for r in results if r["path"] == path and r["sustained"]]
+        summary[path] = {"max_sustained_rate": max(sustained) if sustained else None}
+    return {
+        "agents": agent_count,
+        "duration_seconds": duration,
+        "redis": "redis" if redis_url else "fakeredis",
+        "persistence": "postgres" if database_url else None,
+        "results": results,
+        "summary": summary
+    }
+
+
+def regressions(report: Dict[str, Any], baseline: Dict[str, Any], tolerance: float) -> List[str]:
+    """Differences between a report and a baseline report that count as regressions"""
+    found = []
+    for path, summary in baseline["summary"].items():
+        before = summary["max_sustained_rate"] or 0
+        after = report["summary"].get(path, {}).get("max_sustained_rate") or 0
+        if after < before:
+            found.append(f"{path}: max sustained rate {before} -> {after}")
+
+    previous = {(r["path"], r["target_rate"]): r for r in baseline["results"]}
+    for result in report["results"]:
+        old = previous.get((result["path"], result["target_rate"]))
+        if old and old["sustained"] and old["p99_ms"] and result["p99_ms"] is not None:
+            if result["p99_ms"] > old["p99_ms"] * (1 + tolerance):
+                found.append(
+                    f"{result['path']} at {result['target_rate']}/s: p99 {old['p99_ms']}ms -> {result['p99_ms']}ms"
+                )
+    return found
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[1])
+    parser.add_argument("--rates", type=int, nargs="+", default=[1000, 5000, 10000, 20000])
+    parser.add_argument("--agents", type=int, default=100)
+    parser.add_argument("--duration", type=float, default=2.0, help="seconds of sending per rate")
+    parser.add_argument("--drain", type=float, default=5.0, help="seconds to wait for late deliveries")
+    parser.add_argument("--database-url", help="postgresql+asyncpg URL to persist messages")
+    parser.add_argument("--redis-url", help="scratch Redis database to use instead of fakeredis")
+    parser.add_argument("--output", help="write the JSON report to this file")
+    parser.add_argument("--baseline", help="previous JSON report to compare against")
+    parser.add_argument("--tolerance", type=float, default=0.25, help="allowed relative p99 increase")
+    args = parser.parse_args()
+
+    logging.disable(logging.WARNING)
+    report = asyncio.run(main(args.rates, args.agents, args.duration, args.drain, args.database_url, args.redis_url))
+    print(json.dumps(report, indent=2))
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            found = regressions(report, json.load(f), args.tolerance)
+        for regression in found:
+            print(f"REGRESSION {regression}", file=sys.stderr)
+        sys.exit(1 if found else 0)
@@ -0,0 +1,164 @@
+"""
+Minimal OpenAI-compatible HTTP/1.1 server for the LLM benchmarks
+
+Serves POST /v1/chat/completions, and /v1/completions with a prompt or a
+list of prompts, with small JSON answers. Keeps connections alive and
+counts the connections, requests and completion tokens it serves. Answers
+come after a fixed latency, or from an InferenceEngine simulating how a
+local inference server decodes sequences in batches. No model, no
+dependencies beyond asyncio.
+"""
+
+import asyncio
+import json
+import time
+from collections import deque
+from typing import Any, Deque, Dict, List, Optional, Tuple
+from uuid import uuid4
+
+
+class InferenceEngine:
+    """Continuous-batching decoder with `slots` parallel sequences
+
+    Each request is prefilled (`prefill_time`, one request at a time, plus
+    `prefill_per_prompt` per extra prompt of a batched request), then its
+    sequences join the decoding batch. A decoding step yields one token per
+    active sequence and takes `step_time` plus `per_sequence_time` per
+    active sequence; sequences beyond `slots` wait for a free slot.
+    """
+
+    def __init__(
+        self,
+        slots: int = 32,
+        step_time: float = 0.004,
+        per_sequence_time: float = 0.0002,
+        prefill_time: float = 0.003,
+        prefill_per_prompt: float = 0.0005
+    ):
+        self.slots = slots
+        self.step_time = step_time
+        self.per_sequence_time = per_sequence_time
+        self.prefill_time = prefill_time
+        self.prefill_per_prompt = prefill_per_prompt
+        self._prefill = asyncio.Lock()
+        self._waiting: Deque[List[Any]] = deque()
+        self._active: List[List[Any]] = []
+        self._loop: Optional[asyncio.Task] = None
+
+    async def generate(self, prompts: int, tokens: int) -> None:
+        """Prefill `prompts` prompts together, then decode `tokens` tokens for each"""
+        async with self._prefill:
+            await asyncio.sleep(self.prefill_time + self.prefill_per_prompt * (prompts - 1))
+        loop = asyncio.get_running_loop()
+        sequences = [[tokens, loop.create_future()] for _ in range(prompts)]
+        self._waiting.extend(sequences)
+        if self._loop is None or self._loop.done():
+            self._loop = asyncio.create_task(self._decode())
+        await asyncio.gather(*(future for _, future in sequences))
+
+    async def _decode(self):
+        while self._waiting or self._active:
+            while self._waiting and len(self._active) < self.slots:
+                self._active.append(self._waiting.popleft())
+            await asyncio.sleep(self.step_time + self.per_sequence_time * len(self._active))
+            for sequence in self._active:
+                sequence[0] -= 1
+            for _, future in (s for s in self._active if s[0] <= 0):
+                future.set_result(None)
+            self._active = [s for s in self._active if s[0] > 0]
+
+
+class MockOpenAIServer:
+    """OpenAI-compatible completion endpoints counting connections, requests and tokens"""
+
+    def __init__(self, latency: float = 0.02, completion_tokens: int = 20, engine: Optional[InferenceEngine] = None):
+        self.latency = latency
+        self.completion_tokens = completion_tokens
+        self.engine = engine
+        self.tokens = 0
+        self.connections = 0
+        self.open_connections = 0
+        self.peak_connections = 0
+        self.requests = 0
+        self._server: Optional[asyncio.AbstractServer] = None
+
+    async def start(self, host: str = "127.0.0.1", port: int = 0) -> str:
+        """Start listening, returns the base URL to give to the client"""
+        self._server = await asyncio.start_server(self._serve, host, port, backlog=4096)
+        host, port = self._server.sockets[0].getsockname()[:2]
+        return f"http://{host}:{port}/v1"
+
+    async def stop(self):
+        if self._server is not None:
+            self._server.close()
+            await self._server.wait_closed()
+
+    def reset(self):
+        self.connections = self.peak_connections = self.requests = self.tokens = 0
+
+    async def complete(self, prompts: int, max_tokens: Optional[int]) -> Tuple[List[str], int]:
+        """Answer texts of `prompts` prompts and the completion tokens of each"""
+        tokens = min(self.completion_tokens, max_tokens or self.completion_tokens)
+        if self.engine is not None:
+            await self.engine.generate(prompts, tokens)
+        else:
+            await asyncio.sleep(self.latency)
+        self.tokens += prompts * tokens
+        return [json.dumps({"status": "ok", "seq": self.requests, "index": i}) for i in range(prompts)], tokens
+
+    async def _serve(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        self.connections += 1
+        self.open_connections += 1
+        self.peak_connections = max(self.peak_connections, self.open_connections)
+        try:
+            while True:
+                try:
+                    head = await reader.readuntil(b"\r\n\r\n")
+                except (asyncio.IncompleteReadError, ConnectionError):
+                    return
+                length = 0
+                for line in head.split(b"\r\n")[1:]:
+                    name, _, value = line.partition(b":")
+                    if name.strip().lower() == b"content-length":
+                        length = int(value)
+                request = json.loads(await reader.readexactly(length)) if length else {}
+                self.requests += 1
+
+                path = head.split(b" ", 2)[1]
+                if path.endswith(b"/completions") and not path.endswith(b"/chat/completions"):
+                    prompts = request.get("prompt", "")
+                    prompts = prompts if isinstance(prompts, list) else [prompts]
+                    texts, tokens = await self.complete(len(prompts), request.get("max_tokens"))
+                    choices = [
+                        {"index": i, "text": text, "finish_reason": "stop", "logprobs": None}
+                        for i, text in enumerate(texts)
+                    ]
+                    kind = "text_completion"
+                else:
+                    texts, tokens = await self.complete(1, request.get("max_tokens"))
+                    choices = [{
+                        "index": 0,
+                        "message": {"role": "assistant", "content": texts[0]},
+                        "finish_reason": "stop"
+                    }]
+                    kind = "chat.completion"
+                body = json.dumps({
+                    "id": f"cmpl-{uuid4().hex}",
+                    "object": kind,
+                    "created": int(time.time()),
+                    "model": request.get("model", "mock"),
+                    "choices": choices,
+                    "usage": {
+                        "prompt_tokens": 10 * len(choices),
+                        "completion_tokens": tokens * len(choices),
+                        "total_tokens": (10 + tokens) * len(choices)
+                    }
+                }).encode()
+                writer.write(
+                    b"HTTP/1.1 200 OK\r\nContent-Type: application/json\r\n"
+                    b"Content-Length: " + str(len(body)).encode() + b"\r\n\r\n" + body
+                )
+                await writer.drain()
+        finally:
+            self.open_connections -= 1
+            writer.close()
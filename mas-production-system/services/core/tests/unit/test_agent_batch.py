@@ -0,0 +1,39 @@
+"""
+Test batched agent creation helpers
+"""
+import pytest
+from uuid import uuid4
+
+from src.database.models import Agent
+from src.schemas.agents import AgentCreate
+from src.services.agent_service import AgentService
+
+
+def test_build_agent_rows_fills_every_column():
+    """Rows carry explicit values so one multi-row INSERT needs no per-row defaults"""
+    owner_id = uuid4()
+    rows = AgentService().build_agent_rows(owner_id, [
+        AgentCreate(name="a", role="worker", agent_type="reflexive", reactive_rules={"r": {}}),
+        AgentCreate(name="b", role="worker", agent_type="cognitive", initial_beliefs={"x": 1}),
+    ])
+
+    assert len({row["id"] for row in rows}) == 2
+    assert all(row["owner_id"] == owner_id and row["status"] == "idle" for row in rows)
+    assert rows[0]["reactive_rules"] == {"r": {}}
+    assert rows[1]["beliefs"] == {"x": 1}
+    assert set(rows[0]) == set(rows[1])
+
+
+@pytest.mark.asyncio
+async def test_register_runtime_agent_from_row():
+    """Inserted rows become runtime agents without another database round trip"""
+    service = AgentService()
+    row = service.build_agent_rows(uuid4(), [
+        AgentCreate(name="c", role="worker", agent_type="reflexive", configuration={"bdi_cycle_interval": 9})
+    ])[0]
+
+    await service.register_runtime_agent(Agent(**row), llm_service=None)
+    runtime_agent = service.runtime.get_running_agent(row["id"])
+    assert runtime_agent.bdi_cycle_interval == 9
+    assert runtime_agent.owner_id == row["owner_id"]
+    del service.runtime.running_agents[row["id"]]
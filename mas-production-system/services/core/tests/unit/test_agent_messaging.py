@@ -0,0 +1,109 @@
+"""
+Test in-process agent-to-agent messaging and write-behind persistence
+"""
+import pytest
+import asyncio
+from uuid import uuid4
+
+from src.core.agents import AgentRuntime
+from src.core.agents.messages import AgentMessage
+from src.core.agents.queues import MailboxStatus
+from tests.unit.test_agent_runtime import RecordingAgent
+
+
+class RecordingStore:
+    """Message store keeping what would be persisted"""
+
+    def __init__(self):
+        self.messages = []
+
+    async def add_message(self, message, is_read=False):
+        self.messages.append((message, is_read))
+
+    async def mark_read(self, message_ids):
+        self.messages = [(message, is_read or message.id in message_ids) for message, is_read in self.messages]
+        return []
+
+
+async def runtime_with_agents(count=2):
+    runtime = AgentRuntime(message_store=RecordingStore())
+    runtime.hibernate_after = 0
+    agents = [RecordingAgent(bdi_cycle_interval=60) for _ in range(count)]
+    for agent in agents:
+        await runtime.register_agent(agent)
+        await runtime.start_agent(agent)
+    return runtime, agents
+
+
+@pytest.mark.asyncio
+async def test_local_message_goes_straight_to_receiver_mailbox():
+    """A send_message action reaches a local receiver in memory and is persisted as read"""
+    runtime, (alice, bob) = await runtime_with_agents()
+
+    await alice._execute_action({
+        "type": "send_message",
+        "receiver": str(bob.agent_id),
+        "performative": "request",
+        "content": {"action": "ping"}
+    })
+    await asyncio.sleep(0.01)
+
+    [message] = bob.handled_messages
+    assert message.sender == str(alice.agent_id)
+    assert message.content == {"action": "ping"}
+    assert runtime.message_store.messages == [(message, True)]
+    assert alice.metrics["messages_sent"] == 1
+    await runtime.stop_all_agents()
+
+
+@pytest.mark.asyncio
+async def test_message_is_persisted_before_delivery():
+    """The row is buffered, with the message's final ID, before the receiver can see it"""
+    runtime, (alice, bob) = await runtime_with_agents()
+    seen_at_persist = []
+    add_message = runtime.message_store.add_message
+
+    async def recording_add(message, is_read=False):
+        seen_at_persist.append(bob._message_queue.qsize())
+        await add_message(message, is_read)
+
+    runtime.message_store.add_message = recording_add
+    message = AgentMessage(sender=str(alice.agent_id), receiver=str(bob.agent_id))
+    assert await runtime.send_message(message) is MailboxStatus.ACCEPTED
+
+    assert seen_at_persist == [0]
+    assert runtime.message_store.messages == [(message, True)]
+    await runtime.stop_all_agents()
+
+
+@pytest.mark.asyncio
+async def test_remote_and_unknown_receivers():
+    """Receivers outside the runtime are forwarded, names that are not agent IDs are dropped"""
+    runtime, (alice,) = await runtime_with_agents(1)
+    forwarded = []
+
+    async def forward(agent_id, message):
+        forwarded.append(agent_id)
+
+    runtime.set_message_forwarder(forward)
+    remote_id = uuid4()
+
+    assert await runtime.send_message(AgentMessage(sender=str(alice.agent_id), receiver=str(remote_id))) is None
+    assert await runtime.send_message(AgentMessage(sender=str(alice.agent_id), receiver="task_manager")) is None
+    assert forwarded == [remote_id]
+    assert [is_read for _, is_read in runtime.message_store.messages] == [False]
+    await runtime.stop_all_agents()
+
+
+@pytest.mark.asyncio
+async def test_rejected_message_is_stored_unread():
+    """A full receiver mailbox leaves the message unread for a later replay"""
+    runtime = AgentRuntime(message_store=RecordingStore())
+    bob = RecordingAgent(mailbox_capacity=1, mailbox_policy="drop_newest")
+    await runtime.register_agent(bob)
+    await bob.receive_message("busy")
+
+    status = await runtime.send_message(AgentMessage(sender=str(uuid4()), receiver=str(bob.agent_id)))
+    assert status is MailboxStatus.REJECTED
+    assert runtime.message_store.messages[0][1] is False
+
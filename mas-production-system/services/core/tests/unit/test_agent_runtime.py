@@ -0,0 +1,185 @@
+"""
+Test agent run loop and runtime scheduling
+"""
+import pytest
+import asyncio
+from typing import Any, Dict, List
+from uuid import uuid4
+
+from src.core.agents.base_agent import BaseAgent
+
+
+class RecordingAgent(BaseAgent):
+    """Agent recording what its run loop processed"""
+
+    def __init__(self, **kwargs):
+        super().__init__(
+            agent_id=kwargs.pop("agent_id", uuid4()),
+            name=kwargs.pop("name", "recorder"),
+            role="tester",
+            capabilities=[],
+            **kwargs
+        )
+        self.handled_messages = []
+        self.handled_tasks = []
+        self.bdi_cycles = 0
+
+    async def perceive(self, environment: Dict[str, Any]) -> Dict[str, Any]:
+        self.bdi_cycles += 1
+        return {}
+
+    async def deliberate(self) -> List[str]:
+        return []
+
+    async def act(self) -> List[Dict[str, Any]]:
+        return []
+
+    async def handle_message(self, message: Any):
+        self.handled_messages.append(message)
+
+    async def handle_task(self, task: Any):
+        self.handled_tasks.append(task)
+
+
+@pytest.mark.asyncio
+async def test_idle_agent_wakes_up_on_message_and_task():
+    """An idle agent processes new work without waiting for the BDI interval"""
+    agent = RecordingAgent(bdi_cycle_interval=60)
+    runner = asyncio.create_task(agent.run())
+    await asyncio.sleep(0.01)
+
+    await agent.receive_message("hello")
+    await agent.add_task("task")
+    await asyncio.sleep(0.01)
+
+    assert agent.handled_messages == ["hello"]
+    assert agent.handled_tasks == ["task"]
+    assert agent.bdi_cycles == 0
+
+    await agent.stop()
+    await asyncio.wait_for(runner, timeout=1)
+
+
+@pytest.mark.asyncio
+async def test_agent_runs_bdi_cycle_when_deadline_passes():
+    """The run loop wakes up on its own for the next BDI cycle"""
+    agent = RecordingAgent(bdi_cycle_interval=0.05)
+    runner = asyncio.create_task(agent.run())
+    await asyncio.sleep(0.18)
+
+    await agent.stop()
+    await asyncio.wait_for(runner, timeout=1)
+    assert 2 <= agent.bdi_cycles <= 4
+
+
+@pytest.mark.asyncio
+async def test_runtime_timer_drives_bdi_cycles():
+    """The runtime fires BDI cycles for all its agents from one timer task"""
+    from src.core.agents import AgentRuntime
+
+    runtime = AgentRuntime()
+    agents = [RecordingAgent(bdi_cycle_interval=0.05) for _ in range(20)]
+    for agent in agents:
+        await runtime.register_agent(agent)
+        await runtime.start_agent(agent)
+
+    assert len(runtime.bdi_timer) == 20
+    await asyncio.sleep(0.3)
+    await runtime.stop_all_agents()
+
+    assert all(agent.bdi_cycles >= 2 for agent in agents)
+    assert len(runtime.bdi_timer) == 0
+
+
+@pytest.mark.asyncio
+async def test_bdi_timer_spreads_first_deadlines():
+    """Agents scheduled together do not all fire at the same moment"""
+    from src.core.agents.scheduler import BDITimer
+
+    timer = BDITimer(jitter=0.1)
+    loop = asyncio.get_running_loop()
+    fired = []
+    for i in range(50):
+        timer.schedule(uuid4(), 0.1, lambda: fired.append(loop.time()))
+
+    await asyncio.sleep(0.16)
+    await timer.stop()
+
+    assert len(fired) >= 10
+    assert max(fired) - min(fired) > 0.05
+
+
+@pytest.mark.asyncio
+async def test_bdi_executor_caps_concurrency_and_shares_fairly():
+    """A burst from one owner does not starve the cycles of another owner"""
+    from src.core.agents.scheduler import BDIExecutor
+
+    executor = BDIExecutor(max_concurrent=2)
+    running = 0
+    peak = 0
+    order = []
+
+    async def cycle(owner):
+        nonlocal running, peak
+        async with executor.slot(owner):
+            running += 1
+            peak = max(peak, running)
+            order.append(owner)
+            await asyncio.sleep(0.01)
+            running -= 1
+
+    burst = [asyncio.create_task(cycle("alice")) for _ in range(20)]
+    await asyncio.sleep(0)
+    late = asyncio.create_task(cycle("bob"))
+    await asyncio.gather(*burst, late)
+
+    assert peak == 2
+    assert executor.in_flight == 0
+    # Bob is served right after the cycles that were already running
+    assert order.index("bob") <= 3
+
+
+@pytest.mark.asyncio
+async def test_bdi_executor_suspended_cycle_frees_its_slot():
+    """A preempted cycle lends its slot out and queues again to resume"""
+    from src.core.agents.scheduler import BDIExecutor
+
+    executor = BDIExecutor(max_concurrent=1)
+    preempted = asyncio.Event()
+    resume = asyncio.Event()
+    order = []
+
+    async def preempting_cycle():
+        async with executor.slot("alice"):
+            async with executor.suspended("alice"):
+                preempted.set()
+                await resume.wait()
+            order.append("alice resumed")
+
+    async def other_cycle():
+        async with executor.slot("bob"):
+            order.append("bob")
+
+    alice = asyncio.create_task(preempting_cycle())
+    await preempted.wait()
+    await other_cycle()
+    assert order == ["bob"]
+    resume.set()
+    await alice
+    assert order == ["bob", "alice resumed"]
+    assert executor.in_flight == 0
+
+    # Cancelled while waiting to resume: the budget stays balanced
+    preempted.clear()
+    resume.clear()
+    alice = asyncio.create_task(preempting_cycle())
+    await preempted.wait()
+    async with executor.slot("carol"):
+        resume.set()
+        await asyncio.sleep(0.01)
+        assert executor.queued == 1
+        alice.cancel()
+        await asyncio.gather(alice, return_exceptions=True)
+        assert executor.in_flight == 1
+    assert executor.in_flight == 0
+    assert executor.queued == 0
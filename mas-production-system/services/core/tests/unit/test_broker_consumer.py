@@ -0,0 +1,139 @@
+"""
+Test the broker consumer dispatching pub/sub events to handlers
+"""
+import pytest
+import asyncio
+
+from src import message_broker
+from src.message_broker import BrokerConsumer, broadcast, publish_event
+from src.services import cache_invalidation
+
+fakeredis = pytest.importorskip("fakeredis")
+
+
+@pytest.fixture
+async def consumer(monkeypatch):
+    redis = fakeredis.FakeAsyncRedis(decode_responses=True)
+    monkeypatch.setattr(message_broker, "broker", redis)
+    consumer = BrokerConsumer(redis=redis, concurrency=2, queue_size=10)
+    yield consumer
+    await consumer.stop()
+
+
+async def wait_for(condition, timeout=2.0):
+    deadline = asyncio.get_event_loop().time() + timeout
+    while not condition():
+        assert asyncio.get_event_loop().time() < deadline, "condition not met in time"
+        await asyncio.sleep(0.01)
+
+
+@pytest.mark.asyncio
+async def test_pattern_subscription_receives_typed_events(consumer):
+    """Pattern subscriptions get decoded events with their publish time"""
+    events = []
+
+    async def handler(event):
+        events.append(event)
+
+    await consumer.subscribe("agent.*", handler, pattern=True)
+    await consumer.start()
+    await publish_event("agent.created", {"agent_id": "a1", "owner_id": "u1"})
+    await publish_event("message.sent", {"sender_id": "a1"})
+
+    await wait_for(lambda: events)
+    await asyncio.sleep(0.05)
+    assert [(e.channel, e.event_type, e.data["agent_id"]) for e in events] == [("agent.created", "agent.created", "a1")]
+    assert events[0].published_at is not None
+
+
+@pytest.mark.asyncio
+async def test_slow_handler_does_not_stall_other_channels(consumer):
+    """Each subscription is drained by its own workers"""
+    release = asyncio.Event()
+    fast = []
+
+    async def slow_handler(event):
+        await release.wait()
+
+    async def fast_handler(event):
+        fast.append(event.data["n"])
+
+    await consumer.subscribe("slow", slow_handler)
+    await consumer.subscribe("fast", fast_handler)
+    await consumer.start()
+    for n in range(3):
+        await publish_event("slow", {"n": n})
+        await publish_event("fast", {"n": n})
+
+    await wait_for(lambda: len(fast) == 3)
+    assert sorted(fast) == [0, 1, 2]
+    release.set()
+
+
+@pytest.mark.asyncio
+async def test_full_queue_drops_events_and_failing_handler_keeps_worker(consumer):
+    """Saturated subscriptions drop new events, handler errors are contained"""
+    consumer.queue_size = 1
+    handled = []
+    busy = asyncio.Event()
+    release = asyncio.Event()
+
+    async def handler(event):
+        busy.set()
+        await release.wait()
+        if event.data["n"] == 0:
+            raise RuntimeError("boom")
+        handled.append(event.data["n"])
+
+    await consumer.subscribe("work", handler, concurrency=1)
+    await consumer.start()
+    await publish_event("work", {"n": 0})
+    await asyncio.wait_for(busy.wait(), timeout=2.0)
+    for n in range(1, 5):
+        await publish_event("work", {"n": n})
+    await asyncio.sleep(0.1)
+    release.set()
+
+    # One event in the worker, one queued, the rest dropped
+    await wait_for(lambda: handled)
+    await asyncio.sleep(0.05)
+    assert handled == [1]
+
+
+@pytest.mark.asyncio
+async def test_agent_events_invalidate_owner_list_cache(consumer, monkeypatch):
+    """agent.* events move the owner's list pages to a new cache key"""
+    monkeypatch.setattr("src.cache.cache", consumer.redis)
+    page = cache_invalidation.agent_list_cache_key
+    before = [await page("u1", 1, 20, None, None), await page("u1", 2, 20, None, None), await page("u2", 1, 20, None, None)]
+    assert before[0] == "user_agents:u1:v0:1:20:None:None"
+
+    await cache_invalidation.register_cache_invalidation(consumer)
+    await consumer.start()
+    await publish_event("agent.updated", {"agent_id": "a1", "owner_id": "u1"})
+
+    await wait_for(lambda: consumer._subscriptions["agent.*"].queue.empty())
+    await asyncio.sleep(0.05)
+    after = [await page("u1", 1, 20, None, None), await page("u1", 2, 20, None, None), await page("u2", 1, 20, None, None)]
+    assert after[0] == "user_agents:u1:v1:1:20:None:None"
+    assert after[1] != before[1]
+    assert after[2] == before[2]
+
+
+@pytest.mark.asyncio
+async def test_broadcast_pipelines_one_payload_to_every_channel(consumer):
+    """broadcast publishes <channel>:<event_type>, as channel and event type, in chunks"""
+    events = []
+
+    async def handler(event):
+        events.append(event)
+
+    await consumer.subscribe("*:announcement", handler, pattern=True)
+    await consumer.start()
+    channels = [f"agent:{i}" for i in range(5)]
+
+    assert await broadcast("announcement", {"text": "hi"}, channels, chunk_size=2) == 5
+    await wait_for(lambda: len(events) == 5)
+    assert sorted(e.channel for e in events) == [f"{channel}:announcement" for channel in channels]
+    assert all(e.event_type == e.channel and e.data == {"text": "hi"} for e in events)
+    assert {e.published_at for e in events} == {events[0].published_at}
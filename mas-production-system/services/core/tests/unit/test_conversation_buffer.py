@@ -0,0 +1,93 @@
+"""
+Test the conversation buffer
+"""
+import pytest
+from datetime import datetime, timezone
+from uuid import uuid4
+
+from src.services.conversation_buffer import ConversationBuffer
+
+fakeredis = pytest.importorskip("fakeredis")
+
+
+def message_row(conversation_id, text):
+    return {
+        "id": uuid4(),
+        "sender_id": uuid4(),
+        "receiver_id": uuid4(),
+        "performative": "inform",
+        "content": {"text": text},
+        "conversation_id": conversation_id,
+        "is_read": False,
+        "created_at": datetime.now(timezone.utc)
+    }
+
+
+@pytest.fixture
+def buffer():
+    return ConversationBuffer(redis=fakeredis.FakeAsyncRedis(decode_responses=True), max_messages=3, ttl=60)
+
+
+def loader_of(rows, calls):
+    async def load(limit):
+        calls.append(limit)
+        return rows[:limit]
+    return load
+
+
+@pytest.mark.asyncio
+async def test_conversation_is_loaded_once_then_kept_up_to_date(buffer):
+    """The first read loads the database, later writes are appended"""
+    conversation_id = uuid4()
+    calls = []
+    load = loader_of([message_row(conversation_id, "hello")], calls)
+
+    first = await buffer.get_or_load(conversation_id, load)
+    await buffer.append([message_row(conversation_id, "again"), message_row(uuid4(), "elsewhere")])
+    second = await buffer.get_or_load(conversation_id, load)
+
+    assert [m["content"]["text"] for m in first] == ["hello"]
+    assert [m["content"]["text"] for m in second] == ["hello", "again"]
+    assert calls == [4]
+
+
+@pytest.mark.asyncio
+async def test_writes_do_not_create_buffers(buffer):
+    """Only conversations that were read are buffered"""
+    conversation_id = uuid4()
+    await buffer.append([message_row(conversation_id, "hello")])
+    assert await buffer.get(conversation_id) is None
+
+
+@pytest.mark.asyncio
+async def test_long_and_invalidated_conversations_are_dropped(buffer):
+    """Conversations outgrowing the buffer or changing read state go back to the database"""
+    long_id, growing_id, read_id = uuid4(), uuid4(), uuid4()
+    assert await buffer.get_or_load(long_id, loader_of([message_row(long_id, str(i)) for i in range(4)], [])) is None
+
+    await buffer.get_or_load(growing_id, loader_of([message_row(growing_id, "0")], []))
+    await buffer.append([message_row(growing_id, str(i)) for i in range(3)])
+    assert await buffer.get(growing_id) is None
+
+    # Later reads of both skip the load until the marker expires
+    calls = []
+    for conversation_id in (long_id, growing_id):
+        assert await buffer.get_or_load(conversation_id, loader_of([message_row(conversation_id, "0")], calls)) is None
+    assert calls == []
+
+    await buffer.get_or_load(read_id, loader_of([message_row(read_id, "hi")], []))
+    await buffer.invalidate([read_id])
+    assert await buffer.get(read_id) is None
+
+
+@pytest.mark.asyncio
+async def test_load_racing_a_write_is_not_cached(buffer):
+    """A message stored while the conversation loads must not be missed"""
+    conversation_id = uuid4()
+
+    async def racing_load(limit):
+        await buffer.append([message_row(conversation_id, "late")])
+        return [message_row(conversation_id, "early")]
+
+    assert len(await buffer.get_or_load(conversation_id, racing_load)) == 1
+    assert await buffer.get(conversation_id) is None
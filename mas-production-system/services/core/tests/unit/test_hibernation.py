@@ -0,0 +1,84 @@
+"""
+Test agent hibernation and rehydration
+"""
+import pytest
+import asyncio
+from uuid import UUID, uuid4
+
+from src.core.agents import AgentRuntime, CognitiveAgent
+from src.core.agents.hibernation import InMemoryHibernationStore
+from tests.unit.test_agent_runtime import RecordingAgent
+
+
+def build_recording_agent(spec):
+    return RecordingAgent(agent_id=UUID(spec["agent_id"]), name=spec["name"], **spec["configuration"])
+
+
+async def start_runtime_with_agent(hibernate_after=0):
+    runtime = AgentRuntime(hibernation_store=InMemoryHibernationStore(), agent_builder=build_recording_agent)
+    runtime.hibernate_after = hibernate_after
+    agent = RecordingAgent(bdi_cycle_interval=60, initial_beliefs={"mood": "calm"})
+    await runtime.register_agent(agent)
+    await runtime.start_agent(agent)
+    return runtime, agent
+
+
+@pytest.mark.asyncio
+async def test_idle_agent_is_hibernated_and_rehydrated_on_message():
+    """An idle agent leaves memory and comes back with its state on the next message"""
+    runtime, agent = await start_runtime_with_agent(hibernate_after=0.05)
+    await agent.update_beliefs({"seen": 3})
+
+    await asyncio.sleep(0.15)
+    assert runtime.get_running_agent(agent.agent_id) is None
+    assert await runtime.is_agent_running(agent.agent_id)
+
+    revived = await runtime.get_or_rehydrate(agent.agent_id)
+    assert revived is not agent
+    assert revived.bdi.beliefs == {"mood": "calm", "seen": 3}
+    assert revived.bdi_cycle_interval == 60
+    assert not runtime.hibernated
+
+    await revived.receive_message("wake up")
+    await asyncio.sleep(0.01)
+    assert revived.handled_messages == ["wake up"]
+    await runtime.stop_all_agents()
+
+
+@pytest.mark.asyncio
+async def test_busy_agent_is_not_hibernated():
+    """Agents that recently received work stay in memory"""
+    runtime, agent = await start_runtime_with_agent()
+    runtime.hibernate_after = 0.05
+    await asyncio.sleep(0.06)
+    await agent.add_task("fresh task")
+
+    assert await runtime.hibernate_idle_agents() == 0
+    assert runtime.get_running_agent(agent.agent_id) is agent
+    await runtime.stop_all_agents()
+
+
+@pytest.mark.asyncio
+async def test_concurrent_rehydrations_build_one_agent():
+    """Messages racing for a hibernated agent share a single rehydration"""
+    runtime, agent = await start_runtime_with_agent()
+    await runtime.hibernate_agent(agent.agent_id)
+
+    agents = await asyncio.gather(*(runtime.get_or_rehydrate(agent.agent_id) for _ in range(5)))
+    assert len({id(a) for a in agents}) == 1
+    await runtime.stop_all_agents()
+    assert not runtime.hibernated
+
+
+def test_cognitive_agent_snapshot_round_trip():
+    """Cognitive memories survive a snapshot/restore"""
+    agent = CognitiveAgent(uuid4(), "thinker", "analyst", [], None, reasoning_depth=5)
+    agent.episodic_memory.append({"event": "met bob"})
+    agent.plan_library["greet"] = {"steps": ["wave"]}
+
+    clone = CognitiveAgent(agent.agent_id, "thinker", "analyst", [], None, **agent.spec()["configuration"])
+    clone.restore_state(agent.snapshot_state())
+
+    assert clone.reasoning_depth == 5
+    assert clone.episodic_memory == [{"event": "met bob"}]
+    assert clone.plan_library == {"greet": {"steps": ["wave"]}}
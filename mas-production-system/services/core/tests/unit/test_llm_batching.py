@@ -0,0 +1,104 @@
+"""
+Test micro-batching of LLM calls
+"""
+import asyncio
+import pytest
+from types import SimpleNamespace
+from unittest.mock import AsyncMock
+
+from src.services.llm_batching import MicroBatcher
+from src.services.llm_limiter import AdaptiveLimiter
+
+
+def chat_params(text, **extra):
+    return {
+        "model": "local",
+        "messages": [{"role": "system", "content": "You are an agent"}, {"role": "user", "content": text}],
+        "temperature": 0.0,
+        "max_tokens": 50,
+        **extra
+    }
+
+
+def completions_client():
+    async def create(prompt, **kwargs):
+        # Answer out of order: results are matched by index
+        choices = [SimpleNamespace(index=i, text=p.split("user: ")[1].split("\n")[0].upper()) for i, p in enumerate(prompt)]
+        return SimpleNamespace(choices=list(reversed(choices)))
+    return SimpleNamespace(completions=SimpleNamespace(create=AsyncMock(side_effect=create)))
+
+
+@pytest.mark.asyncio
+async def test_parallel_mode_bounds_the_streams():
+    """Calls gathered in the window are sent as at most `parallelism` concurrent requests"""
+    batcher = MicroBatcher(client=None, provider="ollama", window=0.005, parallelism=2, mode="parallel")
+    running, peak = 0, 0
+
+    def single(text):
+        async def call():
+            nonlocal running, peak
+            running += 1
+            peak = max(peak, running)
+            await asyncio.sleep(0.01)
+            running -= 1
+            return text
+        return call
+
+    texts = [f"call {i}" for i in range(6)]
+    results = await asyncio.gather(*(batcher.submit(chat_params(t), single(t)) for t in texts))
+
+    assert results == texts
+    assert peak == 2
+
+
+@pytest.mark.asyncio
+async def test_completions_mode_sends_one_request_per_batch():
+    """Compatible calls share one prompt-list request, answers go back to their callers"""
+    client = completions_client()
+    batcher = MicroBatcher(client=client, provider="lmstudio", window=0.005, mode="completions")
+    single = AsyncMock(return_value="{}")
+
+    results = await asyncio.gather(
+        batcher.submit(chat_params("alpha"), single),
+        batcher.submit(chat_params("beta"), single),
+        batcher.submit(chat_params("gamma"), single),
+        batcher.submit(chat_params("json", response_format={"type": "json_object"}), single)
+    )
+
+    assert results == ["ALPHA", "BETA", "GAMMA", "{}"]
+    assert client.completions.create.await_count == 1
+    assert len(client.completions.create.await_args.kwargs["prompt"]) == 3
+    assert single.await_count == 1
+
+
+@pytest.mark.asyncio
+async def test_batch_failure_reaches_every_caller():
+    """An error of the batched request is raised to each call of the batch"""
+    client = SimpleNamespace(completions=SimpleNamespace(create=AsyncMock(side_effect=ConnectionError("down"))))
+    batcher = MicroBatcher(client=client, provider="ollama", window=0.005, max_batch=2, mode="completions")
+
+    results = await asyncio.gather(
+        batcher.submit(chat_params("alpha"), AsyncMock()),
+        batcher.submit(chat_params("beta"), AsyncMock()),
+        return_exceptions=True
+    )
+
+    assert all(isinstance(result, ConnectionError) for result in results)
+
+
+@pytest.mark.asyncio
+async def test_batch_is_not_capped_by_the_limiter():
+    """Waiting calls hold no admission, one prompt-list request takes one slot"""
+    client = completions_client()
+    limiter = AdaptiveLimiter(
+        "lmstudio", max_concurrency=2, initial_concurrency=2, requests_per_minute=0, tokens_per_minute=0
+    )
+    batcher = MicroBatcher(client=client, provider="lmstudio", window=0.005, max_batch=32, mode="completions", limiter=limiter)
+    texts = [f"call {i}" for i in range(32)]
+
+    results = await asyncio.gather(*(batcher.submit(chat_params(t), AsyncMock(), tokens=10) for t in texts))
+
+    assert results == [t.upper() for t in texts]
+    assert client.completions.create.await_count == 1
+    assert len(client.completions.create.await_args.kwargs["prompt"]) == 32
+    assert limiter.in_flight == 0
@@ -0,0 +1,102 @@
+"""
+Test the LLM response cache
+"""
+import pytest
+from unittest.mock import AsyncMock
+
+from src.services.llm_cache import CachedRequest, LLMResponseCache
+from src.services.llm_service import LLMService
+
+fakeredis = pytest.importorskip("fakeredis")
+
+
+def request(prompt, temperature=0.0, system_prompt="You are an agent"):
+    return CachedRequest("gpt-4o-mini", system_prompt, prompt, temperature, True)
+
+
+def response(text):
+    return {"success": True, "response": {"text": text}, "raw_text": text}
+
+
+@pytest.fixture
+def redis():
+    return fakeredis.FakeAsyncRedis(decode_responses=True)
+
+
+@pytest.mark.asyncio
+async def test_exact_hits_are_shared_through_redis(redis):
+    """A response cached by one process is served to another by the Redis tier"""
+    first = LLMResponseCache(redis=redis, ttl=60, semantic=False)
+    second = LLMResponseCache(redis=redis, ttl=60, semantic=False)
+
+    await first.set(request("perceive"), response("calm"))
+
+    assert await first.get(request("perceive")) == {**response("calm"), "cached": "exact"}
+    assert (await second.get(request("perceive")))["response"] == {"text": "calm"}
+    assert await second.get(request("perceive", system_prompt="Other")) is None
+
+
+@pytest.mark.asyncio
+async def test_hot_calls_and_failures_are_not_cached(redis):
+    """Calls above the max temperature bypass the cache, failed responses are not stored"""
+    cache = LLMResponseCache(redis=redis, ttl=60, max_temperature=0.3, semantic=False)
+
+    await cache.set(request("deliberate", temperature=0.7), response("plan"))
+    await cache.set(request("act"), {"success": False, "error": "timeout"})
+    await cache.set(request("perceive", temperature=0.3), response("calm"))
+
+    assert await cache.get(request("deliberate", temperature=0.7)) is None
+    assert await cache.get(request("act")) is None
+    assert await cache.get(request("perceive", temperature=0.3)) is not None
+    assert len(await redis.keys("llm_cache:*")) == 1
+
+
+@pytest.mark.asyncio
+async def test_lru_keeps_the_most_recent_entries(redis):
+    """Entries evicted from process memory are still read back from Redis"""
+    cache = LLMResponseCache(redis=redis, ttl=60, max_entries=2, semantic=False)
+    for prompt in ("a", "b", "c"):
+        await cache.set(request(prompt), response(prompt))
+
+    assert len(cache._entries) == 2
+    assert (await cache.get(request("a")))["raw_text"] == "a"
+
+
+@pytest.mark.asyncio
+async def test_semantic_tier_serves_paraphrases(redis):
+    """A prompt close enough to a cached one gets its response"""
+    vectors = {
+        "What changed around me?": [1.0, 0.0, 0.0],
+        "What has changed around me?": [0.99, 0.1, 0.0],
+        "Plan my next move": [0.0, 1.0, 0.0]
+    }
+    embed = AsyncMock(side_effect=lambda texts: [vectors[text] for text in texts])
+    cache = LLMResponseCache(redis=redis, ttl=60, semantic=True, similarity_threshold=0.95)
+
+    await cache.set(request("What changed around me?"), response("nothing"), embed)
+
+    hit = await cache.get(request("What has changed around me?"), embed)
+    assert hit["cached"] == "semantic"
+    assert hit["response"] == {"text": "nothing"}
+    assert await cache.get(request("Plan my next move"), embed) is None
+    assert await cache.get(request("What has changed around me?", system_prompt="Other"), embed) is None
+
+
+@pytest.mark.asyncio
+async def test_generate_calls_the_provider_once_per_prompt(redis):
+    """Repeated identical prompts are answered from the cache"""
+    service = LLMService.__new__(LLMService)
+    service.enable_mock = False
+    service.client = object()
+    service.model = "gpt-4o-mini"
+    service.response_cache = LLMResponseCache(redis=redis, ttl=60, semantic=False)
+    service.single_flight = None
+    service._generate = AsyncMock(return_value=response("calm"))
+
+    first = await service.generate("perceive", temperature=0.0)
+    second = await service.generate("perceive", temperature=0.0)
+    await service.generate("perceive", temperature=0.7)
+
+    assert first == response("calm")
+    assert second["cached"] == "exact"
+    assert service._generate.await_count == 2
@@ -0,0 +1,54 @@
+"""
+Test the shared LLM client pool
+"""
+import pytest
+
+from src.config import settings
+from src.services import llm_client_pool
+from src.services.llm_client_pool import LLMClientPool
+from src.services.llm_service import LLMService
+
+
+@pytest.fixture
+def pool(monkeypatch):
+    pool = LLMClientPool(max_connections=50, local_max_connections=4, max_keepalive_connections=10, http2=False)
+    monkeypatch.setattr(llm_client_pool, "_llm_client_pool", pool)
+    return pool
+
+
+@pytest.mark.asyncio
+async def test_clients_are_shared_per_endpoint(pool):
+    """The same endpoint gets the same client, another endpoint its own"""
+    first = pool.client("ollama", api_key="ollama", base_url="http://localhost:11434/v1")
+    second = pool.client("ollama", api_key="ollama", base_url="http://localhost:11434/v1")
+    other = pool.client("lmstudio", api_key="lm-studio", base_url="http://localhost:1234/v1")
+
+    assert first is second
+    assert other is not first
+    assert len(pool) == 2
+
+    await pool.close()
+    assert len(pool) == 0
+
+
+def test_local_providers_get_smaller_pools(pool):
+    """Local inference servers are limited to local_max_connections"""
+    assert pool.limits_for("openai").max_connections == 50
+    assert pool.limits_for("ollama").max_connections == 4
+    assert pool.limits_for("lmstudio").max_keepalive_connections == 4
+    assert pool.limits_for("openai").max_keepalive_connections == 10
+
+
+@pytest.mark.asyncio
+async def test_llm_services_are_handles_onto_the_pool(pool, monkeypatch):
+    """Starting agents does not create a client per agent"""
+    monkeypatch.setenv("ENABLE_MOCK_LLM", "false")
+    monkeypatch.setattr(settings, "ENABLE_MOCK_LLM", False)
+    monkeypatch.setattr(settings, "LLM_PROVIDER", "lmstudio")
+    monkeypatch.setattr(settings, "LLM_BASE_URL", "http://localhost:1234/v1")
+
+    services = [LLMService() for _ in range(20)]
+
+    assert all(service.client is services[0].client for service in services)
+    assert len(pool) == 1
+    await pool.close()
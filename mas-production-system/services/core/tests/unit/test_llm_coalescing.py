@@ -0,0 +1,77 @@
+"""
+Test single-flight coalescing of LLM calls
+"""
+import asyncio
+import pytest
+from unittest.mock import AsyncMock
+
+from src.services.llm_coalescing import SingleFlight
+from src.services.llm_service import LLMService
+
+
+def slow_call(calls, result, delay=0.05):
+    async def call():
+        calls.append(result)
+        await asyncio.sleep(delay)
+        return result
+    return call
+
+
+@pytest.mark.asyncio
+async def test_concurrent_calls_with_the_same_key_share_one_execution():
+    """Only the first caller runs the call, the others get its result"""
+    group = SingleFlight()
+    calls = []
+
+    results = await asyncio.gather(
+        *(group.do("same", slow_call(calls, "answer")) for _ in range(5)),
+        group.do("other", slow_call(calls, "other"))
+    )
+
+    assert calls == ["answer", "other"]
+    assert [shared for _, shared in results] == [False, True, True, True, True, False]
+    assert {result for result, _ in results} == {"answer", "other"}
+    assert group.in_flight == 0
+
+    await group.do("same", slow_call(calls, "answer"))
+    assert len(calls) == 3
+
+
+@pytest.mark.asyncio
+async def test_cancelled_caller_does_not_cancel_the_shared_call():
+    """Followers still get the result when the caller that started the call gives up"""
+    group = SingleFlight()
+    calls = []
+    first = asyncio.create_task(group.do("same", slow_call(calls, "answer")))
+    await asyncio.sleep(0)
+    second = asyncio.create_task(group.do("same", slow_call(calls, "answer")))
+    await asyncio.sleep(0)
+
+    first.cancel()
+
+    assert await second == ("answer", True)
+    assert calls == ["answer"]
+
+
+@pytest.mark.asyncio
+async def test_generate_collapses_identical_concurrent_calls():
+    """Agents sending the same prompt at once cause one provider request"""
+    async def provider(*args):
+        await asyncio.sleep(0.05)
+        return {"success": True, "response": {"intentions": ["explore"]}}
+
+    service = LLMService.__new__(LLMService)
+    service.enable_mock = False
+    service.client = object()
+    service.model = "gpt-4o-mini"
+    service.response_cache = None
+    service.single_flight = SingleFlight()
+    service._generate = AsyncMock(side_effect=provider)
+
+    responses = await asyncio.gather(*(service.generate("deliberate", temperature=0.5) for _ in range(10)))
+    await service.generate("deliberate", temperature=0.5, max_tokens=100)
+
+    assert service._generate.await_count == 2
+    assert all(response == responses[0] for response in responses)
+    responses[0]["response"]["intentions"].append("rest")
+    assert responses[1]["response"]["intentions"] == ["explore"]
@@ -0,0 +1,108 @@
+"""
+Test the adaptive LLM limiter
+"""
+import asyncio
+import time
+import httpx
+import pytest
+from openai import RateLimitError
+
+from src.services.llm_limiter import AdaptiveLimiter, llm_priority
+
+
+def limiter(**kwargs):
+    options = dict(initial_concurrency=2, requests_per_minute=0, tokens_per_minute=0, latency_target=10, backoff=0.5)
+    options.update(kwargs)
+    return AdaptiveLimiter("test", max_concurrency=kwargs.pop("max_concurrency", 8), **options)
+
+
+def rate_limited():
+    response = httpx.Response(429, request=httpx.Request("POST", "http://llm/v1/chat/completions"))
+    return RateLimitError("Too many requests", response=response, body=None)
+
+
+@pytest.mark.asyncio
+async def test_calls_above_the_limit_wait():
+    """No more than `limit` calls run at once"""
+    gate = limiter()
+    running, peak = 0, 0
+
+    async def call():
+        nonlocal running, peak
+        async with gate.slot():
+            running += 1
+            peak = max(peak, running)
+            await asyncio.sleep(0.01)
+            running -= 1
+
+    await asyncio.gather(*(call() for _ in range(6)))
+
+    assert peak == 2
+    assert gate.in_flight == 0
+
+
+@pytest.mark.asyncio
+async def test_interactive_calls_are_admitted_before_background_ones():
+    """A waiting interactive call overtakes background calls queued earlier"""
+    gate = limiter(initial_concurrency=1)
+    order = []
+    release = asyncio.Event()
+
+    async def holder():
+        async with gate.slot():
+            await release.wait()
+
+    async def call(name, priority):
+        with llm_priority(priority):
+            async with gate.slot():
+                order.append(name)
+
+    first = asyncio.create_task(holder())
+    await asyncio.sleep(0)
+    waiting = [asyncio.create_task(call("bdi-1", "background")), asyncio.create_task(call("bdi-2", "background"))]
+    await asyncio.sleep(0)
+    waiting.append(asyncio.create_task(call("api", "interactive")))
+    await asyncio.sleep(0)
+    assert gate.waiting == 3
+
+    release.set()
+    await asyncio.gather(first, *waiting)
+
+    assert order == ["api", "bdi-1", "bdi-2"]
+
+
+@pytest.mark.asyncio
+async def test_limit_grows_when_saturated_and_halves_once_per_congestion():
+    """Additive increase on saturated successes, one multiplicative decrease for a burst of 429s"""
+    gate = limiter(initial_concurrency=4)
+
+    async def call(error=None):
+        async with gate.slot():
+            await asyncio.sleep(0.01)
+            if error:
+                raise error
+
+    await asyncio.gather(*(call() for _ in range(8)))
+    grown = gate.limit
+    assert grown > 4
+
+    results = await asyncio.gather(*(call(rate_limited()) for _ in range(4)), return_exceptions=True)
+    assert all(isinstance(result, RateLimitError) for result in results)
+    assert gate.limit == pytest.approx(grown / 2)
+
+    with pytest.raises(asyncio.TimeoutError):
+        await call(asyncio.TimeoutError())
+    assert gate.limit == pytest.approx(grown / 4)
+
+
+@pytest.mark.asyncio
+async def test_request_bucket_paces_calls():
+    """An empty requests-per-minute bucket delays admission until it refills"""
+    gate = limiter(requests_per_minute=1200)
+    gate.requests.drain()
+
+    start = time.monotonic()
+    async with gate.slot():
+        pass
+
+    assert time.monotonic() - start >= 0.04
@@ -0,0 +1,126 @@
+"""
+Test bounded agent mailboxes and overflow policies
+"""
+import pytest
+import asyncio
+from types import SimpleNamespace
+
+from src.core.agents.messages import AgentMessage
+from src.core.agents.queues import Mailbox, MailboxStatus
+from tests.unit.test_agent_runtime import RecordingAgent
+
+
+async def drain(mailbox):
+    return [await mailbox.get() for _ in range(mailbox.qsize())]
+
+
+@pytest.mark.asyncio
+async def test_drop_policies():
+    """drop_oldest keeps the newest messages, drop_newest keeps the oldest"""
+    oldest = Mailbox(capacity=2, policy="drop_oldest")
+    newest = Mailbox(capacity=2, policy="drop_newest")
+    for i in range(3):
+        await oldest.put(i)
+        last = await newest.put(i)
+
+    assert last is MailboxStatus.REJECTED
+    assert await drain(oldest) == [1, 2]
+    assert await drain(newest) == [0, 1]
+
+
+@pytest.mark.asyncio
+async def test_block_policy_waits_for_room_then_times_out():
+    """Blocked senders resume when the agent consumes, or get rejected"""
+    mailbox = Mailbox(capacity=1, policy="block", block_timeout=0.05)
+    await mailbox.put("first")
+
+    sender = asyncio.create_task(mailbox.put("second"))
+    await asyncio.sleep(0.01)
+    assert not sender.done()
+    assert await mailbox.get() == "first"
+    assert await sender is MailboxStatus.ACCEPTED
+
+    assert await mailbox.put("third") is MailboxStatus.REJECTED
+
+
+@pytest.mark.asyncio
+async def test_spill_policy_preserves_order(monkeypatch):
+    """Overflow goes to Redis and comes back in order"""
+    fakeredis = pytest.importorskip("fakeredis")
+    import src.cache
+    monkeypatch.setattr(src.cache, "cache", fakeredis.FakeAsyncRedis(decode_responses=True))
+
+    mailbox = Mailbox(capacity=2, policy="spill", spill_key="test_spill")
+    statuses = [await mailbox.put({"n": i}) for i in range(5)]
+    await mailbox.put(SimpleNamespace(performative="inform", content={"n": 5}))
+
+    assert statuses[:2] == [MailboxStatus.ACCEPTED] * 2
+    assert statuses[2:] == [MailboxStatus.SPILLED] * 3
+    assert mailbox.qsize() == 6
+
+    messages = await drain(mailbox)
+    assert messages[:5] == [{"n": i} for i in range(5)]
+    assert messages[5].performative == "inform"
+    assert mailbox.empty()
+
+
+@pytest.mark.asyncio
+async def test_spilled_agent_messages_keep_their_type(monkeypatch):
+    """AgentMessage instances come back from Redis as AgentMessage"""
+    fakeredis = pytest.importorskip("fakeredis")
+    import src.cache
+    monkeypatch.setattr(src.cache, "cache", fakeredis.FakeAsyncRedis(decode_responses=True))
+
+    mailbox = Mailbox(capacity=1, policy="spill", spill_key="test_spill_type")
+    await mailbox.put(AgentMessage(id="1"))
+    await mailbox.put(AgentMessage(id="2", performative="request", content={"n": 2}))
+
+    messages = await drain(mailbox)
+    assert messages == [AgentMessage(id="1"), AgentMessage(id="2", performative="request", content={"n": 2})]
+
+
+@pytest.mark.asyncio
+async def test_lost_spill_list_empties_the_mailbox(monkeypatch):
+    """Spilled messages missing from Redis are forgotten instead of awaited forever"""
+    fakeredis = pytest.importorskip("fakeredis")
+    import src.cache
+    redis = fakeredis.FakeAsyncRedis(decode_responses=True)
+    monkeypatch.setattr(src.cache, "cache", redis)
+
+    mailbox = Mailbox(capacity=1, policy="spill", spill_key="test_spill_lost")
+    for i in range(4):
+        await mailbox.put({"n": i})
+    assert await mailbox.get() == {"n": 0}
+    await redis.lpop("test_spill_lost", 2)  # Only {"n": 3} is left
+
+    assert await mailbox.get() == {"n": 3}
+    with pytest.raises(asyncio.QueueEmpty):
+        await mailbox.get()
+    assert mailbox.empty()
+
+
+@pytest.mark.asyncio
+async def test_redis_error_on_refill_reports_empty(monkeypatch):
+    """A failing spill read is retried later instead of raising to the agent"""
+    async def unavailable(*args):
+        raise ConnectionError("redis down")
+
+    monkeypatch.setattr("src.core.agents.queues.cache_rpush", lambda *args: asyncio.sleep(0))
+    monkeypatch.setattr("src.core.agents.queues.cache_lpop", unavailable)
+    mailbox = Mailbox(capacity=1, policy="spill", spill_key="test_spill_down", retry_delay=0.01)
+    await mailbox.put("a")
+    await mailbox.put("b")
+    assert await mailbox.get() == "a"
+
+    with pytest.raises(asyncio.QueueEmpty):
+        await mailbox.get()
+    assert mailbox.qsize() == 1
+
+
+@pytest.mark.asyncio
+async def test_agent_reports_backpressure():
+    """receive_message returns the mailbox status and wakes the agent only when accepted"""
+    agent = RecordingAgent(mailbox_capacity=1, mailbox_policy="drop_newest")
+    assert await agent.receive_message("a") is MailboxStatus.ACCEPTED
+    assert agent.mailbox_pressure == 1.0
+    assert await agent.receive_message("b") is MailboxStatus.REJECTED
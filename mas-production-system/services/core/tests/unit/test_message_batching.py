@@ -0,0 +1,87 @@
+"""
+Test batched message processing
+"""
+import pytest
+import asyncio
+from types import SimpleNamespace
+from uuid import uuid4
+
+from src.core.agents import CognitiveAgent
+from tests.unit.test_agent_runtime import RecordingAgent
+
+
+class BatchRecordingAgent(RecordingAgent):
+    """Agent recording the batches handed to handle_messages"""
+
+    def __init__(self, **kwargs):
+        super().__init__(**kwargs)
+        self.batches = []
+
+    async def handle_messages(self, messages):
+        self.batches.append(list(messages))
+
+
+class FakeLLM:
+    """LLM service answering batch prompts with a canned reply"""
+
+    def __init__(self, reply):
+        self.reply = reply
+        self.prompts = []
+
+    async def generate(self, prompt, **kwargs):
+        self.prompts.append(prompt)
+        return {"success": True, "response": self.reply}
+
+
+@pytest.mark.asyncio
+async def test_messages_arriving_within_window_are_batched():
+    """Messages close together are handed over at once, up to the batch size"""
+    agent = BatchRecordingAgent(bdi_cycle_interval=60, message_batch_size=3, message_batch_window=0.05)
+    runner = asyncio.create_task(agent.run())
+    await asyncio.sleep(0.01)
+
+    await agent.receive_message("a")
+    await asyncio.sleep(0.01)
+    for message in ("b", "c", "d"):
+        await agent.receive_message(message)
+    await asyncio.sleep(0.1)
+
+    assert agent.batches == [["a", "b", "c"], ["d"]]
+    assert agent.metrics["messages_processed"] == 4
+    assert agent.metrics["message_batches"] == 2
+
+    await agent.stop()
+    await asyncio.wait_for(runner, timeout=1)
+
+
+@pytest.mark.asyncio
+async def test_batching_is_opt_in():
+    """Without a batch size, messages still go through handle_message one by one"""
+    agent = RecordingAgent(bdi_cycle_interval=60)
+    for message in ("a", "b"):
+        await agent.receive_message(message)
+    await agent._process_messages()
+    assert agent.handled_messages == ["a", "b"]
+    assert agent.metrics["message_batches"] == 0
+
+
+@pytest.mark.asyncio
+async def test_cognitive_agent_coalesces_llm_calls():
+    """One LLM call interprets the batch, messages left out get their own call"""
+    llm = FakeLLM({"interpretations": [
+        {"index": 0, "belief_updates": {"alice": "ready"}},
+        {"index": 2, "belief_updates": {"carol": "late"}}
+    ]})
+    agent = CognitiveAgent(uuid4(), "thinker", "analyst", [], llm)
+    messages = [
+        SimpleNamespace(sender=name, performative="inform", content={"n": i})
+        for i, name in enumerate(("alice", "bob", "carol"))
+    ]
+
+    await agent.handle_messages(messages)
+
+    assert len(llm.prompts) == 2  # Batch call, then bob's fallback
+    assert "[2] From: carol" in llm.prompts[0]
+    assert "From: bob" in llm.prompts[1]
+    assert agent.bdi.beliefs == {"alice": "ready", "carol": "late"}
+    assert len(agent.context.conversation_history) == 3
@@ -0,0 +1,92 @@
+"""
+Test message delivery through Redis Streams
+"""
+import pytest
+import asyncio
+from uuid import uuid4
+
+from src.config import settings
+from src.core.agents.offline_mailbox import InMemoryOfflineMailbox
+from src.database.models import Message
+from src.services.message_delivery import MessageDeliveryService, CONSUMER_GROUP, NOT_RUNNING, QUEUED
+from tests.unit.test_agent_runtime import RecordingAgent
+
+fakeredis = pytest.importorskip("fakeredis")
+
+
+@pytest.fixture
+async def delivery(monkeypatch):
+    monkeypatch.setattr(settings, "MESSAGE_STREAM_BLOCK_MS", 20)
+    monkeypatch.setattr(settings, "MESSAGE_STREAM_RETRY_IDLE_MS", 0)
+    service = MessageDeliveryService(redis=fakeredis.FakeAsyncRedis(decode_responses=True))
+    monkeypatch.setattr(service.runtime, "offline_mailbox", InMemoryOfflineMailbox())
+    await service.start()
+    agents = []
+
+    async def register(**kwargs):
+        agent = RecordingAgent(**kwargs)
+        await service.runtime.register_agent(agent)
+        agents.append(agent)
+        return agent
+
+    yield service, register
+    await service.stop()
+    for agent in agents:
+        service.runtime.running_agents.pop(agent.agent_id, None)
+        service.runtime.agent_tasks.pop(agent.agent_id, None)
+
+
+async def pending(service):
+    stream = service.stream_key(service.shards.shard_id)
+    return (await service.redis.xpending(stream, CONSUMER_GROUP))["pending"]
+
+
+@pytest.mark.asyncio
+async def test_enqueued_messages_are_pushed_and_acked(delivery):
+    """Messages reach the mailbox without polling and are acknowledged"""
+    service, register = delivery
+    agent = await register()
+
+    for i in range(3):
+        assert await service.enqueue(agent.agent_id, {"id": str(i), "content": {"n": i}}) == QUEUED
+    await asyncio.sleep(0.05)
+
+    received = [await agent._message_queue.get() for _ in range(agent._message_queue.qsize())]
+    assert [message.content for message in received] == [{"n": 0}, {"n": 1}, {"n": 2}]
+    assert await pending(service) == 0
+    assert service.runtime.offline_mailbox.delivered == ["0", "1", "2"]
+
+
+@pytest.mark.asyncio
+async def test_full_mailbox_keeps_entries_pending_until_retry(delivery):
+    """Backpressured messages stay unacknowledged and are redelivered later"""
+    service, register = delivery
+    agent = await register(mailbox_capacity=1, mailbox_policy="drop_newest")
+    await agent.receive_message("busy")
+
+    await service.enqueue(agent.agent_id, {"id": "1", "content": "later"})
+    await asyncio.sleep(0.05)
+    assert await pending(service) == 1
+
+    assert await agent._message_queue.get() == "busy"
+    await asyncio.sleep(0.05)
+    assert (await agent._message_queue.get()).content == "later"
+    assert await pending(service) == 0
+
+
+@pytest.mark.asyncio
+async def test_deliver_messages_from_inserted_rows(delivery):
+    """A batch of rows is enqueued without reading them back, per-receiver state checked once"""
+    service, register = delivery
+    agent = await register(bdi_cycle_interval=60)
+    await service.runtime.start_agent(agent)
+    rows = [
+        Message(id=uuid4(), sender_id=uuid4(), receiver_id=receiver_id, performative="inform",
+                content={"n": i}, conversation_id=uuid4())
+        for i, receiver_id in enumerate([agent.agent_id, uuid4(), agent.agent_id])
+    ]
+
+    assert await service.deliver_messages(rows) == [QUEUED, NOT_RUNNING, QUEUED]
+    await asyncio.sleep(0.05)
+    assert [message.content for message in agent.handled_messages] == [{"n": 0}, {"n": 2}]
+    await service.runtime.stop_agent(agent.agent_id)
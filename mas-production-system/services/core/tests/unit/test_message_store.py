@@ -0,0 +1,166 @@
+"""
+Test write-behind persistence of messages
+"""
+import pytest
+import asyncio
+from uuid import uuid4
+
+from sqlalchemy.exc import IntegrityError, OperationalError
+
+from src.core.agents.messages import AgentMessage
+from src.services.message_store import MessageWriteBehind
+
+fakeredis = pytest.importorskip("fakeredis")
+
+
+class FakeDatabase:
+    """Records written batches, rejects rows without a sender, can go down"""
+
+    def __init__(self):
+        self.batches = []
+        self.marked_read = []
+        self.down = False
+
+    async def write(self, rows):
+        if self.down:
+            raise OperationalError("INSERT", {}, ConnectionError("connection refused"))
+        if any(row["sender_id"] is None for row in rows):
+            raise IntegrityError("INSERT", {}, ValueError("null sender_id"))
+        self.batches.append(len(rows))
+
+    async def mark_read(self, message_ids):
+        self.marked_read.extend(message_ids)
+
+
+def make_store(redis=None, **kwargs):
+    store = MessageWriteBehind(redis=redis or fakeredis.FakeAsyncRedis(decode_responses=True), **kwargs)
+    database = FakeDatabase()
+    store._write = database.write
+    store._mark_written_read = database.mark_read
+    return store, database
+
+
+async def add(store, count, sender=None):
+    for _ in range(count):
+        await store.add_message(AgentMessage(sender=sender or str(uuid4()), receiver=str(uuid4())))
+
+
+@pytest.mark.asyncio
+async def test_flushes_on_batch_size_or_interval():
+    """A full batch is written at once, a partial one after the interval"""
+    store, database = make_store(batch_size=3, flush_interval=0.2)
+    await add(store, 3)
+    await asyncio.sleep(0.01)
+    assert database.batches == [3]
+
+    await add(store, 2)
+    await asyncio.sleep(0.01)
+    assert database.batches == [3]
+    await asyncio.sleep(0.25)
+    assert database.batches == [3, 2]
+
+
+@pytest.mark.asyncio
+async def test_max_pending_bounds_unflushed_rows():
+    """Once max_pending rows are buffered, add() writes them before returning"""
+    store, database = make_store(batch_size=2, flush_interval=60, max_pending=4)
+    store._batch_ready.set = lambda: None  # Keep the background flusher asleep
+    await add(store, 4)
+    assert database.batches == [4]
+    assert store.pending == 0
+    await store.close()
+
+
+@pytest.mark.asyncio
+async def test_rejected_rows_are_isolated():
+    """A constraint error only drops the offending row"""
+    store, database = make_store(flush_interval=60)
+    await add(store, 1)
+    await add(store, 1, sender="nobody")
+    await add(store, 1)
+    assert await store.flush() == 2
+    assert database.batches == [1, 1]
+    await store.close()
+
+
+@pytest.mark.asyncio
+async def test_rows_survive_outage_and_are_written_on_close():
+    """Rows are kept while the database is down, and close() writes them"""
+    store, database = make_store(flush_interval=60, max_pending=10)
+    database.down = True
+    await add(store, 3)
+    with pytest.raises(OperationalError):
+        await store.flush()
+    assert store.pending == 3
+
+    database.down = False
+    await store.close()
+    assert database.batches == [3]
+    assert store.pending == 0
+
+
+@pytest.mark.asyncio
+async def test_mark_read_reaches_rows_not_written_yet():
+    """A message delivered before its flush is inserted as read"""
+    store, database = make_store(flush_interval=60)
+    written = []
+
+    async def write(rows):
+        written.extend(rows)
+
+    store._write = write
+    delivered = AgentMessage(sender=str(uuid4()), receiver=str(uuid4()))
+    await store.add_message(delivered)
+    await add(store, 1)
+
+    assert await store.mark_read([delivered.id]) == []
+    await store.flush()
+    assert [row["is_read"] for row in written] == [True, False]
+    assert str(written[0]["id"]) == delivered.id
+    await store.close()
+
+
+@pytest.mark.asyncio
+async def test_mark_read_from_another_worker_applies_after_insert():
+    """A message acked by a worker that does not buffer its row is marked read once written"""
+    redis = fakeredis.FakeAsyncRedis(decode_responses=True)
+    sender, sender_database = make_store(redis=redis, flush_interval=60)
+    receiver, _ = make_store(redis=redis, flush_interval=60)
+    delivered = AgentMessage(sender=str(uuid4()), receiver=str(uuid4()))
+    await sender.add_message(delivered)
+    await add(sender, 1)
+
+    assert await receiver.mark_read([delivered.id]) == [delivered.id]
+    await sender.flush()
+    assert [str(message_id) for message_id in sender_database.marked_read] == [delivered.id]
+    assert await redis.keys("message_read:*") == []
+    await sender.close()
+    await receiver.close()
+
+
+@pytest.mark.asyncio
+async def test_mark_read_waits_for_flush_in_progress():
+    """Rows taken by a running flush are committed before mark_read returns"""
+    store, database = make_store(flush_interval=60)
+    release = asyncio.Event()
+    committed = []
+
+    async def slow_write(rows):
+        await release.wait()
+        committed.extend(rows)
+
+    store._write = slow_write
+    message = AgentMessage(sender=str(uuid4()), receiver=str(uuid4()))
+    await store.add_message(message)
+    flush = asyncio.create_task(store.flush())
+    await asyncio.sleep(0)
+
+    marking = asyncio.create_task(store.mark_read([message.id]))
+    await asyncio.sleep(0.01)
+    assert not marking.done()
+    release.set()
+    await asyncio.gather(flush, marking)
+    assert len(committed) == 1
+    assert marking.result() == [message.id]
+    assert [str(message_id) for message_id in database.marked_read] == [message.id]
+    await store.close()
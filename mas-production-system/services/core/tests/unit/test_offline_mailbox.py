@@ -0,0 +1,54 @@
+"""
+Test replay of messages stored while an agent was not running
+"""
+import pytest
+import asyncio
+
+from src.core.agents import AgentRuntime
+from src.core.agents.messages import AgentMessage
+from src.core.agents.offline_mailbox import InMemoryOfflineMailbox
+from tests.unit.test_agent_runtime import RecordingAgent
+
+
+async def start_with_offline_messages(count, page_size=3, **agent_kwargs):
+    mailbox = InMemoryOfflineMailbox(page_size=page_size)
+    runtime = AgentRuntime(offline_mailbox=mailbox)
+    runtime.hibernate_after = 0
+    agent = RecordingAgent(bdi_cycle_interval=60, **agent_kwargs)
+    for i in range(count):
+        mailbox.add(agent.agent_id, AgentMessage(id=str(i), content={"n": i}))
+    await runtime.register_agent(agent)
+    await runtime.start_agent(agent)
+    return runtime, mailbox, agent
+
+
+@pytest.mark.asyncio
+async def test_offline_messages_are_replayed_in_order_on_start():
+    """Every stored message reaches the agent once, oldest first, page by page"""
+    runtime, mailbox, agent = await start_with_offline_messages(7)
+    await asyncio.sleep(0.05)
+
+    assert [message.content["n"] for message in agent.handled_messages] == list(range(7))
+    assert mailbox.delivered == [str(i) for i in range(7)]
+    assert not runtime._replays
+
+    # Nothing is left to replay on the next start
+    await runtime.stop_agent(agent.agent_id)
+    await runtime.register_agent(agent)
+    await runtime.start_agent(agent)
+    await asyncio.sleep(0.05)
+    assert len(agent.handled_messages) == 7
+    await runtime.stop_all_agents()
+
+
+@pytest.mark.asyncio
+async def test_replay_stops_when_mailbox_is_full():
+    """Messages the mailbox rejects stay stored for a later replay"""
+    runtime, mailbox, agent = await start_with_offline_messages(
+        5, mailbox_capacity=2, mailbox_policy="drop_newest"
+    )
+    # A page is pushed without yielding, so the run loop cannot drain in between
+    await asyncio.sleep(0.05)
+
+    assert mailbox.delivered == ["0", "1"]
+    await runtime.stop_all_agents()
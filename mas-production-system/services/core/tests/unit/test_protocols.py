@@ -0,0 +1,107 @@
+"""
+Test the contract-net and subscribe protocol engine
+"""
+import pytest
+import asyncio
+from uuid import uuid4
+
+from src.core.agents import AgentRuntime
+from tests.unit.test_agent_messaging import RecordingStore
+from tests.unit.test_agent_runtime import RecordingAgent
+
+
+class Bidder(RecordingAgent):
+    """Agent bidding a fixed cost, or refusing"""
+
+    def __init__(self, cost=None, delay=0.0, **kwargs):
+        super().__init__(**kwargs)
+        self.cost = cost
+        self.delay = delay
+
+    async def contract_bid(self, task):
+        if self.delay:
+            await asyncio.sleep(self.delay)
+        return None if self.cost is None else {"cost": self.cost}
+
+
+async def runtime_with(*agents, store=None):
+    runtime = AgentRuntime(message_store=store)
+    for agent in agents:
+        await runtime.register_agent(agent)
+        await runtime.start_agent(agent)
+    return runtime
+
+
+@pytest.mark.asyncio
+async def test_contract_net_awards_lowest_cost_bid():
+    """Bids are collected, the cheapest wins the task, losers are rejected"""
+    store = RecordingStore()
+    initiator = RecordingAgent(name="manager")
+    bidders = [Bidder(cost=5), Bidder(cost=2), Bidder(cost=None)]
+    runtime = await runtime_with(initiator, *bidders, store=store)
+
+    result = await runtime.protocols.contract_net(initiator.agent_id, [b.agent_id for b in bidders], {"job": "index"})
+    await asyncio.sleep(0.01)
+
+    assert result.winner == str(bidders[1].agent_id)
+    assert result.proposal == {"cost": 2}
+    assert result.refused == [str(bidders[2].agent_id)] and result.timed_out == []
+    assert bidders[1].handled_tasks == [{"job": "index"}]
+    assert bidders[0].handled_tasks == [] and initiator.handled_messages == []
+    assert [m.performative for m, _ in store.messages].count("propose") == 2
+    assert not runtime.protocols.rounds
+    await runtime.stop_all_agents()
+
+
+@pytest.mark.asyncio
+async def test_contract_net_deadline_ignores_late_bidders():
+    """Participants answering after the deadline are reported as timed out"""
+    initiator = RecordingAgent(name="manager")
+    fast, slow = Bidder(cost=3), Bidder(cost=1, delay=0.2)
+    runtime = await runtime_with(initiator, fast, slow)
+    missing = uuid4()
+
+    result = await runtime.protocols.contract_net(
+        initiator.agent_id, [fast.agent_id, slow.agent_id, missing], {}, timeout=0.05
+    )
+    assert result.winner == str(fast.agent_id)
+    assert result.timed_out == sorted([str(slow.agent_id), str(missing)])
+    assert result.elapsed < 0.2
+
+    await asyncio.sleep(0.2)
+    assert slow.handled_tasks == []
+    await runtime.stop_all_agents()
+
+
+@pytest.mark.asyncio
+async def test_contract_net_round_with_100_agents_is_fast():
+    """Coordinating 100 in-process bidders costs milliseconds"""
+    initiator = RecordingAgent(name="manager")
+    bidders = [Bidder(cost=i % 17) for i in range(100)]
+    runtime = await runtime_with(initiator, *bidders)
+
+    result = await runtime.protocols.contract_net(initiator.agent_id, [b.agent_id for b in bidders], {})
+    assert len(result.proposals) == 100
+    assert result.proposal == {"cost": 0}
+    assert result.elapsed < 0.5
+    await runtime.stop_all_agents()
+
+
+@pytest.mark.asyncio
+async def test_subscribe_publish_and_cancel():
+    """Subscribers get informs in their mailbox until they cancel or the lease ends"""
+    publisher, subscriber, leased = RecordingAgent(name="pub"), RecordingAgent(name="sub"), RecordingAgent(name="lease")
+    runtime = await runtime_with(publisher, subscriber, leased)
+    engine = runtime.protocols
+
+    await engine.subscribe(subscriber.agent_id, publisher.agent_id, "prices")
+    await engine.subscribe(leased.agent_id, publisher.agent_id, "prices", lease=0.01)
+    await asyncio.sleep(0.02)
+    assert await engine.publish(publisher.agent_id, "prices", {"btc": 1}) == 1
+    await asyncio.sleep(0.01)
+    assert [m.content["data"] for m in subscriber.handled_messages] == [{"btc": 1}]
+    assert leased.handled_messages == []
+
+    await engine.unsubscribe(subscriber.agent_id, publisher.agent_id, "prices")
+    assert await engine.publish(publisher.agent_id, "prices", {"btc": 2}) == 0
+    await runtime.stop_all_agents()
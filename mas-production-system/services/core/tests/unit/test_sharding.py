@@ -0,0 +1,206 @@
+"""
+Test sharded agent runtime
+"""
+import pytest
+import asyncio
+from collections import Counter
+from uuid import UUID, uuid4
+
+from src.core.agents import AgentRuntime
+from src.core.agents.hibernation import InMemoryHibernationStore
+from src.core.agents.sharding import (
+    ConsistentHashRing, LocalControlChannel, RedisControlChannel, ShardedAgentRuntime
+)
+from tests.unit.test_agent_runtime import RecordingAgent
+
+
+def build_recording_agent(spec):
+    return RecordingAgent(agent_id=UUID(spec["agent_id"]), name=spec["name"], bdi_cycle_interval=60)
+
+
+async def start_shards(channel, count=2, hibernation_store=None):
+    shards = []
+    for shard_id in range(count):
+        shard = ShardedAgentRuntime(
+            AgentRuntime(hibernation_store=hibernation_store, agent_builder=build_recording_agent),
+            channel, shard_count=count, shard_id=shard_id,
+            agent_builder=build_recording_agent
+        )
+
+        async def deliver(agent_id, message, runtime=shard.local):
+            await runtime.get_running_agent(agent_id).receive_message(message)
+            return True
+
+        shard.set_deliver_handler(deliver)
+        await shard.start()
+        shards.append(shard)
+    return shards
+
+
+def agent_owned_by(shard, shard_id):
+    while True:
+        agent_id = uuid4()
+        if shard.owner_of(agent_id) == shard_id:
+            return agent_id
+
+
+def test_hash_ring_is_balanced_and_stable():
+    """Keys spread over shards and mostly stay put when a shard is added"""
+    keys = [uuid4() for _ in range(4000)]
+    ring = ConsistentHashRing(range(4))
+    placement = {key: ring.shard_for(key) for key in keys}
+
+    counts = Counter(placement.values())
+    assert all(600 < count < 1400 for count in counts.values())
+    assert ConsistentHashRing(range(4)).shard_for(keys[0]) == placement[keys[0]]
+
+    ring.add_shard(4)
+    moved = sum(1 for key in keys if ring.shard_for(key) != placement[key])
+    assert moved < len(keys) * 0.35
+
+
+@pytest.mark.asyncio
+async def test_operations_are_forwarded_to_owning_shard():
+    """Start, deliver, metrics and stop issued on one shard run on the owner"""
+    shards = await start_shards(LocalControlChannel())
+    entry, owner = shards[0], shards[1]
+    agent_id = agent_owned_by(entry, 1)
+
+    await entry.start_agent({"agent_id": str(agent_id), "name": "remote", "agent_type": "test", "role": "r"})
+    assert await entry.is_agent_running(agent_id)
+    assert owner.local.get_running_agent(agent_id) is not None
+    assert entry.local.get_running_agent(agent_id) is None
+
+    assert await entry.deliver(agent_id, {"content": "hi"})
+    await asyncio.sleep(0.01)
+    assert owner.local.get_running_agent(agent_id).handled_messages == [{"content": "hi"}]
+
+    assert (await entry.agent_metrics(agent_id))["messages_processed"] == 1
+    metrics = await entry.metrics()
+    assert [m["running_agents"] for m in metrics] == [0, 1]
+
+    await entry.stop_agent(agent_id)
+    assert not await entry.is_agent_running(agent_id)
+    for shard in shards:
+        await shard.local.stop_all_agents()
+
+
+@pytest.mark.asyncio
+async def test_conversation_pin_moves_agent_and_releases_it():
+    """A pinned agent runs on the borrowing shard, then goes home once idle"""
+    shards = await start_shards(LocalControlChannel(), hibernation_store=InMemoryHibernationStore())
+    host, owner = shards
+    agent_id = agent_owned_by(host, 1)
+    await owner.start_agent({"agent_id": str(agent_id), "name": "bob", "agent_type": "test", "role": "r"})
+    await owner.local.get_running_agent(agent_id).update_beliefs({"offer": 10})
+
+    assert await host.pin_here(agent_id)
+    assert host.is_local(agent_id) and not owner.is_local(agent_id)
+    moved = await host.local.get_or_rehydrate(agent_id)
+    assert moved.bdi.beliefs == {"offer": 10}
+    assert owner.local.get_running_agent(agent_id) is None
+
+    # Commands sent to the owner reach the borrowing shard
+    assert await owner.deliver(agent_id, {"content": "bid"})
+    await asyncio.sleep(0.01)
+    assert moved.handled_messages == [{"content": "bid"}]
+
+    host.pin_ttl = 0.01
+    await asyncio.sleep(0.02)
+    assert await host.release_idle_agents() == 1
+    assert not host.borrowed and not owner.lent
+    back = await owner.local.get_or_rehydrate(agent_id)
+    assert back.bdi.beliefs == {"offer": 10}
+
+    await host.stop_agent(agent_id)
+    assert not await owner.is_agent_running(agent_id)
+    for shard in shards:
+        await shard.stop()
+        await shard.local.stop_all_agents()
+
+
+@pytest.mark.asyncio
+async def test_agent_is_pinned_to_one_conversation_shard_at_a_time():
+    """An agent already lent elsewhere stays there"""
+    shards = await start_shards(LocalControlChannel(), count=3, hibernation_store=InMemoryHibernationStore())
+    agent_id = agent_owned_by(shards[0], 2)
+    await shards[2].start_agent({"agent_id": str(agent_id), "name": "bob", "agent_type": "test", "role": "r"})
+
+    assert await shards[0].pin_here(agent_id)
+    assert not await shards[1].pin_here(agent_id)
+    assert shards[2].lent == {agent_id: 0}
+
+    await shards[1].stop_agent(agent_id)
+    assert not shards[0].borrowed and not shards[2].lent
+    for shard in shards:
+        await shard.stop()
+        await shard.local.stop_all_agents()
+
+
+@pytest.mark.asyncio
+async def test_tasks_are_assigned_on_owning_shard():
+    """A task assigned through any shard reaches the owner's agent with its fields"""
+    shards = await start_shards(LocalControlChannel())
+    entry, owner = shards[0], shards[1]
+    agent_id = agent_owned_by(entry, 1)
+    task = {"id": str(uuid4()), "title": "report", "priority": "high"}
+
+    assert not await entry.assign_task(agent_id, task)
+
+    await entry.start_agent({"agent_id": str(agent_id), "name": "remote", "agent_type": "test", "role": "r"})
+    assert await entry.assign_task(agent_id, task)
+    await asyncio.sleep(0.01)
+    handled = owner.local.get_running_agent(agent_id).handled_tasks
+    assert [(t.title, t.priority) for t in handled] == [("report", "high")]
+
+    for shard in shards:
+        await shard.stop()
+        await shard.local.stop_all_agents()
+
+
+@pytest.mark.asyncio
+async def test_redis_control_channel_round_trip():
+    """Shards claim distinct IDs and exchange commands through Redis"""
+    fakeredis = pytest.importorskip("fakeredis")
+    redis = fakeredis.FakeAsyncRedis(decode_responses=True)
+
+    channels = [RedisControlChannel(redis), RedisControlChannel(redis)]
+    assert [await c.claim_shard(2) for c in channels] == [0, 1]
+
+    async def handler(command):
+        return {"echo": command["value"]}
+
+    await channels[1].serve(1, handler)
+    assert await channels[0].request(1, {"value": 42}) == {"echo": 42}
+
+    for channel in channels:
+        await channel.close()
+
+
+@pytest.mark.asyncio
+async def test_redis_control_channel_tracks_running_commands():
+    """Commands in progress are kept referenced and cancelled on close"""
+    fakeredis = pytest.importorskip("fakeredis")
+    redis = fakeredis.FakeAsyncRedis(decode_responses=True)
+    channel = RedisControlChannel(redis)
+    started = asyncio.Event()
+    cancelled = asyncio.Event()
+
+    async def handler(command):
+        started.set()
+        try:
+            await asyncio.sleep(60)
+        except asyncio.CancelledError:
+            cancelled.set()
+            raise
+
+    await channel.serve(0, handler)
+    request = asyncio.create_task(channel.request(0, {"op": "start_agent"}, timeout=1))
+    await asyncio.wait_for(started.wait(), timeout=2)
+    assert len(channel._commands) == 1
+
+    await channel.close()
+    assert cancelled.is_set()
+    assert not channel._commands
+    request.cancel()
+    await asyncio.gather(request, return_exceptions=True)
@@ -0,0 +1,75 @@
+"""
+Test agent task priority queue and BDI preemption
+"""
+import pytest
+import asyncio
+from datetime import datetime, timedelta
+from typing import Any, Dict, List
+
+from src.core.agents.queues import TaskQueue
+from src.monitoring import task_queue_size
+from tests.unit.test_agent_runtime import RecordingAgent
+
+
+@pytest.mark.asyncio
+async def test_tasks_ordered_by_priority_then_deadline():
+    """Critical first, earliest deadline first, arrival order otherwise"""
+    queue = TaskQueue("test_order")
+    soon = datetime.utcnow() + timedelta(minutes=1)
+    later = datetime.utcnow() + timedelta(hours=1)
+
+    for task in [
+        {"id": "low", "priority": "low"},
+        {"id": "medium-late", "priority": "medium", "deadline": later.isoformat()},
+        {"id": "medium-none", "priority": "medium"},
+        {"id": "medium-soon", "priority": "medium", "task_metadata": {"deadline": soon}},
+        {"id": "critical", "priority": "critical"},
+        {"id": "unknown", "priority": "whatever"},
+    ]:
+        await queue.put(task)
+
+    assert queue.peek_priority() == "critical"
+    order = [(await queue.get())["id"] for _ in range(queue.qsize())]
+    assert order == ["critical", "medium-soon", "medium-late", "medium-none", "unknown", "low"]
+
+
+@pytest.mark.asyncio
+async def test_queue_depth_gauge_per_priority():
+    """Depth gauges follow puts and gets"""
+    queue = TaskQueue("test_gauge")
+    await queue.put({"priority": "high"})
+    await queue.put({"priority": "high"})
+    gauge = task_queue_size.labels(queue_name="test_gauge:high")
+    assert gauge._value.get() == 2
+
+    await queue.get()
+    assert gauge._value.get() == 1
+    assert queue.clear() == 1
+    assert gauge._value.get() == 0
+
+
+class SlowThinkingAgent(RecordingAgent):
+    """Agent whose BDI phases give other coroutines time to add tasks"""
+
+    async def perceive(self, environment: Dict[str, Any]) -> Dict[str, Any]:
+        self.handled_tasks.append("perceive")
+        await asyncio.sleep(0.02)
+        return {}
+
+    async def deliberate(self) -> List[str]:
+        self.handled_tasks.append("deliberate")
+        return []
+
+
+@pytest.mark.asyncio
+async def test_critical_task_preempts_bdi_cycle():
+    """A critical task runs between BDI phases, a low one waits for the cycle to end"""
+    agent = SlowThinkingAgent()
+    cycle = asyncio.create_task(agent._bdi_cycle())
+    await asyncio.sleep(0.005)
+    await agent.add_task({"priority": "low"})
+    await agent.add_task({"priority": "critical"})
+    await cycle
+
+    assert agent.handled_tasks == ["perceive", {"priority": "critical"}, "deliberate"]
+    assert agent._tasks.qsize() == 1
@@ -0,0 +1,38 @@
+"""
+Test shared tool catalog
+"""
+import pytest
+from uuid import uuid4
+
+from src.core.agents.reflexive_agent import ReflexiveAgent
+from src.services.tool_service import Tool, ToolService, get_tool_registry
+
+
+class EchoTool(Tool):
+    def __init__(self):
+        super().__init__("echo", "Echo parameters", {})
+
+    async def execute(self, **kwargs):
+        return kwargs
+
+
+def test_agents_share_registry_and_tool_views():
+    """Agents with the same capabilities share one read-only tool mapping"""
+    first = ReflexiveAgent(uuid4(), "a", "worker", ["coding", "research"])
+    second = ReflexiveAgent(uuid4(), "b", "worker", ["research", "coding"])
+
+    assert first.tool_service.registry is get_tool_registry()
+    assert first.tools is second.tools
+    assert {"git_clone", "web_search", "file_read"} <= set(first.tools)
+    with pytest.raises(TypeError):
+        first.tools["git_clone"] = None
+
+
+def test_registering_a_tool_refreshes_views():
+    """Views derived before a registration do not hide the new tool"""
+    service = ToolService()
+    service.capability_tools["echoing"] = ["echo"]
+    assert "echo" not in service.get_tools_for_capabilities(["echoing"])
+
+    service.register_custom_tool(EchoTool())
+    assert "echo" in service.get_tools_for_capabilities(["echoing"])